@@ -1,2 +1 @@
-python ./scripts/match_saildrone_satellite_swaths.py
-
+python ./scripts/match_saildrone_satellite_swaths.py "$@"
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import pandas as pd
+import platform
+import shutil
+import subprocess
+import time
+
+from calculations import SaildroneFleet, SaildroneTrack
+from catalog import prune_granules_with_catalog, update_satellite_catalog
+from matching import match_fleet_files, write_match_results
+from profiling import profile_stage, profile_to_frame, start_profile, stop_profile, summarize_run_report
+from read_write import (
+    check_for_saildrone_data,
+    fetch_repo_path,
+    get_saildrone_configs,
+    read_config,
+    read_saildrone,
+)
+from synthetic import generate_synthetic_data, get_synthetic_config, SYNTHETIC_VARIABLES
+
+
+config = read_config()
+
+parser = argparse.ArgumentParser(
+    description="Time each stage of the matching pipeline on synthetic saildrone tracks and satellite swaths."
+)
+parser.add_argument("--products", nargs="+", default=["ASCAT", "SMAP"], help="synthetic satellite products")
+parser.add_argument("--saildrones", type=int, default=2, help="number of saildrone tracks")
+parser.add_argument("--track-points", type=int, default=7200, help="points per saildrone track (one per minute)")
+parser.add_argument("--granules", type=int, default=10, help="granules per product")
+parser.add_argument("--rows", type=int, default=400, help="rows (along track) per granule")
+parser.add_argument("--cells", type=int, default=80, help="cells (across track) per granule")
+parser.add_argument("--density", type=float, default=0.9, help="fraction of the swath cells with valid data")
+parser.add_argument("--overlap", type=float, default=0.5, help="fraction of the granules passing over a saildrone")
+parser.add_argument("--seed", type=int, default=0, help="random seed of the synthetic data")
+parser.add_argument("--workers", type=int, default=1, help="number of processes used to match the granules")
+parser.add_argument("--output", default=None, help="JSON file the results are written to")
+args = parser.parse_args()
+
+benchmark_folder = config.get("benchmark_data_folder", "benchmark")
+benchmark_path = f"{fetch_repo_path()}{os.sep}{benchmark_folder}"
+synthetic_config = get_synthetic_config(config=config, folder=benchmark_folder)
+synthetic_config["use_cache"] = False
+synthetic_config["use_satellite_catalog"] = True
+synthetic_config["processing_state"] = "sqlite"
+synthetic_config["profile_stages"] = True
+
+# every run starts from freshly generated data (the results are kept)
+for folder in ["data_satellite", "data_saildrone", "data_match", "log", "cache"]:
+    shutil.rmtree(f"{benchmark_path}{os.sep}{folder}", ignore_errors=True)
+
+# wall time, number of calls, rows in/out and memory of each stage (see
+# profiling.profile_stage): the benchmark stages, and those recorded by the
+# matching of each granule
+start_profile()
+granule_reports = []
+tic = time.perf_counter()
+
+print(f"Generating the synthetic data in {benchmark_path}.")
+with profile_stage(stage="generate", memory=True):
+    datasets = generate_synthetic_data(
+        config=synthetic_config,
+        products=args.products,
+        n_saildrones=args.saildrones,
+        n_track_points=args.track_points,
+        n_granules=args.granules,
+        n_rows=args.rows,
+        n_cells=args.cells,
+        density=args.density,
+        overlap=args.overlap,
+        seed=args.seed,
+    )
+synthetic_config["fleet_saildrones"] = datasets["saildrones"]
+
+saildrone_configs = get_saildrone_configs(config=synthetic_config)
+tracks = {}
+for saildrone_config in saildrone_configs:
+    with profile_stage(stage="read_saildrone", memory=True) as record:
+        saildrone_data = read_saildrone(
+            filename=check_for_saildrone_data(config=saildrone_config),
+            config=saildrone_config,
+            masked_nan=True,
+            to_pd=True,
+        )
+        record["rows_out"] = len(saildrone_data)
+    tracks[(str(saildrone_config["saildrone_number"]), str(saildrone_config["saildrone_year"]))] = SaildroneTrack(
+        sd_data=saildrone_data
+    )
+fleet = SaildroneFleet(tracks=tracks)
+
+for product in args.products:
+    print(f"Benchmarking {product}.")
+    sd_var, st_var = SYNTHETIC_VARIABLES[product]
+    product_config = {
+        **synthetic_config,
+        "satellite_product": product,
+        "saildrone_variable_name": sd_var,
+        "satellite_variable_name": st_var,
+        "match_saildrone_variables": [sd_var],
+        "match_satellite_variables": [st_var],
+    }
+    drone_configs = {
+        drone: {**product_config, "saildrone_number": drone[0], "saildrone_year": drone[1]}
+        for drone in tracks
+    }
+    filenames = datasets["granules"][product]
+
+    with profile_stage(stage="catalog", rows_in=len(filenames), memory=True) as record:
+        record["rows_out"] = update_satellite_catalog(config=product_config)
+
+    # granules that can overlap each saildrone
+    candidates = {}
+    for drone, drone_config in drone_configs.items():
+        with profile_stage(stage="prune_catalog", rows_in=len(filenames), memory=True) as record:
+            drone_candidates, _ = prune_granules_with_catalog(
+                filenames=filenames, sd_track=tracks[drone], config=drone_config
+            )
+            record["rows_out"] = len(drone_candidates)
+        for fl in drone_candidates:
+            candidates.setdefault(fl, []).append(drone)
+
+    # the matching (with the configured engine and workers): each result has
+    # the stages of its granule (extent, prune, subset, decode, mask, pairs,
+    # distance), recorded in the worker that matched it
+    results = list(
+        match_fleet_files(
+            filenames=list(candidates),
+            fleet=fleet,
+            configs=[{drone: drone_configs[drone] for drone in drones} for drones in candidates.values()],
+            workers=args.workers,
+        )
+    )
+    for fl, drone_results in zip(candidates, results):
+        granule_reports.append(
+            profile_to_frame(profile=next(iter(drone_results.values()))["profile"], product=product, granule=fl)
+        )
+
+    for drone, drone_config in drone_configs.items():
+        drone_results = [drone_results[drone] for drone_results in results if drone in drone_results]
+        with profile_stage(
+            stage="write",
+            rows_in=sum(len(result["matches"]) for result in drone_results if result["in_range"]),
+            memory=True,
+        ):
+            write_match_results(results=drone_results, config=drone_config)
+
+seconds = time.perf_counter() - tic
+report = pd.concat(
+    [profile_to_frame(profile=stop_profile(), product=None, granule=None)] + granule_reports,
+    ignore_index=True,
+)
+summary = summarize_run_report(report=report)
+
+try:
+    version = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+except (OSError, subprocess.CalledProcessError):
+    version = None
+
+report = {
+    "version": version,
+    "created": str(pd.Timestamp.now()),
+    "python": platform.python_version(),
+    "parameters": vars(args),
+    "matching_engine": synthetic_config.get("matching_engine", "brute_force"),
+    "seconds": seconds,
+    "summary": json.loads(summary.reset_index().to_json(orient="records")),
+    "stages": json.loads(report.to_json(orient="records")),
+}
+
+output = args.output
+if output is None:
+    os.makedirs(f"{benchmark_path}{os.sep}results", exist_ok=True)
+    output = f"{benchmark_path}{os.sep}results{os.sep}benchmark_{pd.Timestamp.now():%Y%m%d_%H%M%S}.json"
+with open(output, "w") as fl:
+    json.dump(report, fl, indent=2)
+
+print(summary.to_string(float_format=lambda x: f"{x:.3f}"))
+print(f"Total: {seconds:.3f} sec. Results written to {output}")
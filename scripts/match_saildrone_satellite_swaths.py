@@ -1,18 +1,33 @@
+import argparse
 import os
 import pandas as pd
 import sys
 
-from calculations import (
-    great_circle_distance,
-    match_saildrone_satellite_point,
-    subset_saildrone_time,
-    get_saildrone_position_extrema,
+from cache import read_saildrone_cached
+from calculations import SaildroneFleet, SaildroneTrack
+from catalog import (
+    prune_granules_with_catalog,
+    read_satellite_catalog,
+    update_satellite_catalog,
 )
-from datetime import datetime
-from plot import (
-    plot_matching_point_locations,
-    plot_scatterplot_overlap,
-    plot_timeseries_swath_overlap,
+from figures import get_figure_jobs, render_figures
+from matching import (
+    check_product_variables,
+    empty_match_result,
+    get_loosest_config,
+    get_tolerance_configs,
+    match_fleet_files,
+    plan_incremental_matching,
+    write_tolerance_results,
+)
+from profiling import (
+    profile_stage,
+    profile_to_frame,
+    start_profile,
+    stop_profile,
+    summarize_run_report,
+    use_profiling,
+    write_run_report,
 )
 from read_write import (
     check_for_saildrone_data,
@@ -20,391 +35,292 @@ from read_write import (
     create_data_folder_structure,
     DS,
     fetch_repo_path,
-    get_sd_file_from_match_filename,
-    get_sat_file_from_match_filename,
+    get_product_configs,
+    get_run_configs,
+    get_saildrone_configs,
     read_config,
-    read_in_range_log,
-    read_matching_data_from_file,
-    read_matching_data_from_file_product,
-    read_not_in_range_log,
-    read_saildrone,
-    read_swath,
     register_new_dataset,
-    write_matching_data_to_file,
-    write_to_log,
 )
+from state import get_state_key, read_processed_granules
+from stats import get_collocation_table, write_collocation_table
 
 
 config = read_config()
 
-# create dir structure (in case something is missing)
-create_data_folder_structure(config=config)
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=None,
+    help="number of processes used to match satellite granules (overrides config)",
+)
+args = parser.parse_args()
+workers = args.workers if args.workers is not None else config.get("matching_workers", 1)
+
+# one config per satellite product (satellite_product can be a list)
+product_configs = get_product_configs(config=config)
+# and one per product and saildrone (fleet_saildrones)
+run_configs = get_run_configs(config=config)
 
-# register a new dataset (in case not registered yet)
-print(f"Working on dataset: {config['satellite_product']}")
-register_new_dataset(config=config)
 supported_datasets = [e.value for e in DS]
-if config["satellite_product"] not in supported_datasets:
-    print("     The processing for this dataset has not yet been implemented.")
-    print("     You will need to add a processing step before continuing.")
-    sys.exit()
+for product_config in product_configs:
+    # create dir structure (in case something is missing)
+    create_data_folder_structure(config=product_config)
+
+    # register a new dataset (in case not registered yet)
+    print(f"Working on dataset: {product_config['satellite_product']}")
+    register_new_dataset(config=product_config)
+    if product_config["satellite_product"] not in supported_datasets:
+        print("     The processing for this dataset has not yet been implemented.")
+        print("     You will need to add a processing step before continuing.")
+        sys.exit()
 
 
 if config["match_saildrone_satellite_swaths"]:
+    saildrone_configs = get_saildrone_configs(config=config)
     print(
-        f"Matching saildrone {config['saildrone_number']} "
-        + f"from {config['saildrone_year']} to "
-        + f"{config['satellite_product']} satellite swaths."
+        "Matching saildrone "
+        + ", ".join(f"{cfg['saildrone_number']} from {cfg['saildrone_year']}" for cfg in saildrone_configs)
+        + f" to {', '.join(cfg['satellite_product'] for cfg in product_configs)} satellite swaths."
     )
 
-    saildrone_filename = check_for_saildrone_data(config=config)
+    # wall time, rows and memory of each stage, for the run and per swath
+    profiling = use_profiling(config=config)
+    if profiling:
+        start_profile()
+    granule_reports = []
+
+    # the swaths to match, and how their results are written, per product and saildrone
+    product_runs = []
+    for run_config in run_configs:
+        satellite_filenames = check_for_satellite_data(config=run_config, append_datadir=False)
+        if len(satellite_filenames) == 0:
+            print(f"There are no {run_config['satellite_product']} satellite swath files available to process.")
+            continue
 
-    satellite_filenames = check_for_satellite_data(config=config, append_datadir=False)
-    if len(satellite_filenames) == 0:
-        print("There are no satellite swath files available to process.")
-        sys.exit()
+        # with a tolerance sweep, the swaths are matched once at the loosest
+        # tolerance, and the pairs are filtered into each tolerance
+        tolerance_configs = get_tolerance_configs(config=run_config)
+        match_config = get_loosest_config(configs=tolerance_configs)
+        if len(tolerance_configs) > 1:
+            print(
+                f"     Matching {run_config['satellite_product']} at "
+                + f"{match_config['saildrone_time_tolerance_min']} min / "
+                + f"{match_config['saildrone_distance_tolerance_km']} km, "
+                + f"for {len(tolerance_configs)} tolerances."
+            )
 
-    fls_in_range = read_in_range_log(config=config)
-    fls_not_in_range = read_not_in_range_log(config=config)
-    satellite_filenames = [
-        fl
-        for fl in satellite_filenames
-        if (fl not in fls_in_range) and (fl not in fls_not_in_range)
-    ]
+        processed = {
+            get_state_key(config=tolerance_config)[3]: read_processed_granules(config=tolerance_config)
+            for tolerance_config in tolerance_configs
+        }
+        processed_filenames = processed[get_state_key(config=run_config)[3]]
+        product_runs.append(
+            {
+                "config": run_config,
+                "drone": (str(run_config["saildrone_number"]), str(run_config["saildrone_year"])),
+                "tolerance_configs": tolerance_configs,
+                "match_config": match_config,
+                "processed": processed,
+                "filenames": [
+                    fl
+                    for fl in satellite_filenames
+                    if any(fl not in processed_tolerance for processed_tolerance in processed.values())
+                ],
+                "extended_filenames": [fl for fl in satellite_filenames if fl in processed_filenames],
+                "extensions": [],
+            }
+        )
 
-    if len(satellite_filenames) == 0:
-        print("All the satellite swaths have already been compared to this saildrone. ")
+    if len(product_runs) == 0:
         sys.exit()
 
-    saildrone_data = read_saildrone(
-        filename=saildrone_filename, config=config, masked_nan=True, to_pd=True
-    )
-    if config["time_range"]["limit"]:
-        saildrone_data = subset_saildrone_time(sd_data=saildrone_data, start_time=config["time_range"]["start_time"], end_time=config["time_range"]["end_time"])
-
-
-
-    filenames = []
-    matching_points = []
-    for num, fl in enumerate(satellite_filenames):
-        start_time = datetime.now()
-        print(f"     {num + 1}/{len(satellite_filenames)}: {fl}", end="")
-        swath_data = read_swath(
-            filename=fl, config=config, masked_nan=True, as_pd=True
-        )
-        if len(swath_data) == 0:
-            write_to_log(filename=fl, config=config, in_range=False)
-            print()
-            continue
-
-        saildrone_subset = subset_saildrone_time(
-            sd_data=saildrone_data,
-            start_time=swath_data.time.iloc[0],
-            end_time=swath_data.time.iloc[-1],
-        )
-        if len(saildrone_subset) == 0:
-            write_to_log(filename=fl, config=config, in_range=False)
-            print()
+    # the variables of each product are checked on one of its swaths, before matching any
+    checked_products = set()
+    for run in product_runs:
+        product = run["config"]["satellite_product"]
+        filenames = run["filenames"] + run["extended_filenames"]
+        if product in checked_products or len(filenames) == 0:
             continue
+        try:
+            check_product_variables(filename=filenames[0], config=run["config"])
+        except ValueError as error:
+            print(f"     {product}: {error}")
+            sys.exit(1)
+        checked_products.add(product)
+    if all(len(run["filenames"]) == 0 for run in product_runs) and not config.get("incremental_matching", True):
+        print("All the satellite swaths have already been compared to this saildrone. ")
+        sys.exit()
 
-        sd_extrema = get_saildrone_position_extrema(
-            sd_data=saildrone_subset,
-            buffer=config["saildrone_distance_tolerance_km"] / 10,
-        )
-        swath_data = swath_data[
-            (swath_data.lon >= sd_extrema["lonmin"])
-            & (swath_data.lon <= sd_extrema["lonmax"])
-            & (swath_data.lat >= sd_extrema["latmin"])
-            & (swath_data.lat <= sd_extrema["latmax"])
-        ]
-        if len(swath_data) == 0:
-            write_to_log(filename=fl, config=config, in_range=False)
-            print()
-            continue
-
-        tmp = swath_data.groupby("time")
-        satellite_patches = [
-            tmp.get_group(group).reset_index(drop=True) for group in tmp.groups
-        ]
-
-        swath_points = []
-        for patch in satellite_patches:
-            patch_time = patch.time.iloc[0]
-            dt = pd.Timedelta(minutes=config["saildrone_time_tolerance_min"])
-            saildrone_patch = subset_saildrone_time(
-                sd_data=saildrone_subset,
-                start_time=patch_time - dt,
-                end_time=patch_time + dt,
+    # each saildrone track is read once for all the products
+    saildrone_tracks = {}
+    for saildrone_config in saildrone_configs:
+        saildrone_filename = check_for_saildrone_data(config=saildrone_config)
+        with profile_stage(stage="read_saildrone", memory=True) as record:
+            saildrone_data = read_saildrone_cached(
+                filename=saildrone_filename, config=saildrone_config, masked_nan=True
             )
+            record["rows_out"] = len(saildrone_data)
+        saildrone_track = SaildroneTrack(sd_data=saildrone_data)
+        if config["time_range"]["limit"]:
+            saildrone_track = saildrone_track.subset_time(start_time=config["time_range"]["start_time"], end_time=config["time_range"]["end_time"])
+        saildrone_tracks[
+            (str(saildrone_config["saildrone_number"]), str(saildrone_config["saildrone_year"]))
+        ] = saildrone_track
+    saildrone_fleet = SaildroneFleet(tracks=saildrone_tracks)
+
+    for run in product_runs:
+        # swaths already compared to a shorter saildrone track are only compared
+        # to the new saildrone points
+        run["extensions"] = plan_incremental_matching(
+            filenames=run["extended_filenames"], sd_track=saildrone_tracks[run["drone"]], config=run["config"]
+        )
+    if all(len(run["filenames"]) == 0 and len(run["extensions"]) == 0 for run in product_runs):
+        print("All the satellite swaths have already been compared to this saildrone. ")
+        sys.exit()
 
-            if len(saildrone_patch) == 0:
-                continue
-
-            points = pd.DataFrame(
-                [],
-                columns=[
-                    "sd_lon",
-                    "sd_lat",
-                    "sd_time",
-                    "st_lon",
-                    "st_lat",
-                    "st_time",
+    if config.get("use_satellite_catalog", False):
+        catalogs = {}
+        for run in product_runs:
+            product = run["config"]["satellite_product"]
+            if product not in catalogs:
+                with profile_stage(stage="catalog", memory=True) as record:
+                    n_updated = update_satellite_catalog(config=run["config"])
+                    record["rows_out"] = n_updated
+                print(f"     Updated {n_updated} entries of the {product} granule catalog.")
+                catalogs[product] = read_satellite_catalog(config=run["config"])
+            catalog = catalogs[product]
+
+            with profile_stage(stage="prune_catalog", rows_in=len(run["filenames"]), memory=True) as record:
+                run["filenames"], pruned_filenames = prune_granules_with_catalog(
+                    filenames=run["filenames"], sd_track=saildrone_tracks[run["drone"]], config=run["match_config"]
+                )
+                record["rows_out"] = len(run["filenames"])
+            print(f"     Skipping {len(pruned_filenames)} granules outside the saildrone time/space range.")
+            write_tolerance_results(
+                results=[
+                    empty_match_result(
+                        filename=fl,
+                        sd_track=saildrone_tracks[run["drone"]],
+                        time_start=catalog.time_start.get(fl),
+                        time_end=catalog.time_end.get(fl),
+                    )
+                    for fl in pruned_filenames
                 ],
-                index=range(len(saildrone_patch) * len(patch)),
+                configs=run["tolerance_configs"],
+                processed=run["processed"],
             )
 
-            for sd_point in range(len(saildrone_patch)):
-                lon1 = saildrone_patch.lon.iloc[sd_point]
-                lat1 = saildrone_patch.lat.iloc[sd_point]
-                time1 = saildrone_patch.time.iloc[sd_point]
-                for st_point in range(len(patch)):
-                    lon2 = patch.lon.iloc[st_point]
-                    lat2 = patch.lat.iloc[st_point]
-                    time2 = patch.time.iloc[st_point]
-
-                    points.iloc[sd_point * len(patch) + st_point] = [
-                        lon1,
-                        lat1,
-                        time1,
-                        lon2,
-                        lat2,
-                        time2,
-                    ]
-
-            points["dist"] = points.apply(great_circle_distance, axis=1)
-            points = points[
-                points.dist <= config["saildrone_distance_tolerance_km"]
-            ].reset_index(drop=True)
-            if len(points) == 0:
-                continue
-
-            swath_points.append(points)
-
-        end_time = datetime.now()
-        dt = (end_time - start_time).total_seconds()
-
-        if len(swath_points) > 0:
-            print(f" ({dt:.2f} sec)", end="")
-            swath_points = pd.concat(swath_points).reset_index(drop=True)
-            print(f"; min distance: {swath_points.dist.min():.2f} km ")
-            write_to_log(filename=fl, config=config, in_range=True)
-            write_matching_data_to_file(
-                matching_data=swath_points, matching_file=fl, config=config
+    # (saildrone tracks, [(swath, {saildrone: product run}), ...], whether the
+    # swaths already have matching points) - each swath is read once for all
+    # the saildrones, and the swaths of all the products share the pool
+    main_tasks = {}
+    for run in product_runs:
+        for fl in run["filenames"]:
+            main_tasks.setdefault((run["config"]["satellite_product"], fl), {})[run["drone"]] = run
+    matching_runs = [
+        (saildrone_fleet, [(fl, drone_runs) for (_, fl), drone_runs in main_tasks.items()], False)
+    ]
+    for run in product_runs:
+        for new_track, filenames in run["extensions"]:
+            matching_runs.append(
+                (
+                    SaildroneFleet(tracks={run["drone"]: new_track}),
+                    [(fl, {run["drone"]: run}) for fl in filenames],
+                    True,
+                )
             )
-        else:
-            write_to_log(filename=fl, config=config, in_range=False)
-            print()
-
-        # _ = sort_log_file(config=config, in_range=True)
-        # _ = sort_log_file(config=config, in_range=False)
 
+    for sd_fleet, tasks, append in matching_runs:
+        if len(tasks) == 0:
+            continue
+        if append:
+            print(
+                f"     Matching the new saildrone data ({len(sd_fleet.tracks[sd_fleet.keys[0]])} points) "
+                + f"to {len(tasks)} satellite swaths already compared."
+            )
 
-if config["plot_saildrone_satellite_data_timeseries"]:
-    print(
-        f"Plotting the swath coverage of {config['saildrone_number']} from "
-        + f"{config['saildrone_year']} to "
-        + f"{config['satellite_product']} satellite swaths."
-    )
-
-    saildrone_filename = check_for_saildrone_data(config=config)
-
-    satellite_filenames = read_in_range_log(config=config)
-    if len(satellite_filenames) == 0:
-        print(
-            "     There are no satellite swaths that match the saildrone \nbased on the specified criteria."
+        results = match_fleet_files(
+            filenames=[fl for fl, _ in tasks],
+            fleet=sd_fleet,
+            configs=[
+                {drone: run["match_config"] for drone, run in drone_runs.items()}
+                for _, drone_runs in tasks
+            ],
+            workers=workers,
         )
-        sys.exit()
-
-    saildrone_data = read_saildrone(
-        filename=saildrone_filename, config=config, masked_nan=True, to_pd=True
-    )
-    match_data = read_matching_data_from_file(config=config, join_swaths=True)
-
-    filename = (
-        f"SD{config['saildrone_number']}."
-        + f"{config['saildrone_year']}_"
-        + f"{config['satellite_product']}_timeseries_overlap_"
-        + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km_"
-        + f"{config['saildrone_variable_name']}.png"
-    )
-    plot_timeseries_swath_overlap(
-        sd_data=saildrone_data, swath_match=match_data, filename=filename, config=config
-    )
-
-
-sd_var = config["saildrone_variable_name"]
-st_var = config["satellite_variable_name"]
+        # results waiting to be written, per product and saildrone
+        batches = {
+            id(run): (run, []) for _, drone_runs in tasks for run in drone_runs.values()
+        }
+        for num, ((fl, drone_runs), drone_results) in enumerate(zip(tasks, results)):
+            product = next(iter(drone_runs.values()))["config"]["satellite_product"]
+            product_label = f"{product} " if len(product_configs) > 1 else ""
+            print(f"     {num + 1}/{len(tasks)}: {product_label}{fl}", end="")
+            in_range = [drone for drone, result in drone_results.items() if result["in_range"]]
+            if len(in_range) > 0:
+                print(f" ({drone_results[in_range[0]]['elapsed']:.2f} sec)", end="")
+                for drone in in_range:
+                    drone_label = f"SD{drone[0]}.{drone[1]} " if len(saildrone_configs) > 1 else ""
+                    print(f"; {drone_label}min distance: {drone_results[drone]['matches'].dist.min():.2f} km ", end="")
+            print()
 
-if config["plot_saildrone_satellite_data_scatter"]:
-    print(
-        f"Plotting the scatterplot of {config['saildrone_number']} from "
-        + f"{config['saildrone_year']} to "
-        + f"{config['satellite_product']} satellite swaths."
-    )
+            for drone, run in drone_runs.items():
+                batch_results = batches[id(run)][1]
+                batch_results.append(drone_results[drone])
+
+                if len(batch_results) >= config.get("match_store_batch_size", 100):
+                    with profile_stage(stage="write", rows_in=len(batch_results), memory=True):
+                        write_tolerance_results(
+                            results=batch_results,
+                            configs=run["tolerance_configs"],
+                            processed=run["processed"],
+                            append=append,
+                        )
+                    batch_results.clear()
+
+            profile = next(iter(drone_results.values())).get("profile")
+            if profile is not None:
+                granule_reports.append(profile_to_frame(profile=profile, product=product, granule=fl))
+
+        for run, batch_results in batches.values():
+            with profile_stage(stage="write", rows_in=len(batch_results), memory=True):
+                write_tolerance_results(
+                    results=batch_results,
+                    configs=run["tolerance_configs"],
+                    processed=run["processed"],
+                    append=append,
+                )
 
-    satellite_filenames = read_in_range_log(config=config)
-    if len(satellite_filenames) == 0:
-        print(
-            "     There are no satellite swaths that match the saildrone \nbased on the specified criteria."
+    if profiling:
+        report = pd.concat(
+            [profile_to_frame(profile=stop_profile(), product=None, granule=None)] + granule_reports,
+            ignore_index=True,
         )
-        exit()
-    saildrone_filename = check_for_saildrone_data(config=config)
-
-    saildrone_data = read_saildrone(
-        filename=saildrone_filename, config=config, masked_nan=True, to_pd=True
-    )
-    saildrone_data = saildrone_data.set_index(["time", "lat", "lon"])
-
-    match_data = read_matching_data_from_file(config=config, join_swaths=False)
-
-    combined = []
-    nearest = []
-    mean = []
-    for nfl, fl in enumerate(satellite_filenames):
-        swath_data = read_swath(filename=fl, config=config, masked_nan=True, as_pd=True)
-        swath_data = swath_data.set_index(["time", "lat", "lon"])
-        swath_match_data = match_data[nfl]
-
-        tmp = match_saildrone_satellite_point(
-            match_data=swath_match_data,
-            sd_data=saildrone_data,
-            st_data=swath_data,
-            config=config,
+        report_path = write_run_report(
+            report=report,
+            folder=f"{fetch_repo_path()}{os.sep}{config['log_data_folder']}{os.sep}reports",
+            name="match",
         )
-        tmp = tmp.dropna(axis=0, thresh=5)
-        if len(tmp) > 0:
-            combined.append(tmp)
-            mean.append(
-                tmp.groupby("sd_time", as_index=False).mean().reset_index(drop=True)
-            )
-            nearest.append(
-                tmp.loc[tmp.groupby("sd_time").dist.idxmin()].reset_index(drop=True)
-            )
+        print(f"Time spent in each stage (run report: {report_path}):")
+        print(summarize_run_report(report=report).to_string(float_format=lambda x: f"{x:.2f}"))
 
-    if len(combined) > 0:
-        combined = pd.concat(combined).reset_index(drop=True)
-        nearest = pd.concat(nearest).reset_index(drop=True)
-        mean = pd.concat(mean).reset_index(drop=True)
 
-        filename = (
-            f"SD{config['saildrone_number']}."
-            + f"{config['saildrone_year']}_"
-            + f"{config['satellite_product']}_scatter_overlap_"
-            + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km_"
-            + f"{config['saildrone_variable_name']}.png"
-        )
-        plot_scatterplot_overlap(
-            combined_pts=combined,
-            mean_pts=mean,
-            nearest_pts=nearest,
-            filename=filename,
-        )
+if config.get("write_collocation_statistics", False):
+    print("Computing the collocation statistics.")
+    collocation_table = get_collocation_table(config=config)
+    print(f"     Written to {write_collocation_table(table=collocation_table, config=config)}")
 
 
-if config["plot_all_saildrones_scatter"]:
+# the figures of every saildrone, product, tolerance and variable, drawn in parallel
+# (figures whose inputs did not change since they were drawn are skipped)
+figure_jobs = get_figure_jobs(config=config)
+if len(figure_jobs) > 0:
+    figure_workers = config.get("figure_workers", 1)
+    print(f"Drawing {len(figure_jobs)} figures with {figure_workers} worker(s).")
+    statuses = render_figures(jobs=figure_jobs, workers=figure_workers)
     print(
-        f"Plotting the scatterplot of all saildrones from "
-        + f"to {config['satellite_product']} satellite swaths."
-    )
-
-    sd_dirs = sorted(
-        [
-            f"{fetch_repo_path()}{os.sep}{config['matching_data_folder']}{os.sep}{fl}"
-            for fl in os.listdir(
-                f"{fetch_repo_path()}{os.sep}{config['matching_data_folder']}"
-            )
-        ]
-    )
-
-    current_thresh = f"{config['satellite_product']}{os.sep}" + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km"
-    matching_fls = [
-        [
-            f"{sdir}{os.sep}{current_thresh}{os.sep}{fl}"
-            for fl in os.listdir(f"{sdir}{os.sep}{current_thresh}")
-        ]
-        for sdir in sd_dirs
-    ]
-
-    combined = []
-    mean = []
-    nearest = []
-    matching_data = {}
-    sd_files = []
-    for sd_fls in matching_fls:
-        if len(sd_fls) == 0:
-            continue
-        sd_filename = get_sd_file_from_match_filename(filename=sd_fls[0], config=config)
-        sd_files.append(sd_filename)
-        sd_data = read_saildrone(
-            filename=sd_filename, config=config, masked_nan=True, to_pd=True
-        )
-        sd_data = sd_data.set_index(["time", "lat", "lon"])
-
-        tmp = []
-        for fl in sd_fls:
-            match_data = read_matching_data_from_file_product(filename=fl)
-            sat_filename = get_sat_file_from_match_filename(filename=fl, config=config)
-            sat_data = read_swath(
-                filename=sat_filename, config=config, masked_nan=True, as_pd=True
-            )
-            sat_data = sat_data.set_index(["time", "lat", "lon"])
-
-            comparison = match_saildrone_satellite_point(
-                match_data=match_data,
-                sd_data=sd_data,
-                st_data=sat_data,
-                config=config,
-            )
-            comparison = comparison.dropna(thresh=5)
-
-            if len(comparison) == 0:
-                continue
-
-            tmp.append(match_data)
-            combined.append(comparison)
-            mean.append(
-                comparison.groupby("sd_time", as_index=False)
-                .mean()
-                .reset_index(drop=True)
-            )
-            nearest.append(
-                comparison.loc[comparison.groupby("sd_time").dist.idxmin()].reset_index(
-                    drop=True
-                )
-            )
-        matching_data[sd_filename] = tmp
-
-    combined = pd.concat(combined)
-    nearest = pd.concat(nearest)
-    mean = pd.concat(mean)
-    combined = combined.sort_values(by=["sd_time", "st_time"]).reset_index(drop=True)
-    nearest = nearest.sort_values(by=["sd_time", "st_time"]).reset_index(drop=True)
-    mean = mean.sort_values(by=["sd_time", "st_time"]).reset_index(drop=True)
-
-    filename = (
-        f"SD_"
-        + f"{config['satellite_product']}_scatter_overlap_"
-        + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km_"
-        + f"{config['saildrone_variable_name']}.png"
-    )
-    plot_scatterplot_overlap(
-        combined_pts=combined,
-        mean_pts=mean,
-        nearest_pts=nearest,
-        filename=filename,
-    )
-
-    filename = (
-        f"SD_"
-        + f"{config['satellite_product']}_matching_points_locations_"
-        + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km_"
-        + f"{config['saildrone_variable_name']}.png"
-    )
-    title = f"(SD - {config['satellite_product']}) matching point locations"
-    plot_matching_point_locations(
-        match_data=matching_data,
-        sd_fls=sd_files,
-        config=config,
-        filename=filename,
-        title=title,
+        "     "
+        + ", ".join(f"{statuses.count(status)} {status}" for status in ["drawn", "skipped", "empty"])
+        + "."
     )
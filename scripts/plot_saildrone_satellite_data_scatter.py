@@ -1,88 +1,10 @@
-import pandas as pd
-
-from calculations import (
-    match_saildrone_satellite_point,
-)
-from plot import (
-    plot_scatterplot_overlap,
-)
-from read_write import (
-    check_for_saildrone_data,
-    read_config,
-    read_in_range_log,
-    read_matching_data_from_file,
-    read_saildrone,
-    read_swath,
-)
+from figures import get_figure_filenames, get_figure_jobs, render_figures
+from read_write import read_config
 
 
 config = read_config()
 
-
-sd_var = config["saildrone_variable_name"]
-st_var = config["satellite_variable_name"]
-
-if config["plot_saildrone_satellite_data_scatter"]:
-    print(
-        f"Plotting the scatterplot of {config['saildrone_number']} from "
-        + f"{config['saildrone_year']} to "
-        + f"{config['satellite_product']} satellite swaths."
-    )
-
-    satellite_filenames = read_in_range_log(config=config)
-    if len(satellite_filenames) == 0:
-        print(
-            "     There are no satellite swaths that match the saildrone \nbased on the specified criteria."
-        )
-        exit()
-    saildrone_filename = check_for_saildrone_data(config=config)
-
-    saildrone_data = read_saildrone(
-        filename=saildrone_filename, config=config, masked_nan=True, to_pd=True
-    )
-    saildrone_data = saildrone_data.set_index(["time", "lat", "lon"])
-
-    match_data = read_matching_data_from_file(config=config, join_swaths=False)
-
-    combined = []
-    nearest = []
-    mean = []
-    for nfl, fl in enumerate(satellite_filenames):
-        swath_data = read_swath(filename=fl, config=config, masked_nan=True, as_pd=True)
-        swath_data = swath_data.set_index(["time", "lat", "lon"])
-        swath_match_data = match_data[nfl]
-
-        tmp = match_saildrone_satellite_point(
-            match_data=swath_match_data,
-            sd_data=saildrone_data,
-            st_data=swath_data,
-            config=config,
-        )
-        tmp = tmp.dropna(axis=0, thresh=5)
-        if len(tmp) > 0:
-            combined.append(tmp)
-            mean.append(
-                tmp.groupby("sd_time", as_index=False).mean().reset_index(drop=True)
-            )
-            nearest.append(
-                tmp.loc[tmp.groupby("sd_time").dist.idxmin()].reset_index(drop=True)
-            )
-
-    if len(combined) > 0:
-        combined = pd.concat(combined).reset_index(drop=True)
-        nearest = pd.concat(nearest).reset_index(drop=True)
-        mean = pd.concat(mean).reset_index(drop=True)
-
-        filename = (
-            f"SD{config['saildrone_number']}."
-            + f"{config['saildrone_year']}_"
-            + f"{config['satellite_product']}_scatter_overlap_"
-            + f"{config['saildrone_variable_name']}.png"
-        )
-        plot_scatterplot_overlap(
-            combined_pts=combined,
-            mean_pts=mean,
-            nearest_pts=nearest,
-            filename=filename,
-        )
-
+jobs = [job for job in get_figure_jobs(config=config) if job[0] == "scatter"]
+statuses = render_figures(jobs=jobs, workers=config.get("figure_workers", 1))
+for (kind, job_config), status in zip(jobs, statuses):
+    print(f"     {', '.join(get_figure_filenames(kind=kind, config=job_config))}: {status}")
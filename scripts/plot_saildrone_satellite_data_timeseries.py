@@ -1,50 +1,10 @@
-
-import sys
-
-from plot import (
-    plot_timeseries_swath_overlap,
-)
-from read_write import (
-    check_for_saildrone_data,
-    read_config,
-    read_in_range_log,
-    read_matching_data_from_file,
-    read_saildrone,
-)
+from figures import get_figure_filenames, get_figure_jobs, render_figures
+from read_write import read_config
 
 
 config = read_config()
 
-
-if config["plot_saildrone_satellite_data_timeseries"]:
-    print(
-        f"Plotting the swath coverage of {config['saildrone_number']} from "
-        + f"{config['saildrone_year']} to "
-        + f"{config['satellite_product']} satellite swaths."
-    )
-
-    saildrone_filename = check_for_saildrone_data(config=config)
-
-    satellite_filenames = read_in_range_log(config=config)
-    if len(satellite_filenames) == 0:
-        print(
-            "     There are no satellite swaths that match the saildrone \nbased on the specified criteria."
-        )
-        sys.exit()
-
-    saildrone_data = read_saildrone(
-        filename=saildrone_filename, config=config, masked_nan=True, to_pd=True
-    )
-    match_data = read_matching_data_from_file(config=config, join_swaths=True)
-
-    filename = (
-        f"SD{config['saildrone_number']}."
-        + f"{config['saildrone_year']}_"
-        + f"{config['satellite_product']}_timeseries_overlap_"
-        + f"{config['saildrone_variable_name']}.png"
-    )
-    plot_timeseries_swath_overlap(
-        sd_data=saildrone_data, swath_match=match_data, filename=filename, config=config
-    )
-
-
+jobs = [job for job in get_figure_jobs(config=config) if job[0] == "timeseries"]
+statuses = render_figures(jobs=jobs, workers=config.get("figure_workers", 1))
+for (kind, job_config), status in zip(jobs, statuses):
+    print(f"     {', '.join(get_figure_filenames(kind=kind, config=job_config))}: {status}")
@@ -0,0 +1,11 @@
+from read_write import read_config
+from stats import get_collocation_table, write_collocation_table
+
+
+# always written when run on its own (write_collocation_statistics only
+# controls the table written at the end of the matching script)
+config = read_config()
+
+table = get_collocation_table(config=config)
+print(table.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+print(f"Written to {write_collocation_table(table=table, config=config)}")
@@ -0,0 +1,28 @@
+import os
+import pytest
+import sys
+import yaml
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_PATH, "util"))
+
+
+@pytest.fixture
+def repo_config(tmp_path, monkeypatch) -> dict:
+    """
+    config = repo_config
+
+    Returns:
+    - config: the repository config, with every folder inside an empty
+        temporary "saildrone_satellite" directory, which is also the working
+        directory (fetch_repo_path looks for that name).
+    """
+    from synthetic import get_synthetic_config
+
+    repo = tmp_path / "saildrone_satellite"
+    repo.mkdir()
+    monkeypatch.chdir(repo)
+    with open(os.path.join(REPO_PATH, "config.yaml")) as fl:
+        config = yaml.safe_load(fl)
+
+    return {**get_synthetic_config(config=config, folder="synthetic"), "use_cache": False}
@@ -0,0 +1,88 @@
+import os
+import pandas as pd
+
+from figures import get_figure_key
+from read_write import check_for_saildrone_data, fetch_repo_path, write_matching_data_to_store
+from synthetic import generate_synthetic_data
+
+
+def make_scatter_config(config: dict, recorded: bool) -> tuple:
+    """
+    Synthetic ASCAT granules over one saildrone, with matching points for the
+    first one, whose wind speeds are recorded or not.
+    """
+    datasets = generate_synthetic_data(
+        config=config,
+        products=["ASCAT"],
+        n_saildrones=1,
+        n_track_points=100,
+        n_granules=2,
+        n_rows=10,
+        n_cells=5,
+        density=1.0,
+        overlap=1.0,
+    )
+    sd_number, sd_year = datasets["saildrones"][0]
+    config = {**config, "satellite_product": "ASCAT", "saildrone_number": sd_number, "saildrone_year": sd_year}
+    assert check_for_saildrone_data(config=config) is not None
+
+    time = pd.date_range("2021-08-15", periods=3, freq="min").astype("datetime64[ns]")
+    matches = pd.DataFrame(
+        {
+            "sd_lon": [-60.0, -59.9, -59.8],
+            "sd_lat": [10.0, 10.1, 10.2],
+            "sd_time": time,
+            "st_lon": [-60.0, -59.9, -59.8],
+            "st_lat": [10.0, 10.1, 10.2],
+            "st_time": time,
+            "dist": [1.0, 2.0, 3.0],
+        }
+    )
+    if recorded:
+        matches["sd_wind_speed"] = [5.0, 6.0, 7.0]
+        matches["st_wind_speed"] = [5.5, 6.5, 7.5]
+    filenames = datasets["granules"]["ASCAT"]
+    write_matching_data_to_store(matching_data=[matches], matching_files=[filenames[0]], config=config)
+
+    path = f"{fetch_repo_path()}{os.sep}{config['satellite_data_folder']}{os.sep}ASCAT"
+    return config, [f"{path}{os.sep}{fl}" for fl in filenames]
+
+
+def touch(path: str):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 100))
+
+
+def test_figure_key_follows_the_swaths_read_again(repo_config):
+    config, swath_paths = make_scatter_config(config=repo_config, recorded=False)
+    key = get_figure_key(kind="scatter", config=config)
+
+    # a swath without matching points is not read
+    touch(swath_paths[1])
+    assert get_figure_key(kind="scatter", config=config) == key
+    touch(swath_paths[0])
+    assert get_figure_key(kind="scatter", config=config) != key
+    # nor by the timeseries
+    key = get_figure_key(kind="timeseries", config=config)
+    touch(swath_paths[0])
+    assert get_figure_key(kind="timeseries", config=config) == key
+
+
+def test_figure_key_ignores_the_swaths_with_recorded_values(repo_config):
+    config, swath_paths = make_scatter_config(config=repo_config, recorded=True)
+    key = get_figure_key(kind="scatter", config=config)
+
+    touch(swath_paths[0])
+    assert get_figure_key(kind="scatter", config=config) == key
+
+
+def test_figure_key_follows_the_recorded_variables(repo_config):
+    config, _ = make_scatter_config(config=repo_config, recorded=True)
+    key = get_figure_key(kind="scatter", config=config)
+
+    for name, value in [
+        ("match_saildrone_variables", ["wind_direction"]),
+        ("match_satellite_variables", ["wind_direction"]),
+        ("figure_variables", [["wind_direction", "wind_direction"]]),
+    ]:
+        assert get_figure_key(kind="scatter", config={**config, name: value}) != key, name
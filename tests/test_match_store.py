@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from read_write import (
+    read_all_matching_data,
+    read_matching_data_from_file,
+    read_stored_granules,
+    read_swath_matching_data,
+    write_matching_data_to_file,
+    write_matching_data_to_store,
+    write_to_log,
+)
+from state import read_in_range_granules, read_processed_granules
+
+
+def make_matches(n_points: int, start: str) -> pd.DataFrame:
+    time = pd.date_range(start, periods=n_points, freq="min").astype("datetime64[ns]")
+    return pd.DataFrame(
+        {
+            "sd_lon": np.linspace(-60, -59, n_points),
+            "sd_lat": np.linspace(10, 11, n_points),
+            "sd_time": time,
+            "st_lon": np.linspace(-60, -59, n_points) + 0.01,
+            "st_lat": np.linspace(10, 11, n_points) + 0.01,
+            "st_time": time + pd.Timedelta(seconds=30),
+            "dist": np.linspace(1, 20, n_points),
+        }
+    )
+
+
+def test_empty_store_is_typed(repo_config):
+    data = read_matching_data_from_file(config=repo_config, join_swaths=True)
+
+    assert len(data) == 0
+    assert data.sd_time.dtype == "datetime64[ns]"
+    assert data.st_time.dtype == "datetime64[ns]"
+    assert data.dist.dtype == "float64"
+    assert len(data.sd_time.dt.date) == 0
+
+
+def test_csv_matches_are_imported_once(repo_config, tmp_path):
+    csv_config = {**repo_config, "match_store_format": "csv"}
+    matches = {"ascat_20210815_000000_l2.nc": make_matches(5, "2021-08-15"), "ascat_20210816_000000_l2.nc": make_matches(3, "2021-08-16")}
+    (tmp_path / "saildrone_satellite" / csv_config["matching_data_folder"] / "SD1031_2021" / "ASCAT").mkdir(parents=True)
+    for granule, data in matches.items():
+        write_matching_data_to_file(matching_data=data, matching_file=granule, config=csv_config)
+
+    for _ in range(2):
+        store_data = read_matching_data_from_file(config=repo_config, join_swaths=True)
+        assert len(store_data) == 8
+        assert sorted(store_data.granule.unique()) == ["ascat_20210815_000000_l2", "ascat_20210816_000000_l2"]
+        assert store_data.sd_time.dtype == "datetime64[ns]"
+
+    swaths = read_matching_data_from_file(config=repo_config, join_swaths=False)
+    pd.testing.assert_frame_equal(swaths[0], matches["ascat_20210815_000000_l2.nc"])
+
+    sd_path = tmp_path / "saildrone_satellite" / repo_config["saildrone_data_folder"] / "nc"
+    sd_path.mkdir(parents=True)
+    (sd_path / "sd1031_2021.nc").touch()
+    all_data = read_all_matching_data(config=repo_config)
+    assert [granule for granule, _ in all_data["sd1031_2021.nc"]] == sorted(
+        name.removesuffix(".nc") for name in matches
+    )
+
+
+def test_logged_granules_without_matches_are_not_imported(repo_config, tmp_path):
+    log_config = {**repo_config, "match_store_format": "csv", "processing_state": "log"}
+    (tmp_path / "saildrone_satellite" / log_config["matching_data_folder"] / "SD1031_2021" / "ASCAT").mkdir(parents=True)
+    (tmp_path / "saildrone_satellite" / log_config["log_data_folder"]).mkdir(parents=True)
+    write_matching_data_to_file(
+        matching_data=make_matches(4, "2021-08-15"), matching_file="ascat_20210815_000000_l2.nc", config=log_config
+    )
+    for granule in ["ascat_20210815_000000_l2.nc", "ascat_20210816_000000_l2.nc"]:
+        write_to_log(filename=granule, config=log_config, in_range=True)
+    write_to_log(filename="ascat_20210817_000000_l2.nc", config=log_config, in_range=False)
+
+    # the granule logged in range without its matching points is left to be matched again
+    assert read_in_range_granules(config=repo_config) == ["ascat_20210815_000000_l2.nc"]
+    assert read_processed_granules(config=repo_config) == {
+        "ascat_20210815_000000_l2.nc",
+        "ascat_20210817_000000_l2.nc",
+    }
+    assert read_stored_granules(config=repo_config) == {"ascat_20210815_000000_l2.nc"}
+
+
+def test_swath_matching_data_is_named_by_swath(repo_config, tmp_path):
+    matches = {
+        "ascat_20210815_000000_l2.nc": make_matches(5, "2021-08-15"),
+        "ascat_20210816_000000_l2.nc": make_matches(3, "2021-08-16"),
+        "ascat_20210817_000000_l2.nc": make_matches(2, "2021-08-17"),
+    }
+    # written out of order, in two batches
+    for granules in [["ascat_20210817_000000_l2.nc"], ["ascat_20210816_000000_l2.nc", "ascat_20210815_000000_l2.nc"]]:
+        write_matching_data_to_store(
+            matching_data=[matches[granule] for granule in granules], matching_files=granules, config=repo_config
+        )
+
+    match_data = read_swath_matching_data(config=repo_config)
+    assert [granule for granule, _ in match_data] == sorted(matches)
+    for granule, data in match_data:
+        pd.testing.assert_frame_equal(data, matches[granule])
+
+    csv_config = {**repo_config, "match_store_format": "csv"}
+    (tmp_path / "saildrone_satellite" / csv_config["matching_data_folder"] / "SD1031_2021" / "ASCAT").mkdir(parents=True)
+    for granule in ["ascat_20210815_000000_l2.nc", "ascat_20210817_000000_l2.nc"]:
+        write_matching_data_to_file(matching_data=matches[granule], matching_file=granule, config=csv_config)
+    match_data = read_swath_matching_data(config=csv_config)
+    assert [granule for granule, _ in match_data] == ["ascat_20210815_000000_l2", "ascat_20210817_000000_l2"]
+    pd.testing.assert_frame_equal(match_data[1][1], matches["ascat_20210817_000000_l2.nc"], check_dtype=False)
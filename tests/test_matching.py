@@ -0,0 +1,269 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculations import (
+    match_saildrone_satellite_point,
+    match_swath_brute_force,
+    match_swath_kdtree,
+    SaildroneFleet,
+    SaildroneTrack,
+)
+from math import acos, cos, radians, sin
+from matching import (
+    filter_match_result,
+    get_loosest_config,
+    get_tolerance_configs,
+    match_swath_file,
+    plan_incremental_matching,
+    write_match_results,
+)
+from read_write import check_for_saildrone_data, read_saildrone, read_swath, read_swath_matching_data
+from synthetic import generate_synthetic_data
+
+PAIR_COLUMNS = ["sd_lon", "sd_lat", "sd_time", "st_lon", "st_lat", "st_time"]
+
+
+@pytest.fixture
+def matching_data(repo_config) -> tuple:
+    """
+    config, filenames, sd_data = matching_data
+
+    Synthetic ASCAT granules over one saildrone track, matched at 2 min / 25 km.
+    """
+    datasets = generate_synthetic_data(
+        config=repo_config,
+        products=["ASCAT"],
+        n_saildrones=1,
+        n_track_points=600,
+        n_granules=4,
+        n_rows=40,
+        n_cells=10,
+        density=0.9,
+        overlap=1.0,
+    )
+    sd_number, sd_year = datasets["saildrones"][0]
+    config = {
+        **repo_config,
+        "satellite_product": "ASCAT",
+        "saildrone_number": sd_number,
+        "saildrone_year": sd_year,
+        "saildrone_time_tolerance_min": 2,
+        "saildrone_distance_tolerance_km": 25,
+        "matching_engine": "brute_force",
+    }
+    sd_data = read_saildrone(filename=check_for_saildrone_data(config=config), config=config, masked_nan=True, to_pd=True)
+
+    return config, datasets["granules"]["ASCAT"], sd_data
+
+
+def match_point_loop(sd_data: pd.DataFrame, st_data: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """
+    The matching of the first version: the swath is split into patches of
+    equal time, and every saildrone point within the time tolerance of the
+    patch is compared to every point of the patch, one pair at a time.
+    """
+    dt = pd.Timedelta(minutes=config["saildrone_time_tolerance_min"])
+    rows = []
+    for patch_time, patch in st_data.groupby("time"):
+        saildrone_patch = sd_data[(patch_time - dt <= sd_data.time) & (sd_data.time <= patch_time + dt)]
+        for sd_point in saildrone_patch.itertuples():
+            for st_point in patch.itertuples():
+                lon1, lat1, lon2, lat2 = map(radians, [sd_point.lon, sd_point.lat, st_point.lon, st_point.lat])
+                cos_angle = sin(lat1) * sin(lat2) + cos(lat1) * cos(lat2) * cos(lon1 - lon2)
+                dist = 6371.0 * acos(min(1.0, max(-1.0, cos_angle)))
+                if dist <= config["saildrone_distance_tolerance_km"]:
+                    rows.append(
+                        [sd_point.lon, sd_point.lat, sd_point.time, st_point.lon, st_point.lat, st_point.time, dist]
+                    )
+
+    return pd.DataFrame(rows, columns=PAIR_COLUMNS + ["dist"])
+
+
+def match_values_point_loop(match_data: pd.DataFrame, sd_data: pd.DataFrame, st_data: pd.DataFrame, config: dict):
+    """
+    The saildrone and satellite values of the matching points, looked up one
+    pair at a time as in the first version.
+    """
+    rows = []
+    for row in match_data.itertuples():
+        st_value = st_data.loc[(row.st_time, row.st_lat, row.st_lon), config["satellite_variable_name"]]
+        try:
+            sd_value = sd_data.loc[(row.sd_time, row.sd_lat, row.sd_lon), config["saildrone_variable_name"]]
+        except KeyError:
+            sd_value = np.nan
+        rows.append([row.sd_time, row.st_time, row.dist, sd_value, st_value])
+
+    return pd.DataFrame(rows, columns=["sd_time", "st_time", "dist", "sd_var", "st_var"]).astype(
+        {"dist": float, "sd_var": float, "st_var": float}
+    )
+
+
+def sort_pairs(points: pd.DataFrame) -> pd.DataFrame:
+    points = points[PAIR_COLUMNS + ["dist"]].astype({"sd_time": "datetime64[ns]", "st_time": "datetime64[ns]"})
+    return points.sort_values(by=PAIR_COLUMNS).reset_index(drop=True)
+
+
+def read_swath_points(filename: str, config: dict) -> pd.DataFrame:
+    return read_swath(filename=filename, config=config, masked_nan=True, as_pd=True)
+
+
+def test_brute_force_matches_the_point_loop(matching_data):
+    config, filenames, sd_data = matching_data
+    sd_track = SaildroneTrack(sd_data=sd_data)
+
+    n_pairs = 0
+    for filename in filenames:
+        st_data = read_swath_points(filename, config)
+        expected = sort_pairs(match_point_loop(sd_data=sd_data, st_data=st_data, config=config))
+        points = match_swath_brute_force(sd_track=sd_track, st_data=st_data, config=config)
+        pd.testing.assert_frame_equal(sort_pairs(points), expected, check_exact=False, atol=1e-6)
+
+        # as in the first version, the swath is only compared to the saildrone points within its time range
+        sd_subset = sd_data[(sd_data.time >= st_data.time.min()) & (sd_data.time <= st_data.time.max())]
+        expected = sort_pairs(match_point_loop(sd_data=sd_subset, st_data=st_data, config=config))
+        result = match_swath_file(filename=filename, sd_track=sd_track, config=config)
+        assert result["in_range"] == (len(expected) > 0)
+        if result["in_range"]:
+            pd.testing.assert_frame_equal(sort_pairs(result["matches"]), expected, check_exact=False, atol=1e-6)
+        n_pairs += len(expected)
+
+    assert n_pairs > 0
+
+
+def test_point_values_match_the_point_loop(matching_data):
+    config, filenames, sd_data = matching_data
+    sd_track = SaildroneTrack(sd_data=sd_data)
+    sd_indexed = sd_data.set_index(["time", "lat", "lon"])
+
+    for filename in filenames:
+        st_data = read_swath_points(filename, config)
+        points = match_swath_brute_force(sd_track=sd_track, st_data=st_data, config=config)
+        st_indexed = st_data.set_index(["time", "lat", "lon"])
+
+        values = match_saildrone_satellite_point(match_data=points, sd_data=sd_indexed, st_data=st_indexed, config=config)
+        expected = match_values_point_loop(match_data=points, sd_data=sd_indexed, st_data=st_indexed, config=config)
+        pd.testing.assert_frame_equal(values, expected, check_dtype=False)
+
+
+def test_kdtree_matches_brute_force(matching_data):
+    config, filenames, sd_data = matching_data
+    sd_track = SaildroneTrack(sd_data=sd_data)
+
+    for filename in filenames:
+        st_data = read_swath_points(filename, config)
+        brute_force = match_swath_brute_force(sd_track=sd_track, st_data=st_data, config=config)
+        kdtree = match_swath_kdtree(sd_track=sd_track, st_data=st_data, config=config)
+        pd.testing.assert_frame_equal(kdtree, brute_force)
+
+        results = [
+            match_swath_file(filename=filename, sd_track=sd_track, config={**config, "matching_engine": engine})
+            for engine in ["brute_force", "kdtree"]
+        ]
+        assert results[0]["in_range"] == results[1]["in_range"]
+        if results[0]["in_range"]:
+            pd.testing.assert_frame_equal(results[1]["matches"], results[0]["matches"])
+
+
+def test_saildrone_track_time_windows():
+    rng = np.random.default_rng(0)
+    time = pd.Timestamp("2021-08-15") + pd.to_timedelta(rng.permutation(500), unit="min")
+    sd_data = pd.DataFrame({"time": time, "lon": rng.random(500), "lat": rng.random(500)})
+    track = SaildroneTrack(sd_data=sd_data)
+
+    assert (np.diff(track.time) > np.timedelta64(0)).all()
+    for start, end in [(-10, 20), (100, 100), (250.5, 300.5), (480, 600), (700, 800), (50, 40)]:
+        start_time = pd.Timestamp("2021-08-15") + pd.Timedelta(minutes=start)
+        end_time = pd.Timestamp("2021-08-15") + pd.Timedelta(minutes=end)
+        inside = (sd_data.time >= start_time) & (sd_data.time <= end_time)
+
+        subset = track.subset_time(start_time=start_time, end_time=end_time)
+        expected = sd_data[inside].sort_values(by="time").reset_index(drop=True)
+        pd.testing.assert_frame_equal(subset.data.reset_index(drop=True), expected)
+        assert (subset.time == expected.time.to_numpy()).all()
+
+        excluded = track.exclude_time(start_time=start_time, end_time=end_time)
+        expected = sd_data[~inside].sort_values(by="time").reset_index(drop=True)
+        pd.testing.assert_frame_equal(excluded.data.reset_index(drop=True), expected)
+
+    tracks = {
+        key: track.subset_time(
+            start_time=pd.Timestamp("2021-08-15") + pd.Timedelta(minutes=start),
+            end_time=pd.Timestamp("2021-08-15") + pd.Timedelta(minutes=end),
+        )
+        for key, (start, end) in enumerate([(0, 100), (50, 60), (200, 400), (450, 499), (600, 700)])
+    }
+    fleet = SaildroneFleet(tracks=tracks)
+    for start, end in [(0, 10), (55, 210), (101, 199), (420, 460), (-100, 1000)]:
+        start_time = pd.Timestamp("2021-08-15") + pd.Timedelta(minutes=start)
+        end_time = pd.Timestamp("2021-08-15") + pd.Timedelta(minutes=end)
+        expected = [
+            key
+            for key, sd_track in tracks.items()
+            if len(sd_track) > 0 and sd_track.time[0] <= end_time and sd_track.time[-1] >= start_time
+        ]
+        assert sorted(fleet.overlapping(start_time=start_time, end_time=end_time)) == expected
+
+
+def test_tolerance_sweep_filters_the_loosest_matches(matching_data):
+    config, filenames, sd_data = matching_data
+    sd_track = SaildroneTrack(sd_data=sd_data)
+    configs = get_tolerance_configs(
+        config={**config, "tolerance_sweep_time_min": [1, 2], "tolerance_sweep_distance_km": [10, 25]}
+    )
+    assert len(configs) == 4
+    loosest = get_loosest_config(configs=configs)
+
+    n_pairs = {}
+    for filename in filenames:
+        loose_result = match_swath_file(filename=filename, sd_track=sd_track, config=loosest)
+        for tolerance_config in configs:
+            filtered = filter_match_result(result=loose_result, config=tolerance_config)
+            expected = match_swath_file(filename=filename, sd_track=sd_track, config=tolerance_config)
+            assert filtered["in_range"] == expected["in_range"]
+            if expected["in_range"]:
+                pd.testing.assert_frame_equal(filtered["matches"], expected["matches"])
+                key = (tolerance_config["saildrone_time_tolerance_min"], tolerance_config["saildrone_distance_tolerance_km"])
+                n_pairs[key] = n_pairs.get(key, 0) + len(expected["matches"])
+
+    assert n_pairs[(1, 10)] < n_pairs[(2, 25)]
+
+
+def test_incremental_matching_adds_the_new_saildrone_points(matching_data):
+    config, filenames, sd_data = matching_data
+    sd_track = SaildroneTrack(sd_data=sd_data)
+    first_track = sd_track.subset_time(start_time=sd_track.time[0], end_time=sd_track.time[len(sd_track) // 2])
+
+    # matched against the first half of the track, then against the telemetry added since
+    write_match_results(
+        results=[match_swath_file(filename=fl, sd_track=first_track, config=config) for fl in filenames],
+        config=config,
+    )
+    extensions = plan_incremental_matching(filenames=filenames, sd_track=sd_track, config=config)
+    assert len(extensions) > 0
+    for new_track, extended_filenames in extensions:
+        assert len(new_track) == len(sd_track) - len(first_track)
+        write_match_results(
+            results=[match_swath_file(filename=fl, sd_track=new_track, config=config) for fl in extended_filenames],
+            config=config,
+            append=True,
+        )
+
+    # matched against the whole track at once
+    full_config = {
+        **config,
+        "matching_data_folder": f"{config['matching_data_folder']}_full",
+        "log_data_folder": f"{config['log_data_folder']}_full",
+    }
+    write_match_results(
+        results=[match_swath_file(filename=fl, sd_track=sd_track, config=full_config) for fl in filenames],
+        config=full_config,
+    )
+
+    incremental = read_swath_matching_data(config=config)
+    full = read_swath_matching_data(config=full_config)
+    assert [granule for granule, _ in incremental] == [granule for granule, _ in full]
+    assert len(full) > 0
+    for (_, incremental_data), (_, full_data) in zip(incremental, full):
+        pd.testing.assert_frame_equal(sort_pairs(incremental_data), sort_pairs(full_data))
+    assert plan_incremental_matching(filenames=filenames, sd_track=sd_track, config=config) == []
@@ -0,0 +1,56 @@
+import pytest
+
+from matching import check_product_variables
+from read_write import get_product_configs
+from synthetic import generate_synthetic_data
+
+
+SMAP_VARIABLES = {
+    "satellite_variable_name": "salinity_70km",
+    "match_satellite_variables": ["salinity_70km"],
+    "figure_variables": [["ocean_salinity", "salinity_70km"]],
+}
+
+
+def test_product_configs_use_the_product_variables(repo_config):
+    config = {**repo_config, "satellite_product": ["ASCAT", "SMAP"], "product_variables": {"SMAP": SMAP_VARIABLES}}
+
+    ascat_config, smap_config = get_product_configs(config=config)
+
+    assert ascat_config["satellite_product"] == "ASCAT"
+    assert ascat_config["satellite_variable_name"] == "wind_speed"
+    assert ascat_config["match_satellite_variables"] == ["wind_speed"]
+    assert smap_config["satellite_product"] == "SMAP"
+    for key, value in SMAP_VARIABLES.items():
+        assert smap_config[key] == value
+
+    with pytest.raises(ValueError, match="saildrone_variable_name cannot be set per product"):
+        get_product_configs(config={**config, "product_variables": {"SMAP": {"saildrone_variable_name": "sal"}}})
+
+
+def test_product_variables_are_checked_before_matching(repo_config):
+    datasets = generate_synthetic_data(
+        config=repo_config,
+        products=["ASCAT", "SMAP"],
+        n_saildrones=1,
+        n_track_points=100,
+        n_granules=1,
+        n_rows=10,
+        n_cells=5,
+        density=1.0,
+        overlap=1.0,
+    )
+    config = {**repo_config, "satellite_product": ["ASCAT", "SMAP"], "figure_variables": []}
+
+    ascat_config, smap_config = get_product_configs(config=config)
+    check_product_variables(filename=datasets["granules"]["ASCAT"][0], config=ascat_config)
+    with pytest.raises(ValueError, match="wind_speed not in"):
+        check_product_variables(filename=datasets["granules"]["SMAP"][0], config=smap_config)
+
+    ascat_config, smap_config = get_product_configs(config={**config, "product_variables": {"SMAP": SMAP_VARIABLES}})
+    check_product_variables(filename=datasets["granules"]["SMAP"][0], config=smap_config)
+    with pytest.raises(ValueError, match="salinity_40km not in"):
+        check_product_variables(
+            filename=datasets["granules"]["ASCAT"][0],
+            config={**ascat_config, "figure_variables": [["ocean_salinity", "salinity_40km"]]},
+        )
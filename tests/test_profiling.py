@@ -0,0 +1,57 @@
+import numpy as np
+import os
+import pytest
+
+from profiling import (
+    profile_stage,
+    profile_to_frame,
+    read_peak_memory_mb,
+    start_profile,
+    stop_profile,
+    summarize_run_report,
+)
+
+
+def read_resident_memory_mb() -> float:
+    with open("/proc/self/statm") as fl:
+        return int(fl.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+@pytest.mark.skipif(
+    read_peak_memory_mb() is None or not os.path.exists("/proc/self/statm"),
+    reason="the memory cannot be read on this platform",
+)
+def test_peak_memory_is_only_recorded_for_memory_stages():
+    start_profile()
+    with profile_stage(stage="granule", memory=True):
+        for _ in range(3):
+            with profile_stage(stage="decode"):
+                # 200 MB above the peak of the process so far
+                size_mb = read_peak_memory_mb() - read_resident_memory_mb() + 200
+                data = np.ones(int(size_mb * 1024 * 1024 / 8))
+                del data
+    with profile_stage(stage="write", memory=True):
+        data = np.ones(1024)
+    profile = stop_profile()
+
+    assert profile["decode"]["calls"] == 3
+    assert profile["decode"]["peak_memory_mb"] is None
+    assert profile["granule"]["memory_growth_mb"] > 150
+    assert profile["granule"]["peak_memory_mb"] >= profile["granule"]["memory_growth_mb"]
+    # the peak is not reset: a stage using less memory does not raise it
+    assert profile["write"]["memory_growth_mb"] < 50
+    assert profile["write"]["peak_memory_mb"] >= profile["granule"]["peak_memory_mb"]
+
+
+def test_enclosing_stages_are_not_in_the_total_time():
+    start_profile()
+    with profile_stage(stage="granule", memory=True):
+        for _ in range(3):
+            with profile_stage(stage="decode"):
+                pass
+        with profile_stage(stage="mask"):
+            pass
+    summary = summarize_run_report(report=profile_to_frame(profile=stop_profile(), granule="a.nc"))
+
+    assert np.isclose(summary.percent[["decode", "mask"]].sum(), 100)
+    assert summary.percent["granule"] >= 100
@@ -0,0 +1,68 @@
+import numpy as np
+
+from calculations import SaildroneTrack
+from matching import match_swath_file, write_match_results
+from read_write import check_for_saildrone_data, read_saildrone
+from state import connect_state_db, get_state_key, read_in_range_granules
+from stats import COLLOCATION_SETS, get_saildrone_stats
+from synthetic import generate_synthetic_data
+
+
+def test_stats_read_the_swath_of_each_matching_point(repo_config):
+    datasets = generate_synthetic_data(
+        config=repo_config,
+        products=["ASCAT"],
+        n_saildrones=1,
+        n_track_points=600,
+        n_granules=3,
+        n_rows=40,
+        n_cells=10,
+        density=0.9,
+        overlap=1.0,
+    )
+    sd_number, sd_year = datasets["saildrones"][0]
+    config = {
+        **repo_config,
+        "satellite_product": "ASCAT",
+        "saildrone_number": sd_number,
+        "saildrone_year": sd_year,
+        "saildrone_distance_tolerance_km": 25,
+        "figure_variables": [],
+    }
+    sd_data = read_saildrone(filename=check_for_saildrone_data(config=config), config=config, masked_nan=True, to_pd=True)
+    sd_track = SaildroneTrack(sd_data=sd_data)
+
+    # the same matching points, with the wind speeds recorded, and without (the swaths are read again)
+    configs = {
+        "recorded": config,
+        "read": {
+            **config,
+            "match_satellite_variables": [],
+            "matching_data_folder": f"{config['matching_data_folder']}_read",
+            "log_data_folder": f"{config['log_data_folder']}_read",
+        },
+    }
+    for match_config in configs.values():
+        results = [
+            match_swath_file(filename=fl, sd_track=sd_track, config=match_config)
+            for fl in datasets["granules"]["ASCAT"]
+        ]
+        assert sum(result["in_range"] for result in results) >= 2
+        write_match_results(results=results, config=match_config)
+
+    # a granule in range without matching points (e.g., imported from an in_range log)
+    con = connect_state_db(config=configs["read"])
+    with con:
+        con.execute(
+            "INSERT INTO granule_state (drone, year, product, tolerance, granule, status) VALUES (?, ?, ?, ?, ?, ?)",
+            get_state_key(config=configs["read"]) + ("ascat_20000101_000000_l2.nc", "in_range"),
+        )
+    con.close()
+    assert read_in_range_granules(config=configs["read"])[0] == "ascat_20000101_000000_l2.nc"
+
+    recorded = get_saildrone_stats(config=configs["recorded"])
+    read = get_saildrone_stats(config=configs["read"])
+    for collocation in COLLOCATION_SETS:
+        assert len(recorded[collocation]) > 0
+        for name, value in recorded[collocation].result().items():
+            assert np.isclose(read[collocation].result()[name], value, equal_nan=True), (collocation, name)
@@ -0,0 +1,135 @@
+import numpy as np
+import os
+import pandas as pd
+import pytest
+import xarray as xr
+from xarray.backends.netCDF4_ import NetCDF4ArrayWrapper
+
+from calculations import great_circle_distance_array, SaildroneTrack
+from matching import match_swath_file
+from read_write import check_for_saildrone_data, fetch_repo_path, read_saildrone, read_swath, read_swath_blocks
+from synthetic import generate_synthetic_data
+
+
+def make_smap_data(config: dict) -> tuple:
+    """
+    Synthetic SMAP granules over one saildrone, with the salinity missing in
+    half of the rows where the other variables are valid.
+    """
+    datasets = generate_synthetic_data(
+        config=config,
+        products=["SMAP"],
+        n_saildrones=1,
+        n_track_points=600,
+        n_granules=2,
+        n_rows=60,
+        n_cells=20,
+        density=0.8,
+        overlap=1.0,
+    )
+    sd_number, sd_year = datasets["saildrones"][0]
+    config = {
+        **config,
+        "satellite_product": "SMAP",
+        "saildrone_number": sd_number,
+        "saildrone_year": sd_year,
+        "saildrone_distance_tolerance_km": 25,
+        "match_satellite_variables": [],
+        "match_saildrone_variables": [],
+    }
+
+    path = f"{fetch_repo_path()}{os.sep}{config['satellite_data_folder']}{os.sep}SMAP"
+    for filename in datasets["granules"]["SMAP"]:
+        with xr.open_dataset(f"{path}{os.sep}{filename}") as data:
+            data = data.load()
+        data["sss_smap"][::2] = np.nan
+        data.to_netcdf(f"{path}{os.sep}{filename}")
+
+    sd_data = read_saildrone(
+        filename=check_for_saildrone_data(config=config), config=config, masked_nan=True, to_pd=True
+    )
+
+    return config, datasets["granules"]["SMAP"], sd_data
+
+
+def count_baseline_pairs(filename: str, sd_data: pd.DataFrame, config: dict, variable: str) -> int:
+    """
+    The number of saildrone/swath point pairs within the tolerances, with the
+    swath points masked as before the variable projection, on the requested
+    variable only: a row is kept if its coordinates and the variable are
+    valid. The saildrone points are those within the time range of the swath
+    (of all its points with valid coordinates).
+    """
+    data_df = read_swath(filename=filename, config=config).to_dataframe().reset_index(drop=True)
+    data_df = data_df[data_df.lon.notna() & data_df.lat.notna()]
+    sd_data = sd_data[(sd_data.time >= data_df.time.min()) & (sd_data.time <= data_df.time.max())]
+    data_df = data_df[["lat", "lon", "time", variable]].dropna(axis=0, thresh=4)
+
+    st_time = data_df.time.to_numpy()[:, None]
+    sd_time = sd_data.time.to_numpy()[None, :]
+    close = np.abs(st_time - sd_time) <= pd.Timedelta(minutes=config["saildrone_time_tolerance_min"])
+    st_idx, sd_idx = np.nonzero(close)
+    dist = great_circle_distance_array(
+        lon1=sd_data.lon.to_numpy()[sd_idx],
+        lat1=sd_data.lat.to_numpy()[sd_idx],
+        lon2=data_df.lon.round(2).to_numpy()[st_idx],
+        lat2=data_df.lat.round(2).to_numpy()[st_idx],
+    )
+
+    return int((dist <= config["saildrone_distance_tolerance_km"]).sum())
+
+
+def test_matching_selects_the_points_on_the_requested_variable(repo_config):
+    config, filenames, sd_data = make_smap_data(config=repo_config)
+    sd_track = SaildroneTrack(sd_data=sd_data)
+
+    for filename in filenames:
+        n_matches = {}
+        for st_var in ["salinity_70km", "sst"]:
+            n_baseline = count_baseline_pairs(filename=filename, sd_data=sd_data, config=config, variable=st_var)
+            assert n_baseline > 0
+
+            result = match_swath_file(
+                filename=filename,
+                sd_track=sd_track,
+                config={**config, "satellite_variable_name": st_var},
+            )
+            assert result["in_range"]
+            assert len(result["matches"]) == n_baseline
+            n_matches[st_var] = n_baseline
+
+        # the rows without salinity are not matched on it
+        assert n_matches["salinity_70km"] < n_matches["sst"]
+
+
+def test_unrequested_variables_are_not_read(repo_config, monkeypatch):
+    config, filenames, sd_data = make_smap_data(config=repo_config)
+    read_variables = set()
+    getitem = NetCDF4ArrayWrapper._getitem
+
+    def record_getitem(self, key):
+        read_variables.add(self.variable_name)
+        return getitem(self, key)
+
+    monkeypatch.setattr(NetCDF4ArrayWrapper, "_getitem", record_getitem)
+    for streaming_chunk_size in [0, 100]:
+        read_variables.clear()
+        blocks = read_swath_blocks(
+            filename=filenames[0],
+            config={**config, "streaming_chunk_size": streaming_chunk_size},
+            variables=["sst"],
+        )
+        assert sum(len(block) for block in blocks) > 0
+        assert "surtep" in read_variables
+        assert not {"sss_smap", "sss_smap_40km"} & read_variables
+
+
+def test_missing_variable_raises(repo_config):
+    config, filenames, sd_data = make_smap_data(config=repo_config)
+
+    with pytest.raises(ValueError, match="wind_speed not in"):
+        match_swath_file(
+            filename=filenames[0],
+            sd_track=SaildroneTrack(sd_data=sd_data),
+            config={**config, "satellite_variable_name": "wind_speed"},
+        )
@@ -0,0 +1,292 @@
+import hashlib
+import inspect
+import json
+import numpy as np
+import os
+import pandas as pd
+
+from read_write import (
+    DS,
+    fetch_repo_path,
+    mask_saildrone_data,
+    mask_swath_blocks,
+    mask_swath_data,
+    read_ASCAT,
+    read_saildrone,
+    read_SMAP,
+    read_swath,
+    select_swath_variables,
+    subset_swath,
+)
+
+
+# reader functions whose source goes into the swath cache key, per product
+SWATH_READERS = {
+    DS.ASCAT.value: read_ASCAT,
+    DS.ASCAT_METOPB.value: read_ASCAT,
+    DS.SMAP.value: read_SMAP,
+}
+
+
+def get_cache_folder(config: dict, kind: str) -> str:
+    """
+    path = get_cache_folder(config, kind)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - kind: the type of cached data (e.g., saildrone)
+
+    Returns:
+    - path: the cache directory for that type of data (created if needed).
+    """
+    path = (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config.get('cache_data_folder', 'cache')}{os.sep}"
+        + f"{kind}"
+    )
+    os.makedirs(path, exist_ok=True)
+
+    return path
+
+
+def reader_fingerprint(func) -> str:
+    """
+    fingerprint = reader_fingerprint(func)
+
+    Returns:
+    - a hash of the source code of a reader function, so that editing the
+        reader (renaming, dropping, masking) invalidates its cached output.
+    """
+    return hashlib.sha1(inspect.getsource(func).encode()).hexdigest()
+
+
+def cache_key(key: dict) -> str:
+    """
+    key_hash = cache_key(key)
+
+    Returns:
+    - a short, stable hash of a dictionary of cache key parameters.
+    """
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def write_cached_frame(data: pd.DataFrame, path: str) -> bool:
+    """
+    written = write_cached_frame(data, path)
+
+    Arguments:
+    - data: the dataframe to cache
+    - path: the .npz file to write
+
+    Returns:
+    - written: False if the dataframe has columns that cannot be stored
+        column-wise (object dtype), True otherwise.
+
+    Each column is stored as its own numpy array. The file is written
+    under a temporary name and moved into place, so readers (or other
+    processes) never see a partial file.
+    """
+    if any(dtype == object for dtype in data.dtypes):
+        return False
+
+    columns = {f"col{num}": data[col].to_numpy() for num, col in enumerate(data.columns)}
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, columns=np.array([str(col) for col in data.columns]), **columns)
+    os.replace(tmp_path, path)
+
+    return True
+
+
+def read_cached_frame(path: str) -> pd.DataFrame:
+    """
+    data = read_cached_frame(path)
+
+    Returns:
+    - data: the dataframe stored with write_cached_frame.
+    """
+    with np.load(path, allow_pickle=False) as fl:
+        columns = list(fl["columns"])
+        data = pd.DataFrame({col: fl[f"col{num}"] for num, col in enumerate(columns)})
+
+    return data
+
+
+def read_saildrone_cached(
+    filename: str, config: dict, masked_nan: bool = False, fill_value: float = 9e36
+) -> pd.DataFrame:
+    """
+    data = read_saildrone_cached(filename: str, config, masked_nan: bool, fill_value: float)
+
+    Arguments:
+    - same as read_saildrone (the result is always a pandas dataframe)
+
+    Returns:
+    - data: the same dataframe as read_saildrone(..., to_pd=True)
+
+    The cleaned track is cached under cache_data_folder/saildrone.
+    The cache key contains the source file path, size and modification
+    time, the masking parameters and the read_saildrone source code
+    (with its masking), so
+    any change to them makes the cached copy stale - it is then re-read
+    and replaced.
+    Setting use_cache: False in the config bypasses the cache.
+    """
+    if not config.get("use_cache", True):
+        return read_saildrone(
+            filename=filename,
+            config=config,
+            masked_nan=masked_nan,
+            fill_value=fill_value,
+            to_pd=True,
+        )
+
+    source_path = (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['saildrone_data_folder']}{os.sep}"
+        + f"nc{os.sep}"
+        + f"{filename}"
+    )
+    stat = os.stat(source_path)
+    key = {
+        "source": source_path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "masked_nan": masked_nan,
+        "fill_value": fill_value,
+        "reader": [reader_fingerprint(func) for func in [read_saildrone, mask_saildrone_data]],
+    }
+
+    cache_dir = get_cache_folder(config=config, kind="saildrone")
+    stem = os.path.splitext(filename)[0]
+    cache_path = f"{cache_dir}{os.sep}{stem}_{cache_key(key)}.npz"
+    if os.path.isfile(cache_path):
+        return read_cached_frame(path=cache_path)
+
+    data = read_saildrone(
+        filename=filename,
+        config=config,
+        masked_nan=masked_nan,
+        fill_value=fill_value,
+        to_pd=True,
+    )
+
+    # remove stale copies of the same file (one copy is kept per file)
+    for fl in os.listdir(cache_dir):
+        if fl.startswith(f"{stem}_") and len(fl) == len(stem) + 1 + 16 + len(".npz"):
+            os.remove(f"{cache_dir}{os.sep}{fl}")
+    write_cached_frame(data=data, path=cache_path)
+
+    return data
+
+
+def enforce_cache_size(cache_dir: str, max_bytes: int):
+    """
+    enforce_cache_size(cache_dir, max_bytes)
+
+    Arguments:
+    - cache_dir: the cache directory
+    - max_bytes: the maximum total size of the cached files
+
+    Returns: None
+    Removes the least recently used files (oldest modification time - cache
+    hits touch their file) until the directory fits within max_bytes.
+    """
+    files = []
+    for fl in os.listdir(cache_dir):
+        path = f"{cache_dir}{os.sep}{fl}"
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(fl[1] for fl in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def read_swath_cached(filename: str, config: dict, variables: list = None) -> pd.DataFrame:
+    """
+    data = read_swath_cached(filename: str, config: dict, variables: list)
+
+    Arguments:
+    - same as read_swath
+
+    Returns:
+    - data: the same dataframe as read_swath(..., masked_nan=True, as_pd=True)
+
+    The masked swath table is cached per granule under
+    cache_data_folder/<product>. The cache key contains the source file
+    path, size and modification time, the requested variables, and the
+    source code of the product reader (e.g., read_ASCAT - with its
+    rename/drop lists), so editing a reader invalidates its old entries.
+    The directory is kept below swath_cache_max_mb by evicting the least
+    recently used granules.
+    Setting use_cache: False in the config bypasses the cache.
+    """
+    product = config["satellite_product"]
+    if not config.get("use_cache", True) or product not in SWATH_READERS:
+        return read_swath(
+            filename=filename,
+            config=config,
+            masked_nan=True,
+            as_pd=True,
+            variables=variables,
+        )
+
+    source_path = (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['satellite_data_folder']}{os.sep}"
+        + f"{product}{os.sep}"
+        + f"{filename}"
+    )
+    stat = os.stat(source_path)
+    key = {
+        "source": source_path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "variables": None if variables is None else sorted(variables),
+        "reader": [
+            reader_fingerprint(func)
+            for func in [
+                read_swath,
+                SWATH_READERS[product],
+                select_swath_variables,
+                subset_swath,
+                mask_swath_data,
+                mask_swath_blocks,
+            ]
+        ],
+    }
+
+    cache_dir = get_cache_folder(config=config, kind=product)
+    stem = os.path.splitext(filename)[0]
+    cache_path = f"{cache_dir}{os.sep}{stem}_{cache_key(key)}.npz"
+    if os.path.isfile(cache_path):
+        try:
+            os.utime(cache_path)
+            return read_cached_frame(path=cache_path)
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            pass
+
+    data = read_swath(
+        filename=filename,
+        config=config,
+        masked_nan=True,
+        as_pd=True,
+        variables=variables,
+    )
+    if write_cached_frame(data=data, path=cache_path):
+        enforce_cache_size(
+            cache_dir=cache_dir,
+            max_bytes=config.get("swath_cache_max_mb", 2048) * 1024 * 1024,
+        )
+
+    return data
@@ -1,7 +1,9 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from math import radians, sin, cos, acos
+from profiling import profile_stage
+
+R_EARTH_KM = 6371.
 
 
 def get_saildrone_position_extrema(sd_data: pd.DataFrame, buffer: float, lon: str = "lon", lat: str = "lat") -> list:
@@ -16,16 +18,401 @@ def get_saildrone_position_extrema(sd_data: pd.DataFrame, buffer: float, lon: st
 
 
 
-def subset_saildrone_time(sd_data: pd.DataFrame, start_time: datetime, end_time: datetime) -> pd.DataFrame:
+class SaildroneTrack:
+    """
+    track = SaildroneTrack(sd_data)
+
+    Arguments:
+    - sd_data: saildrone points (must contain a time column)
+
+    A saildrone track sorted by time once, so that time windows can be
+    answered with a binary search (np.searchsorted) instead of a boolean
+    scan of the whole track.
+    Windows (subset_time) are positional slices of the sorted data and
+    share its memory - they are not copied.
+    """
+
+    def __init__(self, sd_data: pd.DataFrame):
+        times = sd_data.time.to_numpy(dtype="datetime64[ns]")
+        if len(times) > 1 and (np.diff(times) < np.timedelta64(0)).any():
+            sd_data = sd_data.sort_values(by="time", kind="stable")
+        self.data = sd_data.reset_index(drop=True)
+        self.time = self.data.time.to_numpy(dtype="datetime64[ns]")
+
+    @classmethod
+    def _from_sorted(cls, data: pd.DataFrame, time: np.ndarray):
+        track = cls.__new__(cls)
+        track.data = data
+        track.time = time
+        return track
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def window_index(self, start_time: datetime, end_time: datetime) -> tuple:
+        """
+        start_idx, end_idx = track.window_index(start_time, end_time)
+
+        Returns:
+        - the positional [start_idx, end_idx) range of points with
+            start_time <= time <= end_time.
+        """
+        start_idx = np.searchsorted(self.time, pd.Timestamp(start_time).to_datetime64(), side="left")
+        end_idx = np.searchsorted(self.time, pd.Timestamp(end_time).to_datetime64(), side="right")
+        return start_idx, max(start_idx, end_idx)
+
+    def subset_time(self, start_time: datetime, end_time: datetime):
+        """
+        track_subset = track.subset_time(start_time, end_time)
+
+        Returns:
+        - a SaildroneTrack with the points where start_time <= time <= end_time.
+        """
+        start_idx, end_idx = self.window_index(start_time=start_time, end_time=end_time)
+        return SaildroneTrack._from_sorted(
+            data=self.data.iloc[start_idx:end_idx], time=self.time[start_idx:end_idx]
+        )
+
+    def exclude_time(self, start_time: datetime, end_time: datetime):
+        """
+        track_subset = track.exclude_time(start_time, end_time)
+
+        Returns:
+        - a SaildroneTrack with the points before start_time or after end_time.
+        """
+        start_idx, end_idx = self.window_index(start_time=start_time, end_time=end_time)
+        return SaildroneTrack._from_sorted(
+            data=pd.concat([self.data.iloc[:start_idx], self.data.iloc[end_idx:]]),
+            time=np.concatenate([self.time[:start_idx], self.time[end_idx:]]),
+        )
+
+
+class SaildroneFleet:
+    """
+    fleet = SaildroneFleet(tracks)
+
+    Arguments:
+    - tracks: dictionary of SaildroneTrack, e.g. by (saildrone number, year)
+
+    The time windows of all the tracks, sorted by start time, so that the
+    saildrones that can overlap a granule are found with a binary search
+    instead of checking every track.
+    """
+
+    def __init__(self, tracks: dict):
+        self.tracks = tracks
+        keys = [key for key, track in tracks.items() if len(track) > 0]
+        starts = np.array([tracks[key].time[0] for key in keys], dtype="datetime64[ns]")
+        order = np.argsort(starts, kind="stable")
+        self.keys = [keys[idx] for idx in order]
+        self.start = starts[order]
+        self.end = np.array([tracks[key].time[-1] for key in self.keys], dtype="datetime64[ns]")
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def overlapping(self, start_time: datetime, end_time: datetime) -> list:
+        """
+        keys = fleet.overlapping(start_time, end_time)
+
+        Returns:
+        - the keys of the tracks with points between start_time and end_time
+            (by their first and last time).
+        """
+        n_started = np.searchsorted(self.start, pd.Timestamp(end_time).to_datetime64(), side="right")
+        in_window = self.end[:n_started] >= pd.Timestamp(start_time).to_datetime64()
+        return [self.keys[idx] for idx in np.flatnonzero(in_window)]
+
+
+def get_match_variables(config: dict) -> tuple:
+    """
+    sd_variables, st_variables = get_match_variables(config)
+
+    Returns:
+    - the saildrone and satellite variables whose values are recorded with
+        the matching points (match_saildrone_variables and
+        match_satellite_variables in the config; empty if not set).
+    """
+    reserved = ["lon", "lat", "time", "row"]
+    sd_variables = [var for var in config.get("match_saildrone_variables") or [] if var not in reserved]
+    st_variables = [var for var in config.get("match_satellite_variables") or [] if var not in reserved]
+
+    return sd_variables, st_variables
+
+
+def build_candidate_pairs(sd_data: pd.DataFrame, st_data: pd.DataFrame, sd_variables: list = None, st_variables: list = None) -> pd.DataFrame:
+    """
+    points = build_candidate_pairs(sd_data, st_data)
+
+    Arguments:
+    - sd_data: saildrone points (lon, lat, time columns)
+    - st_data: satellite points (lon, lat, time columns)
+    - sd_variables, st_variables: variables whose values are added to the
+        pairs (see build_pairs_from_index)
+
+    Returns:
+    - points: the cartesian product of saildrone and satellite points, with
+        columns sd_lon, sd_lat, sd_time, st_lon, st_lat, st_time.
+        Rows are ordered saildrone-major (all satellite points for the first
+        saildrone point, then the second, ...).
+    """
+    n_sd = len(sd_data)
+    n_st = len(st_data)
+    sd_idx = np.repeat(np.arange(n_sd), n_st)
+    st_idx = np.tile(np.arange(n_st), n_sd)
+
+    return build_pairs_from_index(
+        sd_data=sd_data,
+        st_data=st_data,
+        sd_idx=sd_idx,
+        st_idx=st_idx,
+        sd_variables=sd_variables,
+        st_variables=st_variables,
+    )
+
+
+def build_pairs_from_index(
+    sd_data: pd.DataFrame,
+    st_data: pd.DataFrame,
+    sd_idx: np.ndarray,
+    st_idx: np.ndarray,
+    sd_variables: list = None,
+    st_variables: list = None,
+) -> pd.DataFrame:
+    """
+    points = build_pairs_from_index(sd_data, st_data, sd_idx, st_idx)
+
+    Arguments:
+    - sd_data: saildrone points (lon, lat, time columns)
+    - st_data: satellite points (lon, lat, time columns)
+    - sd_idx, st_idx: positional indices of the paired points
+    - sd_variables, st_variables: variables whose values are added as
+        sd_<var> and st_<var> columns (NaN if the variable does not exist).
+        With saildrone variables, the sd_row column holds the row of the
+        saildrone point in the (time sorted) saildrone track.
+
+    Returns:
+    - points: one row per (sd_idx, st_idx) pair, with typed columns
+        sd_lon, sd_lat, sd_time, st_lon, st_lat, st_time (and the values).
+    """
+    points = pd.DataFrame(
+        {
+            "sd_lon": sd_data.lon.to_numpy(dtype=np.float64)[sd_idx],
+            "sd_lat": sd_data.lat.to_numpy(dtype=np.float64)[sd_idx],
+            "sd_time": sd_data.time.to_numpy(dtype="datetime64[ns]")[sd_idx],
+            "st_lon": st_data.lon.to_numpy(dtype=np.float64)[st_idx],
+            "st_lat": st_data.lat.to_numpy(dtype=np.float64)[st_idx],
+            "st_time": st_data.time.to_numpy(dtype="datetime64[ns]")[st_idx],
+        }
+    )
+
+    if sd_variables:
+        points["sd_row"] = sd_data.index.to_numpy()[sd_idx]
+        for var in sd_variables:
+            if var in sd_data.columns:
+                points[f"sd_{var}"] = sd_data[var].to_numpy(dtype=np.float64)[sd_idx]
+            else:
+                points[f"sd_{var}"] = np.nan
+    for var in st_variables or []:
+        if var in st_data.columns:
+            points[f"st_{var}"] = st_data[var].to_numpy(dtype=np.float64)[st_idx]
+        else:
+            points[f"st_{var}"] = np.nan
+
+    return points
+
+
+def lonlat_to_unit_vectors(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """
+    xyz = lonlat_to_unit_vectors(lon, lat)
+
+    Arguments:
+    - lon, lat: coordinates in degrees
+
+    Returns:
+    - xyz: (n, 3) array of cartesian coordinates on the unit sphere.
+    """
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
 
-    return sd_data[(start_time <= sd_data.time) & (sd_data.time <= end_time)].reset_index(drop=True)
 
+def match_swath_brute_force(sd_track: SaildroneTrack, st_data: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """
+    points = match_swath_brute_force(sd_track, st_data, config)
 
-def great_circle_distance(x) -> float:
+    Arguments:
+    - sd_track: saildrone track overlapping the swath in time
+    - st_data: swath points (already limited to the saildrone region)
+    - config: the dictionary from the config yaml file
 
-    lon1, lat1, lon2, lat2 = map(radians, [x.sd_lon, x.sd_lat, x.st_lon, x.st_lat])
-    r_earth = 6371.
-    gc = r_earth * (acos(sin(lat1) * sin(lat2) + cos(lat1)*cos(lat2)*cos(lon1-lon2)))
+    Returns:
+    - points: all saildrone/swath pairs within the time and distance
+        tolerances from the config, with a dist (km) column.
+
+    The swath is split into patches of equal time, and every saildrone
+    point within the time tolerance of the patch is compared to every
+    point of the patch.
+    """
+    dt = pd.Timedelta(minutes=config["saildrone_time_tolerance_min"])
+    sd_variables, st_variables = get_match_variables(config=config)
+    tmp = st_data.groupby("time")
+    satellite_patches = [
+        tmp.get_group(group).reset_index(drop=True) for group in tmp.groups
+    ]
+
+    swath_points = []
+    for patch in satellite_patches:
+        patch_time = patch.time.iloc[0]
+        saildrone_patch = sd_track.subset_time(
+            start_time=patch_time - dt,
+            end_time=patch_time + dt,
+        )
+
+        if len(saildrone_patch) == 0:
+            continue
+
+        with profile_stage(stage="pairs", rows_in=len(patch)) as record:
+            points = build_candidate_pairs(
+                sd_data=saildrone_patch.data,
+                st_data=patch,
+                sd_variables=sd_variables,
+                st_variables=st_variables,
+            )
+            record["rows_out"] = len(points)
+        with profile_stage(stage="distance", rows_in=len(points)) as record:
+            points["dist"] = great_circle_distance_array(
+                lon1=points.sd_lon.values,
+                lat1=points.sd_lat.values,
+                lon2=points.st_lon.values,
+                lat2=points.st_lat.values,
+            )
+            points = points[
+                points.dist <= config["saildrone_distance_tolerance_km"]
+            ].reset_index(drop=True)
+            record["rows_out"] = len(points)
+        if len(points) == 0:
+            continue
+
+        swath_points.append(points)
+
+    if len(swath_points) == 0:
+        empty = np.array([], dtype=np.int64)
+        points = build_pairs_from_index(
+            sd_data=sd_track.data,
+            st_data=st_data,
+            sd_idx=empty,
+            st_idx=empty,
+            sd_variables=sd_variables,
+            st_variables=st_variables,
+        )
+        points["dist"] = np.array([], dtype=np.float64)
+        return points
+
+    return pd.concat(swath_points).reset_index(drop=True)
+
+
+def match_swath_kdtree(sd_track: SaildroneTrack, st_data: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """
+    points = match_swath_kdtree(sd_track, st_data, config)
+
+    Arguments:
+    - sd_track: saildrone track overlapping the swath in time
+    - st_data: swath points (already limited to the saildrone region)
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - points: all saildrone/swath pairs within the time and distance
+        tolerances from the config, with a dist (km) column.
+
+    The swath cells are put into a KD-tree of 3D unit vectors, and every
+    saildrone point queries it for the cells within the chord length that
+    corresponds to saildrone_distance_tolerance_km. The candidates are then
+    filtered with the same time and haversine distance criteria as
+    match_swath_brute_force, and returned in the same order.
+    """
+    # scipy is only imported (a few tenths of a second) by runs using the kdtree engine
+    from scipy.spatial import cKDTree
+
+    max_dist = config["saildrone_distance_tolerance_km"]
+    dt = pd.Timedelta(minutes=config["saildrone_time_tolerance_min"]).to_timedelta64()
+
+    st_time = st_data.time.to_numpy(dtype="datetime64[ns]")
+    sd_data = sd_track.data
+    sd_time = sd_track.time
+
+    with profile_stage(stage="pairs", rows_in=len(st_data)) as record:
+        # slightly enlarged radius - the exact haversine cut is applied afterwards
+        chord = 2 * np.sin(min(max_dist / R_EARTH_KM, np.pi) / 2) * (1 + 1e-9) + 1e-12
+        tree = cKDTree(lonlat_to_unit_vectors(lon=st_data.lon.values, lat=st_data.lat.values))
+        neighbors = tree.query_ball_point(
+            lonlat_to_unit_vectors(lon=sd_data.lon.values, lat=sd_data.lat.values), r=chord
+        )
+
+        counts = np.array([len(nb) for nb in neighbors], dtype=np.int64)
+        sd_idx = np.repeat(np.arange(len(sd_data)), counts)
+        st_idx = np.concatenate([np.asarray(nb, dtype=np.int64) for nb in neighbors] + [np.array([], dtype=np.int64)])
+
+        keep = np.abs(sd_time[sd_idx] - st_time[st_idx]) <= dt
+        sd_idx = sd_idx[keep]
+        st_idx = st_idx[keep]
+
+        # same ordering as the brute force path: patch (swath time), saildrone point, swath cell
+        order = np.lexsort((st_idx, sd_idx, st_time[st_idx]))
+        sd_idx = sd_idx[order]
+        st_idx = st_idx[order]
+
+        sd_variables, st_variables = get_match_variables(config=config)
+        points = build_pairs_from_index(
+            sd_data=sd_data,
+            st_data=st_data,
+            sd_idx=sd_idx,
+            st_idx=st_idx,
+            sd_variables=sd_variables,
+            st_variables=st_variables,
+        )
+        record["rows_out"] = len(points)
+    with profile_stage(stage="distance", rows_in=len(points)) as record:
+        points["dist"] = great_circle_distance_array(
+            lon1=points.sd_lon.values,
+            lat1=points.sd_lat.values,
+            lon2=points.st_lon.values,
+            lat2=points.st_lat.values,
+        )
+        points = points[points.dist <= max_dist].reset_index(drop=True)
+        record["rows_out"] = len(points)
+
+    return points
+
+
+def great_circle_distance_array(
+    lon1: np.ndarray, lat1: np.ndarray, lon2: np.ndarray, lat2: np.ndarray
+) -> np.ndarray:
+    """
+    dist = great_circle_distance_array(lon1, lat1, lon2, lat2)
+
+    Arguments:
+    - lon1, lat1: coordinates of the first set of points (degrees)
+    - lon2, lat2: coordinates of the second set of points (degrees)
+
+    Returns:
+    - dist: great circle distance (km) between the points, element-wise
+        (the inputs follow numpy broadcasting rules).
+
+    Uses the haversine formula, which - unlike the spherical law of cosines -
+    stays accurate for very small separations.
+    """
+    lon1 = np.radians(np.asarray(lon1, dtype=np.float64))
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lon2, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+
+    hav = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    gc = 2 * R_EARTH_KM * np.arcsin(np.sqrt(np.clip(hav, 0, 1)))
 
     return gc
 
@@ -46,21 +433,72 @@ def match_saildrone_satellite_point(match_data: pd.DataFrame, sd_data: pd.DataFr
         print(f"     Variable {st_var} does not exist in satellite data.")
         print(f"     Existing variables include \n{st_data.columns}")
 
-    data = pd.DataFrame([], columns=["sd_time", "st_time", "dist", "sd_var", "st_var"], index=range(len(match_data)))
-    for idx, row in match_data.iterrows():
-        dist = row.dist
-        st_idx = (row.st_time, row.st_lat, row.st_lon)
-        st_pt = st_data.loc[st_idx]
-        sd_idx = (row.sd_time, row.sd_lat, row.sd_lon)
-        try:
-            sd_pt = sd_data.loc[sd_idx]
-            data.iloc[idx] = [row.sd_time, row.st_time, dist, sd_pt[sd_var], st_pt[st_var]]
-        except KeyError:
-            data.iloc[idx] = [row.sd_time, row.st_time, dist, np.nan, st_pt[st_var]]
-
-    data.sd_time = pd.to_datetime(data.sd_time)
-    data.st_time = pd.to_datetime(data.st_time)
-    data.dist = data.dist.astype(float)
-    data.sd_var = data.sd_var.astype(float)
-    data.st_var = data.st_var.astype(float)
+    sd_values = lookup_point_values(data=sd_data, var=sd_var, time=match_data.sd_time, lat=match_data.sd_lat, lon=match_data.sd_lon)
+    st_values = lookup_point_values(data=st_data, var=st_var, time=match_data.st_time, lat=match_data.st_lat, lon=match_data.st_lon)
+
+    data = pd.DataFrame(
+        {
+            "sd_time": pd.to_datetime(match_data.sd_time).to_numpy(),
+            "st_time": pd.to_datetime(match_data.st_time).to_numpy(),
+            "dist": match_data.dist.to_numpy(dtype=np.float64),
+            "sd_var": sd_values,
+            "st_var": st_values,
+        }
+    )
     return data
+
+
+def recorded_match_values(match_data: pd.DataFrame, config: dict):
+    """
+    data = recorded_match_values(match_data, config)
+
+    Arguments:
+    - match_data: matching points, as written by the matching step
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - data: the same dataframe as match_saildrone_satellite_point, built
+        from the values recorded at matching time (match_saildrone_variables
+        and match_satellite_variables) - or None if the saildrone or
+        satellite variable was not recorded, and the data need to be read.
+    """
+    sd_col = f"sd_{config['saildrone_variable_name']}"
+    st_col = f"st_{config['satellite_variable_name']}"
+    if (sd_col not in match_data.columns) or (st_col not in match_data.columns):
+        return None
+
+    data = pd.DataFrame(
+        {
+            "sd_time": pd.to_datetime(match_data.sd_time).to_numpy(),
+            "st_time": pd.to_datetime(match_data.st_time).to_numpy(),
+            "dist": match_data.dist.to_numpy(dtype=np.float64),
+            "sd_var": match_data[sd_col].to_numpy(dtype=np.float64),
+            "st_var": match_data[st_col].to_numpy(dtype=np.float64),
+        }
+    )
+    return data
+
+
+def lookup_point_values(data: pd.DataFrame, var: str, time: pd.Series, lat: pd.Series, lon: pd.Series) -> np.ndarray:
+    """
+    values = lookup_point_values(data, var, time, lat, lon)
+
+    Arguments:
+    - data: points indexed by (time, lat, lon)
+    - var: the variable to look up
+    - time, lat, lon: the coordinates of the points to look up
+
+    Returns:
+    - values: the value of var at each (time, lat, lon), NaN where the
+        point does not exist in data (first value if it exists more than once).
+    """
+    values = data[var]
+    values = values[~values.index.duplicated(keep="first")]
+    keys = pd.MultiIndex.from_arrays([pd.to_datetime(time), lat, lon])
+    idx = values.index.get_indexer(keys)
+
+    out = np.full(len(idx), np.nan)
+    found = idx >= 0
+    out[found] = values.to_numpy(dtype=np.float64)[idx[found]]
+
+    return out
@@ -0,0 +1,220 @@
+import os
+import pandas as pd
+import sqlite3
+
+from calculations import (
+    get_saildrone_position_extrema,
+    SaildroneTrack,
+)
+from read_write import (
+    check_for_satellite_data,
+    fetch_repo_path,
+    read_swath_extent,
+)
+
+
+CATALOG_COLUMNS = [
+    "filename",
+    "time_start",
+    "time_end",
+    "lat_min",
+    "lat_max",
+    "lon_min",
+    "lon_max",
+    "n_rows",
+    "file_size",
+    "mtime",
+]
+
+
+def get_catalog_path(config: dict) -> str:
+    """
+    path = get_catalog_path(config)
+
+    Returns:
+    - the path to the granule catalog of the configured satellite product.
+    """
+    return (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['satellite_data_folder']}{os.sep}"
+        + f"{config['satellite_product']}_catalog.sqlite"
+    )
+
+
+def _connect_catalog(config: dict) -> sqlite3.Connection:
+    con = sqlite3.connect(get_catalog_path(config=config))
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS granules (
+            filename TEXT PRIMARY KEY,
+            time_start TEXT,
+            time_end TEXT,
+            lat_min REAL,
+            lat_max REAL,
+            lon_min REAL,
+            lon_max REAL,
+            n_rows INTEGER,
+            file_size INTEGER,
+            mtime REAL
+        )
+        """
+    )
+    return con
+
+
+def describe_granule(filename: str, config: dict) -> tuple:
+    """
+    row = describe_granule(filename, config)
+
+    Arguments:
+    - filename: name of the satellite swath file
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - row: the catalog entry for the file (see CATALOG_COLUMNS).
+        Times and bounds are None if the swath has no valid points.
+
+    The envelope is computed from all the points with valid coordinates,
+    which contain the (masked) points the matching uses. Only the
+    coordinates are read.
+    """
+    product_path = (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['satellite_data_folder']}{os.sep}"
+        + f"{config['satellite_product']}{os.sep}"
+        + f"{filename}"
+    )
+    stat = os.stat(product_path)
+
+    extent = read_swath_extent(filename=filename, config=config)
+    if extent is None:
+        return (filename, None, None, None, None, None, None, 0, stat.st_size, stat.st_mtime)
+
+    return (
+        filename,
+        str(extent["time_start"]),
+        str(extent["time_end"]),
+        extent["latmin"],
+        extent["latmax"],
+        extent["lonmin"],
+        extent["lonmax"],
+        extent["n_points"],
+        stat.st_size,
+        stat.st_mtime,
+    )
+
+
+def update_satellite_catalog(config: dict) -> int:
+    """
+    n_updated = update_satellite_catalog(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - n_updated: the number of granules that were (re)scanned.
+
+    Scans data_satellite/<product>, and adds catalog entries for new files
+    and files whose size or modification time changed. Entries of files
+    that no longer exist are removed.
+    """
+    filenames = check_for_satellite_data(config=config, append_datadir=False) or []
+    paths = check_for_satellite_data(config=config, append_datadir=True) or []
+
+    con = _connect_catalog(config=config)
+    known = {
+        row[0]: (row[1], row[2])
+        for row in con.execute("SELECT filename, file_size, mtime FROM granules")
+    }
+
+    n_updated = 0
+    for fl, path in zip(filenames, paths):
+        stat = os.stat(path)
+        if known.get(fl) == (stat.st_size, stat.st_mtime):
+            continue
+        row = describe_granule(filename=fl, config=config)
+        with con:
+            con.execute(
+                f"INSERT OR REPLACE INTO granules VALUES ({', '.join(['?'] * len(CATALOG_COLUMNS))})",
+                row,
+            )
+        n_updated += 1
+
+    existing = set(filenames)
+    removed = [(fl,) for fl in known if fl not in existing]
+    if len(removed) > 0:
+        with con:
+            con.executemany("DELETE FROM granules WHERE filename = ?", removed)
+
+    con.close()
+
+    return n_updated
+
+
+def read_satellite_catalog(config: dict) -> pd.DataFrame:
+    """
+    catalog = read_satellite_catalog(config)
+
+    Returns:
+    - catalog: the granule catalog, indexed by filename.
+    """
+    con = _connect_catalog(config=config)
+    catalog = pd.read_sql_query("SELECT * FROM granules", con)
+    con.close()
+
+    catalog.time_start = pd.to_datetime(catalog.time_start)
+    catalog.time_end = pd.to_datetime(catalog.time_end)
+
+    return catalog.set_index("filename")
+
+
+def prune_granules_with_catalog(filenames: list, sd_track: SaildroneTrack, config: dict) -> tuple:
+    """
+    candidates, pruned = prune_granules_with_catalog(filenames, sd_track, config)
+
+    Arguments:
+    - filenames: list of satellite swath filenames
+    - sd_track: the saildrone track to match against
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - candidates: files whose time/space envelope can intersect the track
+        (and files missing from the catalog)
+    - pruned: files that cannot contain any matching point
+
+    The criteria are the same as (or looser than) the ones applied after
+    reading the swath, so no file that would match is ever pruned.
+    """
+    catalog = read_satellite_catalog(config=config)
+    buffer = config["saildrone_distance_tolerance_km"] / 10
+
+    candidates = []
+    pruned = []
+    for fl in filenames:
+        if fl not in catalog.index:
+            candidates.append(fl)
+            continue
+
+        entry = catalog.loc[fl]
+        if entry.n_rows == 0:
+            pruned.append(fl)
+            continue
+
+        sd_subset = sd_track.subset_time(start_time=entry.time_start, end_time=entry.time_end)
+        if len(sd_subset) == 0:
+            pruned.append(fl)
+            continue
+
+        sd_extrema = get_saildrone_position_extrema(sd_data=sd_subset.data, buffer=buffer)
+        if (
+            (entry.lon_max < sd_extrema["lonmin"])
+            or (entry.lon_min > sd_extrema["lonmax"])
+            or (entry.lat_max < sd_extrema["latmin"])
+            or (entry.lat_min > sd_extrema["latmax"])
+        ):
+            pruned.append(fl)
+            continue
+
+        candidates.append(fl)
+
+    return candidates, pruned
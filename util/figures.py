@@ -0,0 +1,516 @@
+import glob
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import pandas as pd
+
+from cache import cache_key, read_saildrone_cached, reader_fingerprint
+from concurrent.futures import ProcessPoolExecutor
+from matching import get_tolerance_configs
+from read_write import (
+    check_for_saildrone_data,
+    fetch_repo_path,
+    get_match_store_path,
+    get_product_configs,
+    get_run_configs,
+    get_variable_configs,
+    mask_swath_blocks,
+    mask_swath_data,
+    read_all_matching_data,
+    read_matching_data_from_file,
+    read_matching_data_from_store,
+    read_swath_matching_data,
+    select_swath_variables,
+)
+from state import read_in_range_granules
+from stats import COLLOCATION_SETS, get_collocation_stats, iter_comparisons
+
+
+# config entries a figure depends on (besides its input files)
+FIGURE_CONFIG_KEYS = [
+    "satellite_product",
+    "saildrone_number",
+    "saildrone_year",
+    "saildrone_time_tolerance_min",
+    "saildrone_distance_tolerance_km",
+    "saildrone_variable_name",
+    "satellite_variable_name",
+    "match_saildrone_variables",
+    "match_satellite_variables",
+    "figure_variables",
+    "match_store_format",
+    "time_range",
+]
+
+# reader functions whose source goes into the figure key (the matching points
+# and the swath points the figures read)
+FIGURE_READERS = [
+    read_swath_matching_data,
+    read_matching_data_from_store,
+    read_matching_data_from_file,
+    select_swath_variables,
+    mask_swath_data,
+    mask_swath_blocks,
+]
+
+
+def get_figure_jobs(config: dict) -> list:
+    """
+    jobs = get_figure_jobs(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - jobs: the (kind, config) of every figure enabled in the config, for
+        each saildrone, product, tolerance (including a tolerance sweep) and
+        variable. kind is timeseries, scatter or all_saildrones.
+    """
+    jobs = []
+    for run_config in get_run_configs(config=config):
+        for tolerance_config in get_tolerance_configs(config=run_config):
+            for variable_config in get_variable_configs(config=tolerance_config):
+                if config["plot_saildrone_satellite_data_timeseries"]:
+                    jobs.append(("timeseries", variable_config))
+                if config["plot_saildrone_satellite_data_scatter"]:
+                    jobs.append(("scatter", variable_config))
+
+    if config["plot_all_saildrones_scatter"]:
+        for product_config in get_product_configs(config=config):
+            for tolerance_config in get_tolerance_configs(config=product_config):
+                for variable_config in get_variable_configs(config=tolerance_config):
+                    jobs.append(("all_saildrones", variable_config))
+
+    return jobs
+
+
+def get_figure_filenames(kind: str, config: dict) -> list:
+    """
+    filenames = get_figure_filenames(kind, config)
+
+    Returns:
+    - filenames: the figures (in figure_data_folder) drawn by a job.
+    """
+    tolerance = f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km"
+    drone = f"SD{config['saildrone_number']}.{config['saildrone_year']}"
+    product = config["satellite_product"]
+    variable = config["saildrone_variable_name"]
+
+    if kind == "timeseries":
+        return [f"{drone}_{product}_timeseries_overlap_{tolerance}_{variable}.png"]
+    if kind == "scatter":
+        return [f"{drone}_{product}_scatter_overlap_{tolerance}_{variable}.png"]
+
+    return [
+        f"SD_{product}_scatter_overlap_{tolerance}_{variable}.png",
+        f"SD_{product}_matching_points_locations_{tolerance}_{variable}.png",
+    ]
+
+
+def get_figure_inputs(kind: str, config: dict) -> list:
+    """
+    paths = get_figure_inputs(kind, config)
+
+    Returns:
+    - paths: the files a job reads - the matching points of the product and
+        tolerances (of the saildrone, or of all of them for all_saildrones),
+        and the saildrone files.
+    """
+    repo_path = fetch_repo_path()
+    if kind == "all_saildrones":
+        sd_number = "*"
+        sd_year = "*"
+    else:
+        sd_number = config["saildrone_number"]
+        sd_year = config["saildrone_year"]
+
+    if config.get("match_store_format", "parquet") == "parquet":
+        pattern = f"{get_match_store_path(config=config, sd_number=sd_number, sd_year=sd_year)}{os.sep}*.parquet"
+    else:
+        pattern = (
+            f"{repo_path}{os.sep}{config['matching_data_folder']}{os.sep}SD{sd_number}_{sd_year}{os.sep}"
+            + f"{config['satellite_product']}{os.sep}"
+            + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km{os.sep}*.csv"
+        )
+    paths = sorted(glob.glob(pattern))
+
+    sd_path = f"{repo_path}{os.sep}{config['saildrone_data_folder']}{os.sep}nc"
+    if kind == "all_saildrones":
+        paths += sorted(glob.glob(f"{sd_path}{os.sep}*.nc"))
+    else:
+        sd_filename = check_for_saildrone_data(config=config)
+        if sd_filename is not None:
+            paths.append(f"{sd_path}{os.sep}{sd_filename}")
+
+    return paths
+
+
+def get_figure_swath_inputs(kind: str, config: dict, match_paths: list) -> list:
+    """
+    paths = get_figure_swath_inputs(kind, config, match_paths)
+
+    Arguments:
+    - kind: the kind of job (see get_figure_jobs)
+    - config: the config of the job
+    - match_paths: the matching point files of the job (see get_figure_inputs)
+
+    Returns:
+    - paths: the satellite swath files the job reads - those with matching
+        points, if the scatterplots need the satellite values and they were
+        not recorded with the matching points (see recorded_match_values);
+        otherwise none.
+    """
+    if kind == "timeseries":
+        return []
+
+    import pyarrow.parquet as pq
+
+    columns = [f"sd_{config['saildrone_variable_name']}", f"st_{config['satellite_variable_name']}"]
+    swaths = set()
+    for path in match_paths:
+        if path.endswith(".parquet"):
+            if all(column in pq.read_schema(path).names for column in columns):
+                continue
+            swaths.update(pd.read_parquet(path, columns=["granule"]).granule)
+        else:
+            with open(path) as fl:
+                if all(column in fl.readline().rstrip().split(",") for column in columns):
+                    continue
+            swaths.add(os.path.basename(path)[: -len(".csv")])
+    if len(swaths) == 0:
+        return []
+
+    sat_path = f"{fetch_repo_path()}{os.sep}{config['satellite_data_folder']}{os.sep}{config['satellite_product']}"
+    if not os.path.isdir(sat_path):
+        return []
+
+    # the swaths are named by their filename in the store, without extension in the csv files
+    return [
+        f"{sat_path}{os.sep}{fl}"
+        for fl in sorted(os.listdir(sat_path))
+        if fl in swaths or fl.split(".")[0] in swaths
+    ]
+
+
+def get_module_fingerprint(module: str) -> str:
+    """
+    fingerprint = get_module_fingerprint(module)
+
+    Returns:
+    - a hash of the source of a module, read without importing it (plot
+        imports matplotlib), so that checking unchanged figures stays cheap.
+    """
+    with open(importlib.util.find_spec(module).origin, "rb") as fl:
+        return hashlib.sha1(fl.read()).hexdigest()
+
+
+def get_figure_key(kind: str, config: dict) -> str:
+    """
+    key = get_figure_key(kind, config)
+
+    Returns:
+    - key: a hash of everything a job depends on: the config entries, the
+        size and modification time of its input files (including the
+        satellite swaths it re-reads, see get_figure_swath_inputs), and the
+        source of the functions that read its inputs (FIGURE_READERS) and
+        draw it.
+    """
+    paths = get_figure_inputs(kind=kind, config=config)
+    match_paths = [path for path in paths if path.endswith(".parquet") or path.endswith(".csv")]
+    stats = []
+    for path in paths + get_figure_swath_inputs(kind=kind, config=config, match_paths=match_paths):
+        stat = os.stat(path)
+        stats.append([path, stat.st_size, stat.st_mtime])
+
+    return cache_key(
+        {
+            "kind": kind,
+            "config": {key: config.get(key) for key in FIGURE_CONFIG_KEYS},
+            "inputs": stats,
+            "code": [reader_fingerprint(FIGURE_FUNCTIONS[kind])]
+            + [reader_fingerprint(func) for func in FIGURE_READERS]
+            + [get_module_fingerprint(module=module) for module in ["plot", "stats"]],
+        }
+    )
+
+
+def collect_comparisons(match_data: list, sd_filename: str, config: dict) -> tuple:
+    """
+    comparisons, used, stats = collect_comparisons(match_data, sd_filename, config)
+
+    Arguments:
+    - match_data: the (swath filename, matching points) of each swath (see
+        read_swath_matching_data)
+    - sd_filename: the saildrone file
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - comparisons: for each collocation set (see COLLOCATION_SETS), the list
+        of saildrone/satellite values of each swath with valid values
+    - used: the matching points of these swaths
+    - stats: the CollocationStats of each collocation set, accumulated
+        swath by swath (see iter_comparisons)
+    """
+    comparisons = {collocation: [] for collocation in COLLOCATION_SETS}
+    used = []
+    stats = get_collocation_stats()
+    for swath_match_data, swath_comparisons in iter_comparisons(
+        match_data=match_data, sd_filename=sd_filename, config=config
+    ):
+        used.append(swath_match_data)
+        for collocation, data in swath_comparisons.items():
+            comparisons[collocation].append(data)
+            stats[collocation].update(sd_values=data.sd_var.to_numpy(), st_values=data.st_var.to_numpy())
+
+    return comparisons, used, stats
+
+
+def plot_timeseries_figure(config: dict) -> bool:
+    """
+    drawn = plot_timeseries_figure(config)
+
+    Returns:
+    - drawn: whether the swath coverage figure of the saildrone was drawn
+        (False if no swath matches it).
+    """
+    from plot import plot_timeseries_swath_overlap
+
+    print(
+        f"Plotting the swath coverage of {config['saildrone_number']} from "
+        + f"{config['saildrone_year']} to "
+        + f"{config['satellite_product']} satellite swaths."
+    )
+
+    satellite_filenames = read_in_range_granules(config=config)
+    if len(satellite_filenames) == 0:
+        print("     There are no satellite swaths that match the saildrone \nbased on the specified criteria.")
+        return False
+
+    saildrone_data = read_saildrone_cached(
+        filename=check_for_saildrone_data(config=config), config=config, masked_nan=True
+    )
+    match_data = read_matching_data_from_file(config=config, join_swaths=True)
+
+    plot_timeseries_swath_overlap(
+        sd_data=saildrone_data,
+        swath_match=match_data,
+        filename=get_figure_filenames(kind="timeseries", config=config)[0],
+        config=config,
+    )
+
+    return True
+
+
+def plot_scatter_figure(config: dict) -> bool:
+    """
+    drawn = plot_scatter_figure(config)
+
+    Returns:
+    - drawn: whether the scatterplot of the saildrone was drawn (False if
+        no swath matches it with valid values).
+    """
+    from plot import plot_scatterplot_overlap
+
+    print(
+        f"Plotting the scatterplot of {config['saildrone_number']} from "
+        + f"{config['saildrone_year']} to "
+        + f"{config['satellite_product']} satellite swaths."
+    )
+
+    # each swath is named by its matching points (see read_swath_matching_data)
+    match_data = read_swath_matching_data(config=config)
+    if len(match_data) == 0:
+        print("     There are no satellite swaths that match the saildrone \nbased on the specified criteria.")
+        return False
+
+    comparisons, _, stats = collect_comparisons(
+        match_data=match_data,
+        sd_filename=check_for_saildrone_data(config=config),
+        config=config,
+    )
+    if len(comparisons["combined"]) == 0:
+        return False
+
+    plot_scatterplot_overlap(
+        combined_pts=pd.concat(comparisons["combined"]).reset_index(drop=True),
+        mean_pts=pd.concat(comparisons["mean"]).reset_index(drop=True),
+        nearest_pts=pd.concat(comparisons["nearest"]).reset_index(drop=True),
+        filename=get_figure_filenames(kind="scatter", config=config)[0],
+        stats=stats,
+    )
+
+    return True
+
+
+def plot_all_saildrones_figures(config: dict) -> bool:
+    """
+    drawn = plot_all_saildrones_figures(config)
+
+    Returns:
+    - drawn: whether the scatterplot and the matching point locations of
+        all the saildrones were drawn (False without matching points).
+    """
+    from plot import plot_matching_point_locations, plot_scatterplot_overlap
+
+    print(f"Plotting the scatterplot of all saildrones to {config['satellite_product']} satellite swaths.")
+
+    comparisons = {collocation: [] for collocation in COLLOCATION_SETS}
+    matching_data = {}
+    # the statistics of the fleet are merged from those of each saildrone
+    stats = get_collocation_stats()
+    for sd_filename, sd_match_data in read_all_matching_data(config=config).items():
+        sd_comparisons, matching_data[sd_filename], sd_stats = collect_comparisons(
+            match_data=sd_match_data,
+            sd_filename=sd_filename,
+            config=config,
+        )
+        for collocation in COLLOCATION_SETS:
+            comparisons[collocation] += sd_comparisons[collocation]
+            stats[collocation].merge(sd_stats[collocation])
+    if len(comparisons["combined"]) == 0:
+        print("     There are no satellite swaths that match the saildrones \nbased on the specified criteria.")
+        return False
+
+    scatter_filename, locations_filename = get_figure_filenames(kind="all_saildrones", config=config)
+    plot_scatterplot_overlap(
+        combined_pts=pd.concat(comparisons["combined"]).sort_values(by=["sd_time", "st_time"]).reset_index(drop=True),
+        mean_pts=pd.concat(comparisons["mean"]).sort_values(by=["sd_time", "st_time"]).reset_index(drop=True),
+        nearest_pts=pd.concat(comparisons["nearest"]).sort_values(by=["sd_time", "st_time"]).reset_index(drop=True),
+        filename=scatter_filename,
+        stats=stats,
+    )
+    plot_matching_point_locations(
+        match_data=matching_data,
+        sd_fls=list(matching_data),
+        config=config,
+        filename=locations_filename,
+        title=f"(SD - {config['satellite_product']}) matching point locations",
+    )
+
+    return True
+
+
+FIGURE_FUNCTIONS = {
+    "timeseries": plot_timeseries_figure,
+    "scatter": plot_scatter_figure,
+    "all_saildrones": plot_all_saildrones_figures,
+}
+
+
+def get_figure_key_path(kind: str, config: dict) -> str:
+    """
+    path = get_figure_key_path(kind, config)
+
+    Returns:
+    - path: the file in which the key of the inputs of the last drawing of
+        a job is kept (figure_data_folder/.figure_keys).
+    """
+    stem = os.path.splitext(get_figure_filenames(kind=kind, config=config)[0])[0]
+
+    return (
+        f"{fetch_repo_path()}{os.sep}{config['figure_data_folder']}{os.sep}"
+        + f".figure_keys{os.sep}{stem}.json"
+    )
+
+
+def is_figure_current(kind: str, config: dict, key: str) -> bool:
+    """
+    current = is_figure_current(kind, config, key)
+
+    Returns:
+    - current: whether all the figures of a job exist and were drawn from
+        inputs with the same key (see get_figure_key).
+    """
+    savedir = f"{fetch_repo_path()}{os.sep}{config['figure_data_folder']}"
+    key_path = get_figure_key_path(kind=kind, config=config)
+    if not os.path.isfile(key_path):
+        return False
+    if not all(os.path.isfile(f"{savedir}{os.sep}{fl}") for fl in get_figure_filenames(kind=kind, config=config)):
+        return False
+
+    with open(key_path) as fl:
+        return json.load(fl).get("key") == key
+
+
+def render_figure(job: tuple) -> str:
+    """
+    status = render_figure(job)
+
+    Arguments:
+    - job: (kind, config, key), key being the get_figure_key of the job, or
+        None to not record it
+
+    Returns:
+    - status: drawn, or empty (nothing to draw).
+    """
+    kind, config, key = job
+    if not FIGURE_FUNCTIONS[kind](config=config):
+        return "empty"
+
+    if key is not None:
+        key_path = get_figure_key_path(kind=kind, config=config)
+        os.makedirs(os.path.dirname(key_path), exist_ok=True)
+        with open(f"{key_path}.{os.getpid()}.tmp", "w") as fl:
+            json.dump({"key": key, "filenames": get_figure_filenames(kind=kind, config=config)}, fl)
+        os.replace(f"{key_path}.{os.getpid()}.tmp", key_path)
+
+    return "drawn"
+
+
+def _init_figure_worker():
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+
+
+def render_figures(jobs: list, workers: int = 1) -> list:
+    """
+    statuses = render_figures(jobs, workers)
+
+    Arguments:
+    - jobs: list of (kind, config), see get_figure_jobs
+    - workers: number of processes (1 draws the figures in this process)
+
+    Returns:
+    - statuses: for each job, skipped (with skip_unchanged_figures, its
+        figures exist and its inputs did not change), drawn or empty.
+
+    The unchanged figures are found first, in this process. The others are
+    independent, so they are drawn on a process pool, with the
+    non-interactive Agg backend. As for the matching, workers are forked
+    where possible.
+    """
+    statuses = ["skipped"] * len(jobs)
+    pending = []
+    for njob, (kind, config) in enumerate(jobs):
+        key = None
+        if config.get("skip_unchanged_figures", True):
+            key = get_figure_key(kind=kind, config=config)
+            if is_figure_current(kind=kind, config=config, key=key):
+                continue
+        pending.append((njob, (kind, config, key)))
+    if len(pending) == 0:
+        return statuses
+
+    if workers is None or workers <= 1 or len(pending) <= 1:
+        _init_figure_worker()
+        for njob, job in pending:
+            statuses[njob] = render_figure(job=job)
+        return statuses
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("fork")
+    else:
+        mp_context = None
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(pending)),
+        mp_context=mp_context,
+        initializer=_init_figure_worker,
+    ) as executor:
+        for (njob, _), status in zip(pending, executor.map(render_figure, [job for _, job in pending])):
+            statuses[njob] = status
+
+    return statuses
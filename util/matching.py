@@ -0,0 +1,552 @@
+import multiprocessing
+import pandas as pd
+
+from calculations import (
+    get_match_variables,
+    get_saildrone_position_extrema,
+    match_swath_brute_force,
+    match_swath_kdtree,
+    SaildroneFleet,
+    SaildroneTrack,
+)
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from profiling import profile_stage, start_profile, stop_profile, use_profiling
+from read_write import (
+    get_variable_configs,
+    read_swath,
+    read_swath_blocks,
+    read_swath_extent,
+    write_matching_data_to_file,
+    write_matching_data_to_store,
+)
+from state import (
+    get_state_key,
+    read_granule_states,
+    record_granule_states,
+    use_state_db,
+)
+
+
+# set once per worker process by _init_worker, so that the saildrone tracks
+# are sent to each worker once instead of with every granule
+_worker_fleet = None
+
+
+def get_tolerance_configs(config: dict) -> list:
+    """
+    configs = get_tolerance_configs(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - configs: one config per time/distance tolerance to match: every
+        combination of tolerance_sweep_time_min and tolerance_sweep_distance_km
+        (each defaults to the configured tolerance), plus the configured
+        tolerance itself. Without a sweep, this is [config].
+    """
+    times = config.get("tolerance_sweep_time_min") or [config["saildrone_time_tolerance_min"]]
+    distances = config.get("tolerance_sweep_distance_km") or [config["saildrone_distance_tolerance_km"]]
+
+    tolerances = [(config["saildrone_time_tolerance_min"], config["saildrone_distance_tolerance_km"])]
+    for time_min in times:
+        for distance_km in distances:
+            if (time_min, distance_km) not in tolerances:
+                tolerances.append((time_min, distance_km))
+
+    configs = [config]
+    for time_min, distance_km in tolerances[1:]:
+        configs.append(
+            {
+                **config,
+                "saildrone_time_tolerance_min": time_min,
+                "saildrone_distance_tolerance_km": distance_km,
+            }
+        )
+
+    return configs
+
+
+def get_loosest_config(configs: list) -> dict:
+    """
+    config = get_loosest_config(configs)
+
+    Returns:
+    - config: a config with the largest time and the largest distance
+        tolerance of configs. Its matching points contain the matching
+        points of all the configs (see filter_match_result).
+    """
+    return {
+        **configs[0],
+        "saildrone_time_tolerance_min": max(cfg["saildrone_time_tolerance_min"] for cfg in configs),
+        "saildrone_distance_tolerance_km": max(cfg["saildrone_distance_tolerance_km"] for cfg in configs),
+    }
+
+
+def check_product_variables(filename: str, config: dict):
+    """
+    check_product_variables(filename, config)
+
+    Arguments:
+    - filename: a swath file of the product
+    - config: the config of the product
+
+    Returns: None
+    Raises a ValueError (see select_swath_variables) if the swath does not
+    have the satellite variable, the recorded satellite variables or the
+    satellite variables of figure_variables of the config. Checked on one
+    swath of each product, so that a variable name of another product fails
+    before any swath is matched, instead of in every swath.
+    """
+    variables = get_match_variables(config=config)[1]
+    for variable_config in get_variable_configs(config=config):
+        if variable_config["satellite_variable_name"] not in variables:
+            variables.append(variable_config["satellite_variable_name"])
+
+    data = read_swath(filename=filename, config=config, variables=variables)
+    data.close()
+
+
+def filter_match_result(result: dict, config: dict) -> dict:
+    """
+    result = filter_match_result(result, config)
+
+    Arguments:
+    - result: a match_swath_file result, matched at a looser tolerance
+    - config: the config with the (tighter) tolerance to keep
+
+    Returns:
+    - result: the same result, with only the pairs within the time
+        (|st_time - sd_time|) and distance (dist) tolerances of config.
+    """
+    if not result["in_range"]:
+        return result
+
+    matches = result["matches"]
+    time_offset = (matches.st_time - matches.sd_time).abs()
+    matches = matches[
+        (matches.dist <= config["saildrone_distance_tolerance_km"])
+        & (time_offset <= pd.Timedelta(minutes=config["saildrone_time_tolerance_min"]))
+    ].reset_index(drop=True)
+
+    result = dict(result)
+    result["in_range"] = len(matches) > 0
+    result["matches"] = matches if len(matches) > 0 else None
+
+    return result
+
+
+def empty_match_result(
+    filename: str, sd_track: SaildroneTrack, time_start: datetime = None, time_end: datetime = None
+) -> dict:
+    """
+    result = empty_match_result(filename, sd_track, time_start, time_end)
+
+    Arguments:
+    - filename: name of the satellite swath file
+    - sd_track: the saildrone track the swath is compared to
+    - time_start, time_end: time range of the swath (None if unknown or empty)
+
+    Returns:
+    - result: a match_swath_file result without matching points.
+    """
+    return {
+        "filename": filename,
+        "in_range": False,
+        "matches": None,
+        "elapsed": 0.0,
+        "time_start": time_start,
+        "time_end": time_end,
+        "sd_time_start": sd_track.time[0] if len(sd_track) > 0 else None,
+        "sd_time_end": sd_track.time[-1] if len(sd_track) > 0 else None,
+    }
+
+
+def match_swath_file(filename: str, sd_track: SaildroneTrack, config: dict) -> dict:
+    """
+    result = match_swath_file(filename, sd_track, config)
+
+    Arguments:
+    - filename: name of the satellite swath file
+    - sd_track: the saildrone track to match against
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - result: dictionary with
+        - filename: the swath filename
+        - in_range: whether any swath point matched the saildrone
+        - matches: the matching points (None if not in range)
+        - elapsed: processing time (sec)
+        - time_start, time_end: time range of the swath (None if empty)
+        - sd_time_start, sd_time_end: time range of the saildrone track
+    """
+    results = match_swath_file_fleet(
+        filename=filename,
+        fleet=SaildroneFleet(tracks={None: sd_track}),
+        configs={None: config},
+    )
+
+    return results[None]
+
+
+def match_swath_file_fleet(filename: str, fleet: SaildroneFleet, configs: dict) -> dict:
+    """
+    results = match_swath_file_fleet(filename, fleet, configs)
+
+    Arguments:
+    - filename: name of the satellite swath file
+    - fleet: the saildrone tracks to match against
+    - configs: the config of each saildrone of the fleet to match, by key
+
+    Returns:
+    - results: the match_swath_file result of each saildrone in configs, by key.
+        The elapsed time is the time spent on the whole swath.
+
+    The swath is read once: its extent first, then only the block around
+    all the saildrones whose track overlaps it in time and space. Each
+    block is then matched against each of these saildrones.
+    With profile_stages in the config, each result also has the profile of
+    the swath (see profiling.stop_profile) - the same for all the saildrones.
+    The memory is only recorded once for the whole swath (granule stage).
+    """
+    if not use_profiling(config=next(iter(configs.values()))):
+        return _match_swath_file_fleet(filename=filename, fleet=fleet, configs=configs)
+
+    start_profile()
+    try:
+        with profile_stage(stage="granule", rows_in=len(configs), memory=True) as record:
+            results = _match_swath_file_fleet(filename=filename, fleet=fleet, configs=configs)
+            record["rows_out"] = sum(len(result["matches"]) for result in results.values() if result["in_range"])
+    finally:
+        profile = stop_profile()
+    for result in results.values():
+        result["profile"] = profile
+
+    return results
+
+
+def _match_swath_file_fleet(filename: str, fleet: SaildroneFleet, configs: dict) -> dict:
+    start_time = datetime.now()
+    results = {
+        key: empty_match_result(filename=filename, sd_track=fleet.tracks[key])
+        for key in configs
+    }
+    config = next(iter(configs.values()))
+
+    extent = read_swath_extent(filename=filename, config=config)
+    if extent is not None:
+        for result in results.values():
+            result["time_start"] = extent["time_start"]
+            result["time_end"] = extent["time_end"]
+
+    # the saildrones within the time range and lat/lon box of the swath
+    windows = {}
+    if extent is not None:
+        with profile_stage(stage="prune", rows_in=len(configs)) as record:
+            for key in fleet.overlapping(start_time=extent["time_start"], end_time=extent["time_end"]):
+                if key not in configs:
+                    continue
+                saildrone_subset = fleet.tracks[key].subset_time(
+                    start_time=extent["time_start"],
+                    end_time=extent["time_end"],
+                )
+                if len(saildrone_subset) == 0:
+                    continue
+
+                sd_extrema = get_saildrone_position_extrema(
+                    sd_data=saildrone_subset.data,
+                    buffer=configs[key]["saildrone_distance_tolerance_km"] / 10,
+                )
+                if (
+                    (extent["lonmax"] < sd_extrema["lonmin"])
+                    or (extent["lonmin"] > sd_extrema["lonmax"])
+                    or (extent["latmax"] < sd_extrema["latmin"])
+                    or (extent["latmin"] > sd_extrema["latmax"])
+                ):
+                    continue
+
+                windows[key] = (saildrone_subset, sd_extrema)
+            record["rows_out"] = len(windows)
+
+    if len(windows) == 0:
+        elapsed = (datetime.now() - start_time).total_seconds()
+        for result in results.values():
+            result["elapsed"] = elapsed
+        return results
+
+    # only read the part of the swath near the saildrones, one block of rows
+    # at a time in streaming mode (see read_swath_blocks)
+    variables = []
+    time_starts = []
+    time_ends = []
+    for key, (saildrone_subset, sd_extrema) in windows.items():
+        for var in [configs[key]["satellite_variable_name"]] + get_match_variables(config=configs[key])[1]:
+            if var not in variables:
+                variables.append(var)
+        dt = pd.Timedelta(minutes=configs[key]["saildrone_time_tolerance_min"])
+        time_starts.append(saildrone_subset.time[0] - dt)
+        time_ends.append(saildrone_subset.time[-1] + dt)
+    bbox = {
+        bound: func(sd_extrema[bound] for _, sd_extrema in windows.values())
+        for bound, func in [("lonmin", min), ("lonmax", max), ("latmin", min), ("latmax", max)]
+    }
+
+    swath_blocks = read_swath_blocks(
+        filename=filename,
+        config=config,
+        variables=variables,
+        time_range=[min(time_starts), max(time_ends)],
+        bbox=bbox,
+    )
+    swath_points = {key: [] for key in windows}
+    for swath_block in swath_blocks:
+        for key, (saildrone_subset, sd_extrema) in windows.items():
+            swath_data = swath_block[
+                (swath_block.lon >= sd_extrema["lonmin"])
+                & (swath_block.lon <= sd_extrema["lonmax"])
+                & (swath_block.lat >= sd_extrema["latmin"])
+                & (swath_block.lat <= sd_extrema["latmax"])
+            ]
+            if len(swath_data) == 0:
+                continue
+
+            if configs[key].get("matching_engine", "brute_force") == "kdtree":
+                points = match_swath_kdtree(
+                    sd_track=saildrone_subset, st_data=swath_data, config=configs[key]
+                )
+            else:
+                points = match_swath_brute_force(
+                    sd_track=saildrone_subset, st_data=swath_data, config=configs[key]
+                )
+            if len(points) > 0:
+                swath_points[key].append(points)
+
+    elapsed = (datetime.now() - start_time).total_seconds()
+    for key, result in results.items():
+        points = swath_points.get(key, [])
+        if len(points) > 1:
+            points = [pd.concat(points).sort_values(by="st_time", kind="stable").reset_index(drop=True)]
+        if len(points) > 0:
+            result["in_range"] = True
+            result["matches"] = points[0]
+        result["elapsed"] = elapsed
+
+    return results
+
+
+def _init_worker(fleet: SaildroneFleet):
+    global _worker_fleet
+    _worker_fleet = fleet
+
+
+def _match_swath_file_worker(task: tuple) -> dict:
+    filename, configs = task
+    return match_swath_file_fleet(filename=filename, fleet=_worker_fleet, configs=configs)
+
+
+def match_fleet_files(filenames: list, fleet: SaildroneFleet, configs: list, workers: int = 1):
+    """
+    for results in match_fleet_files(filenames, fleet, configs, workers):
+
+    Arguments:
+    - filenames: list of satellite swath filenames
+    - fleet: the saildrone tracks to match against
+    - configs: for each file, the config of each saildrone to match it
+        against, by fleet key (see match_swath_file_fleet)
+    - workers: number of processes (1 processes the files in this process)
+
+    Returns:
+    - a generator of match_swath_file_fleet results, in the order of filenames
+        (regardless of the order in which the workers finish).
+
+    The granules are independent, so they are spread across a process pool.
+    The saildrone tracks are handed to each worker once, when it starts.
+    Workers are forked where possible, since the scripts calling this are
+    not guarded by if __name__ == "__main__" (spawned workers would re-run them).
+    """
+    if workers is None or workers <= 1 or len(filenames) <= 1:
+        for filename, file_configs in zip(filenames, configs):
+            yield match_swath_file_fleet(filename=filename, fleet=fleet, configs=file_configs)
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("fork")
+    else:
+        mp_context = None
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(filenames)),
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(fleet,),
+    ) as executor:
+        for results in executor.map(_match_swath_file_worker, zip(filenames, configs)):
+            yield results
+
+
+def match_swath_files(filenames: list, sd_track: SaildroneTrack, config, workers: int = 1):
+    """
+    for result in match_swath_files(filenames, sd_track, config, workers):
+
+    Arguments:
+    - filenames: list of satellite swath filenames
+    - sd_track: the saildrone track to match against
+    - config: the dictionary from the config yaml file, or a list with the
+        config of each file (e.g., to match the files of several products)
+    - workers: number of processes (1 processes the files in this process)
+
+    Returns:
+    - a generator of match_swath_file results, in the order of filenames
+        (see match_fleet_files).
+    """
+    if isinstance(config, dict):
+        configs = [config] * len(filenames)
+    else:
+        configs = config
+
+    for results in match_fleet_files(
+        filenames=filenames,
+        fleet=SaildroneFleet(tracks={None: sd_track}),
+        configs=[{None: file_config} for file_config in configs],
+        workers=workers,
+    ):
+        yield results[None]
+
+
+def plan_incremental_matching(filenames: list, sd_track: SaildroneTrack, config: dict) -> list:
+    """
+    extensions = plan_incremental_matching(filenames, sd_track, config)
+
+    Arguments:
+    - filenames: list of satellite swath filenames already processed
+    - sd_track: the (current) saildrone track
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - extensions: list of (track, filenames), where track holds the saildrone
+        points outside the time range the swaths were matched against, and
+        filenames the swaths whose time range (with the time tolerance)
+        reaches these points.
+
+    The granules are grouped by the saildrone time range they were matched
+    against, so usually one track covers all of them: the telemetry added
+    since the last run. Granules without a recorded time range (imported
+    from the text logs) are not re-matched.
+    Returns an empty list if incremental_matching is off in the config, or
+    with processing_state: log (the logs have no time range).
+    """
+    if (
+        not config.get("incremental_matching", True)
+        or not use_state_db(config=config)
+        or len(sd_track) == 0
+    ):
+        return []
+
+    dt = pd.Timedelta(minutes=config["saildrone_time_tolerance_min"])
+    track_start = pd.Timestamp(sd_track.time[0])
+    track_end = pd.Timestamp(sd_track.time[-1])
+
+    states = read_granule_states(config=config)
+    states = states[
+        states.granule.isin(filenames)
+        & states.sd_time_start.notna()
+        & states.granule_time_start.notna()
+    ]
+    before = (
+        (states.sd_time_start > track_start)
+        & (states.granule_time_start - dt < states.sd_time_start)
+        & (states.granule_time_end + dt >= track_start)
+    )
+    after = (
+        (states.sd_time_end < track_end)
+        & (states.granule_time_end + dt > states.sd_time_end)
+        & (states.granule_time_start - dt <= track_end)
+    )
+    states = states[before | after]
+
+    extensions = []
+    for (sd_time_start, sd_time_end), group in states.groupby(["sd_time_start", "sd_time_end"]):
+        new_track = sd_track.exclude_time(start_time=sd_time_start, end_time=sd_time_end)
+        if len(new_track) > 0:
+            extensions.append((new_track, sorted(group.granule)))
+
+    return extensions
+
+
+def write_match_results(results: list, config: dict, append: bool = False):
+    """
+    write_match_results(results, config, append)
+
+    Arguments:
+    - results: list of match_swath_file results
+    - config: the dictionary from the config yaml file
+    - append: whether the swaths were re-matched against new saildrone data,
+        so their new points are added to the existing csv files (the match
+        store is always appended to)
+
+    Returns: None
+    Writes the matching points of a batch of in-range swaths (to the match
+    store, or to per-swath csv files with match_store_format: csv), and
+    only then records the processing state of all the swaths of the batch -
+    so an interrupted run never marks a swath whose points were not written.
+    """
+    if len(results) == 0:
+        return
+
+    in_range = [result for result in results if result["in_range"]]
+    if config.get("match_store_format", "parquet") == "parquet":
+        write_matching_data_to_store(
+            matching_data=[result["matches"] for result in in_range],
+            matching_files=[result["filename"] for result in in_range],
+            config=config,
+        )
+    else:
+        for result in in_range:
+            write_matching_data_to_file(
+                matching_data=result["matches"],
+                matching_file=result["filename"],
+                config=config,
+                append=append,
+            )
+
+    record_granule_states(results=results, config=config)
+
+
+def write_tolerance_results(
+    results: list, configs: list, processed: dict = None, append: bool = False
+):
+    """
+    write_tolerance_results(results, configs, processed, append)
+
+    Arguments:
+    - results: list of match_swath_file results, matched at the loosest
+        tolerance of configs
+    - configs: the configs of each tolerance (see get_tolerance_configs)
+    - processed: the swaths processed before this run, per tolerance (see
+        get_state_key), or None to write every result for every tolerance
+    - append: see write_match_results
+
+    Returns: None
+    Filters the results into each tolerance (see filter_match_result), and
+    writes them with write_match_results. Swaths already processed for a
+    tolerance are skipped - or, when re-matching against new saildrone data
+    (append), only those are written (the others were matched against the
+    whole track in this run).
+    """
+    for tolerance_config in configs:
+        tolerance_results = results
+        if processed is not None:
+            done = processed[get_state_key(config=tolerance_config)[3]]
+            tolerance_results = [
+                result for result in results if (result["filename"] in done) == append
+            ]
+
+        write_match_results(
+            results=[
+                filter_match_result(result=result, config=tolerance_config)
+                for result in tolerance_results
+            ],
+            config=tolerance_config,
+            append=append,
+        )
@@ -2,20 +2,19 @@
 import os
 import pandas as pd
 from read_write import fetch_repo_path, read_config
+from stats import COLLOCATION_SETS, get_collocation_stats
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 from matplotlib.gridspec import GridSpec
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
-import cartopy.crs as ccrs
-import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
-import numpy as np
 
-from cartopy.feature import COASTLINE, LAND
-from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
+from functools import lru_cache
 from typing import List
 
+# cartopy is imported by the functions that use it: it takes seconds to
+# import, and most runs only draw some of the figures
+
 
 def plot_timeseries_swath_overlap(sd_data: pd.DataFrame, swath_match: pd.DataFrame, filename: str, config: dict, ylims: list = None):
 
@@ -31,6 +30,8 @@ def plot_timeseries_swath_overlap(sd_data: pd.DataFrame, swath_match: pd.DataFra
         dmin = ylims[0]
         dmax = ylims[1]
     dran = dmax - dmin
+    ymin = np.floor(dmin-0.1*dran)
+    ymax = np.ceil(dmax+0.1*dran)
 
     fig = plt.figure(figsize=(12, len(sd_months)*3))
     gs = GridSpec(len(sd_months), 1)
@@ -54,14 +55,25 @@ def plot_timeseries_swath_overlap(sd_data: pd.DataFrame, swath_match: pd.DataFra
                 st_sub["dt_tmfmt"] = pd.to_timedelta(st_sub.st_time - st_sub.sd_time).dt.total_seconds() / 60 / 60 / 24
                 st_sub["sd_tmfmt"] = pd.to_timedelta(st_sub.st_time - start_of_month).dt.total_seconds() / 60 / 60 / 24 + 1
                 st_sub["st_tmfmt"] = st_sub.sd_tmfmt + st_sub.dt_tmfmt
-                for pt in range(len(st_sub)):
-                    axes[mon].axline((st_sub.sd_tmfmt.iloc[pt], 0), (st_sub.st_tmfmt.iloc[pt], 10000), lw=.2, c="k")
+                # one line per pair, through (sd_tmfmt, 0) and (st_tmfmt, 10000), drawn
+                # across the y range as a single collection (pairs sharing both times
+                # draw the same line, so they are drawn once)
+                lines = st_sub[["sd_tmfmt", "st_tmfmt"]].drop_duplicates().to_numpy()
+                slope = (lines[:, 1] - lines[:, 0]) / 10000
+                segments = np.stack(
+                    [
+                        np.column_stack([lines[:, 0] + slope * ymin, np.full(len(lines), ymin)]),
+                        np.column_stack([lines[:, 0] + slope * ymax, np.full(len(lines), ymax)]),
+                    ],
+                    axis=1,
+                )
+                axes[mon].add_collection(LineCollection(segments, linewidths=.2, colors="k"), autolim=False)
 
             axes[mon].plot(sd_sub.tmfmt, sd_sub[config["saildrone_variable_name"]], ".", markersize=1)
             axes[mon].set_xticks(np.arange(1, sd_sub.tmfmt.max(), 1), minor=True)
             axes[mon].set_xticks(np.arange(1, sd_sub.tmfmt.max(), 5), minor=False)
             axes[mon].set_xlim(1, 32)
-            axes[mon].set_ylim(np.floor(dmin-0.1*dran), np.ceil(dmax+0.1*dran))
+            axes[mon].set_ylim(ymin, ymax)
             axes[mon].set_title(f"SD: {config['saildrone_number']} ({config['saildrone_year']}); Swath: {config['satellite_product']}; Variable: {config['saildrone_variable_name']}; Month: {month}")
 
 
@@ -71,7 +83,7 @@ def plot_timeseries_swath_overlap(sd_data: pd.DataFrame, swath_match: pd.DataFra
 
 
 
-def plot_scatterplot_overlap(combined_pts: pd.DataFrame, mean_pts: pd.DataFrame, nearest_pts: pd.DataFrame, filename: str, lims: list = None, linreg: bool = True):
+def plot_scatterplot_overlap(combined_pts: pd.DataFrame, mean_pts: pd.DataFrame, nearest_pts: pd.DataFrame, filename: str, lims: list = None, linreg: bool = True, stats: dict = None):
 
 
     if lims is None:
@@ -103,20 +115,15 @@ def plot_scatterplot_overlap(combined_pts: pd.DataFrame, mean_pts: pd.DataFrame,
 
     if linreg:
         if len(combined_pts) >= 5:
-            reg_combined = LinearRegression().fit(combined_pts.sd_var.values.reshape(-1, 1), combined_pts.st_var.values.reshape(-1, 1))
-            reg_mean = LinearRegression().fit(mean_pts.sd_var.values.reshape(-1, 1), mean_pts.st_var.values.reshape(-1, 1))
-            reg_nearest = LinearRegression().fit(nearest_pts.sd_var.values.reshape(-1, 1), nearest_pts.st_var.values.reshape(-1, 1))
-
-            ax1.axline((0, reg_combined.intercept_[0]), slope=reg_combined.coef_[0][0], c="m", lw=1)
-            ax2.axline((0, reg_mean.intercept_[0]), slope=reg_mean.coef_[0][0], c="m", lw=1)
-            ax3.axline((0, reg_nearest.intercept_[0]), slope=reg_nearest.coef_[0][0], c="m", lw=1)
+            if stats is None:
+                stats = get_collocation_stats(comparisons={"combined": combined_pts, "mean": mean_pts, "nearest": nearest_pts})
 
-            txt = f"Slope: {reg_combined.coef_[0][0]:.2f}\nIntercept: {reg_combined.intercept_[0]:.2f}\nR" + u"$^2$" + f": {r2_score(combined_pts.sd_var, combined_pts.st_var):.2f}"
-            ax1.text(np.floor(dmin-0.08*dran), np.ceil(dmax+0.08*dran), txt, ha="left", va="top")
-            txt = f"Slope: {reg_mean.coef_[0][0]:.2f}\nIntercept: {reg_mean.intercept_[0]:.2f}\nR" + u"$^2$" + f": {r2_score(mean_pts.sd_var, mean_pts.st_var):.2f}"
-            ax2.text(np.floor(dmin-0.08*dran), np.ceil(dmax+0.08*dran), txt, ha="left", va="top")
-            txt = f"Slope: {reg_nearest.coef_[0][0]:.2f}\nIntercept: {reg_nearest.intercept_[0]:.2f}\nR" + u"$^2$" + f": {r2_score(nearest_pts.sd_var, nearest_pts.st_var):.2f}"
-            ax3.text(np.floor(dmin-0.08*dran), np.ceil(dmax+0.08*dran), txt, ha="left", va="top")
+            for ax, collocation in zip([ax1, ax2, ax3], COLLOCATION_SETS):
+                result = stats[collocation].result()
+                if np.isfinite(result["slope"]):
+                    ax.axline((0, result["intercept"]), slope=result["slope"], c="m", lw=1)
+                txt = f"Slope: {result['slope']:.2f}\nIntercept: {result['intercept']:.2f}\nR" + u"$^2$" + f": {result['r2']:.2f}"
+                ax.text(np.floor(dmin-0.08*dran), np.ceil(dmax+0.08*dran), txt, ha="left", va="top")
 
     _ = plt.colorbar(f1, cax=cax, orientation="horizontal", label="Distance between SD and sat point (km)")
     ax1.set_xlim(np.floor(dmin-0.1*dran), np.ceil(dmax+0.1*dran))
@@ -138,7 +145,18 @@ def plot_scatterplot_overlap(combined_pts: pd.DataFrame, mean_pts: pd.DataFrame,
 
 
 
-proj = ccrs.PlateCarree(central_longitude = 0)
+@lru_cache(maxsize=None)
+def get_projection():
+    """
+    proj = get_projection()
+
+    Returns:
+    - the map projection of the figures (PlateCarree), created on first use.
+    """
+    import cartopy.crs as ccrs
+
+    return ccrs.PlateCarree(central_longitude = 0)
+
 
 def set_cartopy_projection_atlantic(
         ax: plt.Axes,
@@ -147,6 +165,10 @@ def set_cartopy_projection_atlantic(
         yticks: np.ndarray = np.arange(-10, 61, 10),
         ylabel: str = "top"
     ):
+    from cartopy.feature import COASTLINE, LAND
+    from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
+
+    proj = get_projection()
     #ax.coastlines(color="k", zorder=1)
     ax.add_feature(COASTLINE.with_scale('10m'), edgecolor="k")
     ax.add_feature(LAND.with_scale('10m'), facecolor='.8')
@@ -184,15 +206,29 @@ def plot_matching_point_locations(match_data: list, sd_fls: list, config: dict,
     cols = plt.cm.brg(np.linspace(0, 1, len(unique_sd_files)))
 
     fig = plt.figure(figsize = (10, 6))
-    ax = fig.add_subplot(111, projection=proj)
+    ax = fig.add_subplot(111, projection=get_projection())
 
+    # all the saildrone - satellite point segments, drawn as one collection
+    segments = []
+    colors = []
     for sdfl in sd_fls:
         sd_col = unique_sd_files.index(sdfl)
         match_data_sd = match_data[sdfl]
         if len(match_data_sd) == 0:
             continue
         for swth in range(len(match_data_sd)):
-            ax.plot([match_data_sd[swth].sd_lon, match_data_sd[swth].st_lon], [match_data_sd[swth].sd_lat, match_data_sd[swth].st_lat], c=cols[sd_col], lw=.5)
+            segments.append(
+                np.stack(
+                    [
+                        match_data_sd[swth][["sd_lon", "sd_lat"]].to_numpy(dtype=float),
+                        match_data_sd[swth][["st_lon", "st_lat"]].to_numpy(dtype=float),
+                    ],
+                    axis=1,
+                )
+            )
+            colors.append(np.repeat(cols[sd_col][None, :], len(match_data_sd[swth]), axis=0))
+    if len(segments) > 0:
+        ax.add_collection(LineCollection(np.concatenate(segments), colors=np.concatenate(colors), linewidths=.5))
 
     for col in range(len(cols)):
         ax.plot([0, 0], [0, 1], c=cols[col], label=unique_sd_files[col][:11])
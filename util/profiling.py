@@ -0,0 +1,207 @@
+import json
+import os
+import pandas as pd
+import sys
+import time
+
+from contextlib import contextmanager
+
+
+# the profiles being recorded, innermost last (e.g., a granule within a run)
+_profiles = []
+
+# stages that contain the other stages of their profile (e.g., the whole
+# matching of a granule): they are left out of the total time of a report
+ENCLOSING_STAGES = ["granule"]
+
+
+def use_profiling(config: dict) -> bool:
+    return config.get("profile_stages", True)
+
+
+def read_peak_memory_mb() -> float:
+    """
+    peak = read_peak_memory_mb()
+
+    Returns:
+    - the peak resident memory of the process so far (MB, ru_maxrss of
+        getrusage - it never decreases), or None if it cannot be read on
+        this platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on linux, bytes on macOS
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def start_profile():
+    """
+    start_profile()
+
+    Returns: None
+    Starts recording the stages (see profile_stage) into a new profile,
+    until stop_profile is called. Profiles can be nested: the stages are
+    only recorded into the innermost one.
+    """
+    _profiles.append({})
+
+
+def stop_profile() -> dict:
+    """
+    profile = stop_profile()
+
+    Returns:
+    - profile: for each stage recorded since the matching start_profile,
+        the number of calls, wall time (sec), rows in and out, and for the
+        stages recorded with memory=True, the peak resident memory of the
+        process at their end and how much they raised it (MB, the largest
+        of their calls; None otherwise, or if it cannot be read on this
+        platform).
+    """
+    return _profiles.pop()
+
+
+@contextmanager
+def profile_stage(stage: str, rows_in: int = 0, memory: bool = False):
+    """
+    with profile_stage(stage, rows_in, memory) as record:
+        ...
+        record["rows_out"] = ...
+
+    Arguments:
+    - stage: name of the stage (e.g., decode)
+    - rows_in: number of rows going into the stage
+    - memory: whether to record the peak memory of the process (only for
+        the stages run once per granule or per run, e.g., read_saildrone)
+
+    Returns:
+    - record: dictionary in which the stage can set its rows_out.
+
+    Adds the wall time and rows of the block to the stage in the current
+    profile. Outside of a profile, nothing is recorded. Repeated calls
+    (e.g., one per block of a swath) are summed, and only cost two clock
+    reads and a few additions. With memory=True, the peak memory is read
+    when the stage starts and ends (one getrusage call each); the peak is
+    never reset, so a stage only raises it if it uses more memory than the
+    process did before.
+    """
+    record = {"rows_out": 0}
+    if len(_profiles) == 0:
+        yield record
+        return
+
+    start_peak = read_peak_memory_mb() if memory else None
+    tic = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - tic
+        entry = _profiles[-1].setdefault(
+            stage,
+            {
+                "calls": 0,
+                "seconds": 0.0,
+                "rows_in": 0,
+                "rows_out": 0,
+                "peak_memory_mb": None,
+                "memory_growth_mb": None,
+            },
+        )
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        entry["rows_in"] += int(rows_in)
+        entry["rows_out"] += int(record["rows_out"])
+        if start_peak is not None:
+            peak = read_peak_memory_mb()
+            entry["peak_memory_mb"] = max(entry["peak_memory_mb"] or 0.0, peak)
+            entry["memory_growth_mb"] = max(entry["memory_growth_mb"] or 0.0, peak - start_peak)
+
+
+def profile_to_frame(profile: dict, **labels) -> pd.DataFrame:
+    """
+    data = profile_to_frame(profile, **labels)
+
+    Arguments:
+    - profile: a profile returned by stop_profile
+    - labels: columns added to every row (e.g., granule=filename)
+
+    Returns:
+    - data: one row per stage of the profile.
+    """
+    columns = list(labels) + [
+        "stage",
+        "calls",
+        "seconds",
+        "rows_in",
+        "rows_out",
+        "peak_memory_mb",
+        "memory_growth_mb",
+    ]
+    rows = [{**labels, "stage": stage, **entry} for stage, entry in profile.items()]
+
+    return pd.DataFrame(rows, columns=columns)
+
+
+def summarize_run_report(report: pd.DataFrame) -> pd.DataFrame:
+    """
+    summary = summarize_run_report(report)
+
+    Arguments:
+    - report: the stage rows of a run (see profile_to_frame)
+
+    Returns:
+    - summary: for each stage, the number of calls, total wall time (sec)
+        and its share of the total (of the stages not in ENCLOSING_STAGES),
+        the rows in and out, and the largest peak memory and memory growth
+        (MB).
+    """
+    summary = report.groupby("stage", sort=False).agg(
+        calls=("calls", "sum"),
+        seconds=("seconds", "sum"),
+        rows_in=("rows_in", "sum"),
+        rows_out=("rows_out", "sum"),
+        peak_memory_mb=("peak_memory_mb", "max"),
+        memory_growth_mb=("memory_growth_mb", "max"),
+    )
+    total = summary.seconds[~summary.index.isin(ENCLOSING_STAGES)].sum()
+    summary.insert(2, "percent", 100 * summary.seconds / max(total, 1e-12))
+
+    return summary
+
+
+def write_run_report(report: pd.DataFrame, folder: str, name: str) -> str:
+    """
+    path = write_run_report(report, folder, name)
+
+    Arguments:
+    - report: the stage rows of a run (see profile_to_frame)
+    - folder: directory of the reports (created if needed)
+    - name: name of the run (goes into the file names)
+
+    Returns:
+    - path: the report, written as <name>_<time>.json with the summary (see
+        summarize_run_report) and the stage rows. The stage rows are also
+        written next to it as .csv.
+    """
+    os.makedirs(folder, exist_ok=True)
+    created = pd.Timestamp.now()
+    stem = f"{folder}{os.sep}{name}_{created:%Y%m%d_%H%M%S}"
+
+    report.to_csv(f"{stem}.csv", index=False)
+    summary = summarize_run_report(report=report)
+    with open(f"{stem}.json", "w") as fl:
+        json.dump(
+            {
+                "created": str(created),
+                "summary": json.loads(summary.reset_index().to_json(orient="records")),
+                "stages": json.loads(report.to_json(orient="records")),
+            },
+            fl,
+            indent=2,
+        )
+
+    return f"{stem}.json"
@@ -6,6 +6,12 @@ import xarray as xr
 import yaml
 
 from enum import Enum
+from profiling import profile_stage
+
+
+# the config keys that can be set per satellite product, in product_variables
+# (the variable names differ between products)
+PRODUCT_VARIABLE_KEYS = ["satellite_variable_name", "match_satellite_variables", "figure_variables"]
 
 
 class DS(Enum):
@@ -50,6 +56,93 @@ def read_config() -> dict:
     return config
 
 
+def get_product_configs(config: dict) -> list:
+    """
+    configs = get_product_configs(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - configs: one config per satellite product (satellite_product can be
+        a single product or a list of products), with the variables set for
+        that product in product_variables (see PRODUCT_VARIABLE_KEYS).
+    """
+    products = config["satellite_product"]
+    if isinstance(products, str):
+        products = [products]
+
+    product_variables = config.get("product_variables") or {}
+    configs = []
+    for product in products:
+        variables = product_variables.get(product) or {}
+        unknown = [key for key in variables if key not in PRODUCT_VARIABLE_KEYS]
+        if len(unknown) > 0:
+            raise ValueError(
+                f"{', '.join(unknown)} cannot be set per product in product_variables "
+                + f"(only {', '.join(PRODUCT_VARIABLE_KEYS)})."
+            )
+        configs.append({**config, "satellite_product": product, **variables})
+
+    return configs
+
+
+def get_saildrone_configs(config: dict) -> list:
+    """
+    configs = get_saildrone_configs(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - configs: one config per saildrone of fleet_saildrones (a list of
+        [saildrone number, year]), or [config] for the configured saildrone
+        if the fleet is empty.
+    """
+    fleet = config.get("fleet_saildrones") or []
+    if len(fleet) == 0:
+        return [config]
+
+    return [
+        {**config, "saildrone_number": sd_number, "saildrone_year": sd_year}
+        for sd_number, sd_year in fleet
+    ]
+
+
+def get_run_configs(config: dict) -> list:
+    """
+    configs = get_run_configs(config)
+
+    Returns:
+    - configs: one config per satellite product and saildrone
+        (see get_product_configs and get_saildrone_configs).
+    """
+    return [
+        saildrone_config
+        for product_config in get_product_configs(config=config)
+        for saildrone_config in get_saildrone_configs(config=product_config)
+    ]
+
+
+def get_variable_configs(config: dict) -> list:
+    """
+    configs = get_variable_configs(config)
+
+    Returns:
+    - configs: one config per [saildrone variable, satellite variable] pair
+        of figure_variables (compared by the figures and statistics), or
+        [config] (the configured variables) if figure_variables is empty.
+    """
+    variables = config.get("figure_variables") or []
+    if len(variables) == 0:
+        return [config]
+
+    return [
+        {**config, "saildrone_variable_name": sd_var, "satellite_variable_name": st_var}
+        for sd_var, st_var in variables
+    ]
+
+
 def create_data_folder_structure(config: dict):
     """
     create_data_folder_structure(config)
@@ -305,6 +398,44 @@ def read_not_in_range_log(config: dict) -> list:
     return files
 
 
+def get_chunk_size(config: dict) -> int:
+    """
+    chunk_size = get_chunk_size(config)
+
+    Returns:
+    - the number of records (saildrone observations, or swath rows) read at
+        once in streaming mode (streaming_chunk_size in the config),
+        or None if streaming is disabled.
+    """
+    chunk_size = config.get("streaming_chunk_size", 0)
+    if not chunk_size:
+        return None
+
+    return int(chunk_size)
+
+
+def iter_dataset_blocks(data: xr.Dataset, dim: str, chunk_size: int = None):
+    """
+    for first_row, block in iter_dataset_blocks(data, dim, chunk_size):
+
+    Arguments:
+    - data: a lazily opened dataset
+    - dim: the dimension to split (e.g., obs)
+    - chunk_size: number of records per block (None yields the whole dataset)
+
+    Returns:
+    - a generator of (position of the first record, block) along dim.
+        Blocks are lazy - only the block being loaded is read from the file.
+    """
+    size = data.sizes[dim]
+    if chunk_size is None or size <= chunk_size:
+        yield 0, data
+        return
+
+    for first_row in range(0, size, chunk_size):
+        yield first_row, data.isel({dim: slice(first_row, first_row + chunk_size)})
+
+
 def read_saildrone(
     filename: str,
     config: dict,
@@ -326,8 +457,12 @@ def read_saildrone(
 
     These are the instructions for coordinate renaming for
     saildrone netcdf files - and what variables to drop.
+    With streaming_chunk_size set in the config, the observations are
+    masked streaming_chunk_size at a time (see mask_saildrone_data), so
+    the whole file is never converted to a dataframe at once.
     """
     repo_path = fetch_repo_path()
+    chunk_size = get_chunk_size(config=config)
     data = xr.open_dataset(
         f"{repo_path}{os.sep}"
         + f"{config['saildrone_data_folder']}{os.sep}"
@@ -366,26 +501,21 @@ def read_saildrone(
         data = data.drop(labels="trajectory")
 
     if masked_nan:
-        masked_data = data.to_dataframe()
-        if "time" in masked_data.columns:
-            masked_data = masked_data.set_index("time")
-        masked_data = masked_data.where(masked_data < fill_value)
-        masked_data = masked_data.reset_index()
-        masked_data = masked_data[masked_data.lon.notna() & masked_data.lat.notna()]
-        masked_data = masked_data.dropna(axis=0, thresh=4)
-        masked_data["lat"] = masked_data["lat"].round(decimals=2)
-        masked_data["lon"] = masked_data["lon"].round(decimals=2)
-        if "wind_speed" not in masked_data.columns:
-            masked_data["wind_speed"] = np.nan
-        if "wind_direction" not in masked_data.columns:
-            masked_data["wind_direction"] = np.nan
-        else:
-            masked_data["wind_direction"] = (masked_data.wind_direction + 180) % 360
-
-        if ("2021" in filename) and ("1060" in filename):
-            masked_data["wind_speed"].iloc[42000:] = np.nan
-            masked_data["wind_direction"].iloc[42000:] = np.nan
-
+        blocks = []
+        n_valid = 0
+        for first_row, block in iter_dataset_blocks(data=data, dim="obs", chunk_size=chunk_size):
+            block = mask_saildrone_data(
+                data=block.load(),
+                filename=filename,
+                fill_value=fill_value,
+                first_row=first_row,
+                first_valid_row=n_valid,
+            )
+            n_valid += len(block)
+            blocks.append(block)
+        masked_data = pd.concat(blocks)
+        if to_pd:
+            return masked_data.reset_index()
         data = masked_data.to_xarray()
         data = data.set_coords(["lat", "lon"])
 
@@ -395,6 +525,50 @@ def read_saildrone(
     return data
 
 
+def mask_saildrone_data(
+    data: xr.Dataset,
+    filename: str,
+    fill_value: float = 9e36,
+    first_row: int = 0,
+    first_valid_row: int = 0,
+) -> pd.DataFrame:
+    """
+    masked_data = mask_saildrone_data(data, filename, fill_value, first_row, first_valid_row)
+
+    Arguments:
+    - data: the (renamed) saildrone dataset, or a block of its observations
+    - filename: name of the saildrone file
+    - fill_value: value above which things should be masked
+    - first_row: position of the first observation of the block in the file
+    - first_valid_row: number of valid observations in the file before the block
+
+    Returns:
+    - masked_data: the valid observations, indexed by their position in the file.
+    """
+    masked_data = data.to_dataframe()
+    if "time" in masked_data.columns:
+        masked_data = masked_data.set_index("time")
+    masked_data = masked_data.where(masked_data < fill_value)
+    masked_data = masked_data.reset_index()
+    masked_data.index = masked_data.index + first_row
+    masked_data = masked_data[masked_data.lon.notna() & masked_data.lat.notna()]
+    masked_data = masked_data.dropna(axis=0, thresh=4)
+    masked_data["lat"] = masked_data["lat"].round(decimals=2)
+    masked_data["lon"] = masked_data["lon"].round(decimals=2)
+    if "wind_speed" not in masked_data.columns:
+        masked_data["wind_speed"] = np.nan
+    if "wind_direction" not in masked_data.columns:
+        masked_data["wind_direction"] = np.nan
+    else:
+        masked_data["wind_direction"] = (masked_data.wind_direction + 180) % 360
+
+    if ("2021" in filename) and ("1060" in filename):
+        masked_data["wind_speed"].iloc[max(0, 42000 - first_valid_row):] = np.nan
+        masked_data["wind_direction"].iloc[max(0, 42000 - first_valid_row):] = np.nan
+
+    return masked_data
+
+
 def write_to_log(filename: str, config: dict, in_range: bool = True):
     """
     write_in_range_to_log(filenames: list, config: dict, in_range: bool)
@@ -444,7 +618,7 @@ def write_to_log(filename: str, config: dict, in_range: bool = True):
 
 
 def write_matching_data_to_file(
-    matching_data: pd.DataFrame, matching_file: str, config: dict
+    matching_data: pd.DataFrame, matching_file: str, config: dict, append: bool = False
 ):
     repo_path = fetch_repo_path()
     matching_data_path = (
@@ -461,9 +635,35 @@ def write_matching_data_to_file(
     current_csv = f"{matching_data_path}{os.sep}{matching_file.split('.')[0]}.csv"
     if not os.path.isfile(current_csv):
         matching_data.to_csv(current_csv, index=False)
+    elif append:
+        matching_data.to_csv(current_csv, index=False, mode="a", header=False)
 
 
-def read_matching_data_from_file(config: dict, join_swaths: bool = False):
+def read_matching_data_from_file(
+    config: dict, join_swaths: bool = False, time_range: list = None
+):
+    """
+    match_data = read_matching_data_from_file(config, join_swaths, time_range)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - join_swaths: if True, returns one dataframe instead of one per swath
+    - time_range: [start_time, end_time] of the saildrone points to read
+        (None reads all)
+
+    Returns:
+    - match_data: the matching points of the configured saildrone, product
+        and tolerances - a list with one dataframe per swath (sorted by
+        swath filename), or a single dataframe if join_swaths.
+
+    Reads the match store (match_store_format: parquet) or the legacy
+    per-swath csv files (match_store_format: csv).
+    """
+    if config.get("match_store_format", "parquet") == "parquet":
+        return read_matching_data_from_store(
+            config=config, join_swaths=join_swaths, time_range=time_range
+        )
+
     repo_path = fetch_repo_path()
 
     match_path = (
@@ -478,6 +678,10 @@ def read_matching_data_from_file(config: dict, join_swaths: bool = False):
     match_data = []
     for fl in match_fls:
         data = read_matching_data_from_file_product(filename=f"{match_path}/{fl}")
+        if time_range is not None:
+            data = data[
+                (data.sd_time >= time_range[0]) & (data.sd_time <= time_range[1])
+            ].reset_index(drop=True)
         match_data.append(data)
 
     if join_swaths:
@@ -486,14 +690,396 @@ def read_matching_data_from_file(config: dict, join_swaths: bool = False):
     return match_data
 
 
+def read_swath_matching_data(config: dict, time_range: list = None) -> list:
+    """
+    match_data = read_swath_matching_data(config, time_range)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - time_range: [start_time, end_time] of the saildrone points to read
+        (None reads all)
+
+    Returns:
+    - match_data: the matching points of the configured saildrone, product
+        and tolerances, as (swath filename, dataframe) pairs sorted by swath
+        filename. The swath is read from the granule column of the match
+        store (or from the name of the csv file), so the dataframes are
+        never paired with a separate list of swaths.
+    """
+    if config.get("match_store_format", "parquet") == "parquet":
+        data = read_matching_data_from_store(config=config, join_swaths=True, time_range=time_range)
+        return [
+            (granule, swath_data.drop(columns="granule").reset_index(drop=True))
+            for granule, swath_data in data.groupby("granule", sort=True)
+        ]
+
+    match_path = (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['matching_data_folder']}{os.sep}"
+        + f"SD{config['saildrone_number']}_{config['saildrone_year']}{os.sep}"
+        + f"{config['satellite_product']}{os.sep}"
+        + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km"
+    )
+    if not os.path.isdir(match_path):
+        return []
+
+    sat_fls = get_swath_filenames(config=config)
+    match_data = []
+    for fl in sorted(os.listdir(match_path)):
+        if not fl.endswith(".csv"):
+            continue
+        data = read_matching_data_from_file_product(filename=f"{match_path}{os.sep}{fl}")
+        if time_range is not None:
+            data = data[
+                (data.sd_time >= time_range[0]) & (data.sd_time <= time_range[1])
+            ].reset_index(drop=True)
+        if len(data) > 0:
+            match_data.append((sat_fls.get(fl[: -len(".csv")], fl[: -len(".csv")]), data))
+
+    return sorted(match_data, key=lambda swath: swath[0])
+
+
+def get_match_store_path(
+    config: dict, sd_number: str = None, sd_year: str = None
+) -> str:
+    """
+    path = get_match_store_path(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - sd_number, sd_year: the saildrone (defaults to the one in the config)
+
+    Returns:
+    - path: the partition of the match store with the matching points of
+        that saildrone, the configured satellite product and tolerances:
+        <matching_data_folder>/store/drone=<num>/year=<year>/product=<product>/tolerance=<x>min_<y>km
+    """
+    if sd_number is None:
+        sd_number = config["saildrone_number"]
+    if sd_year is None:
+        sd_year = config["saildrone_year"]
+
+    return (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['matching_data_folder']}{os.sep}"
+        + f"store{os.sep}"
+        + f"drone={sd_number}{os.sep}"
+        + f"year={sd_year}{os.sep}"
+        + f"product={config['satellite_product']}{os.sep}"
+        + f"tolerance={config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km"
+    )
+
+
+def write_matching_data_to_store(
+    matching_data: list, matching_files: list, config: dict
+):
+    """
+    write_matching_data_to_store(matching_data, matching_files, config)
+
+    Arguments:
+    - matching_data: list of dataframes with the matching points
+    - matching_files: the satellite swath filename of each dataframe
+    - config: the dictionary from the config yaml file
+
+    Returns: None
+    Appends the matching points of a batch of swaths to the match store,
+    as one parquet file in the partition of the saildrone, product and
+    tolerances (see get_match_store_path). The swath filename is stored
+    in the granule column.
+    """
+    if len(matching_data) == 0:
+        return
+
+    data = pd.concat(
+        [
+            swath_data.assign(granule=swath_file)
+            for swath_data, swath_file in zip(matching_data, matching_files)
+        ]
+    ).reset_index(drop=True)
+
+    store_path = get_match_store_path(config=config)
+    os.makedirs(store_path, exist_ok=True)
+
+    # written under a temporary name, so readers never see a partial file
+    part = f"part-{pd.Timestamp.now():%Y%m%d%H%M%S%f}-{os.getpid()}"
+    data.to_parquet(f"{store_path}{os.sep}.{part}.tmp", index=False)
+    os.replace(
+        f"{store_path}{os.sep}.{part}.tmp", f"{store_path}{os.sep}{part}.parquet"
+    )
+
+
+def empty_match_frame() -> pd.DataFrame:
+    """
+    data = empty_match_frame()
+
+    Returns:
+    - data: a match store dataframe without rows, with the typed columns
+        of the matching points (times as datetime64[ns]).
+    """
+    return pd.DataFrame(
+        {
+            "sd_lon": pd.Series(dtype="float64"),
+            "sd_lat": pd.Series(dtype="float64"),
+            "sd_time": pd.Series(dtype="datetime64[ns]"),
+            "st_lon": pd.Series(dtype="float64"),
+            "st_lat": pd.Series(dtype="float64"),
+            "st_time": pd.Series(dtype="datetime64[ns]"),
+            "dist": pd.Series(dtype="float64"),
+            "granule": pd.Series(dtype="object"),
+        }
+    )
+
+
+def get_swath_filenames(config: dict) -> dict:
+    """
+    swath_filenames = get_swath_filenames(config)
+
+    Returns:
+    - swath_filenames: {name: filename} of the swaths of the configured
+        product, in the satellite data folder or in the in_range log of the
+        saildrone (swaths no longer in the folder), name being the filename
+        without its extension, as in the csv matching points.
+    """
+    return {
+        fl.split(".")[0]: fl
+        for fl in read_in_range_log(config=config) + (check_for_satellite_data(config=config) or [])
+        if len(fl) > 0
+    }
+
+
+def read_stored_granules(config: dict, sd_number: str = None, sd_year: str = None) -> set:
+    """
+    granules = read_stored_granules(config, sd_number, sd_year)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - sd_number, sd_year: the saildrone (defaults to the one in the config)
+
+    Returns:
+    - granules: the swaths with matching points in the match store partition
+        of the saildrone, product and tolerances.
+    """
+    store_path = get_match_store_path(config=config, sd_number=sd_number, sd_year=sd_year)
+    granules = set()
+    if os.path.isdir(store_path):
+        for fl in os.listdir(store_path):
+            if fl.endswith(".parquet"):
+                granules.update(pd.read_parquet(f"{store_path}{os.sep}{fl}", columns=["granule"]).granule)
+
+    return granules
+
+
+def import_match_files(config: dict, sd_number: str = None, sd_year: str = None) -> int:
+    """
+    n_imported = import_match_files(config, sd_number, sd_year)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - sd_number, sd_year: the saildrone (defaults to the one in the config)
+
+    Returns:
+    - n_imported: the number of swaths whose csv matching points
+        (match_store_format: csv, or before the match store) were added to
+        the match store partition of the saildrone, product and tolerances.
+
+    This is done once per partition (a .imported_csv file marks it): swaths
+    already in the store are not imported again, and the csv files are
+    kept as they are.
+    """
+    if sd_number is None:
+        sd_number = config["saildrone_number"]
+    if sd_year is None:
+        sd_year = config["saildrone_year"]
+
+    csv_path = (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['matching_data_folder']}{os.sep}"
+        + f"SD{sd_number}_{sd_year}{os.sep}"
+        + f"{config['satellite_product']}{os.sep}"
+        + f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km"
+    )
+    store_path = get_match_store_path(config=config, sd_number=sd_number, sd_year=sd_year)
+    marker = f"{store_path}{os.sep}.imported_csv"
+    if not os.path.isdir(csv_path) or os.path.isfile(marker):
+        return 0
+
+    csv_fls = sorted(fl for fl in os.listdir(csv_path) if fl.endswith(".csv"))
+    stored = read_stored_granules(config=config, sd_number=sd_number, sd_year=sd_year)
+
+    sd_config = {**config, "saildrone_number": sd_number, "saildrone_year": sd_year}
+    sat_fls = get_swath_filenames(config=sd_config)
+    matching_data = []
+    matching_files = []
+    for fl in csv_fls:
+        granule = sat_fls.get(fl[: -len(".csv")], fl[: -len(".csv")])
+        if granule in stored:
+            continue
+        data = read_matching_data_from_file_product(filename=f"{csv_path}{os.sep}{fl}")
+        # typed as the matching points written by the matcher
+        data["sd_time"] = data.sd_time.astype("datetime64[ns]")
+        data["st_time"] = data.st_time.astype("datetime64[ns]")
+        matching_data.append(data)
+        matching_files.append(granule)
+
+    write_matching_data_to_store(matching_data=matching_data, matching_files=matching_files, config=sd_config)
+    os.makedirs(store_path, exist_ok=True)
+    with open(marker, "w") as fl:
+        fl.write(f"{len(matching_files)} swaths imported from {csv_path}\n")
+    if len(matching_files) > 0:
+        print(f"     Imported the matching points of {len(matching_files)} swaths from {csv_path} into the match store.")
+
+    return len(matching_files)
+
+
+def read_matching_data_from_store(
+    config: dict,
+    join_swaths: bool = False,
+    time_range: list = None,
+    sd_number: str = None,
+    sd_year: str = None,
+):
+    """
+    match_data = read_matching_data_from_store(config, join_swaths, time_range)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - join_swaths: if True, returns one dataframe instead of one per swath
+    - time_range: [start_time, end_time] of the saildrone points to read
+    - sd_number, sd_year: the saildrone (defaults to the one in the config)
+
+    Returns:
+    - match_data: list with one dataframe per swath (sorted by swath
+        filename), or a single dataframe (with a granule column) if join_swaths.
+
+    Only the partition of the saildrone, product and tolerances is read,
+    and the time range is applied while reading (row groups outside it
+    are skipped). The csv files of the saildrone, product and tolerances
+    are imported into the partition first, if not done yet (see
+    import_match_files).
+    """
+    import_match_files(config=config, sd_number=sd_number, sd_year=sd_year)
+
+    store_path = get_match_store_path(
+        config=config, sd_number=sd_number, sd_year=sd_year
+    )
+    parts = []
+    if os.path.isdir(store_path):
+        parts = sorted(
+            f"{store_path}{os.sep}{fl}"
+            for fl in os.listdir(store_path)
+            if fl.endswith(".parquet")
+        )
+
+    if len(parts) == 0:
+        data = empty_match_frame()
+    else:
+        filters = None
+        if time_range is not None:
+            filters = [
+                ("sd_time", ">=", pd.Timestamp(time_range[0])),
+                ("sd_time", "<=", pd.Timestamp(time_range[1])),
+            ]
+        data = pd.concat(
+            [pd.read_parquet(part, filters=filters) for part in parts]
+        ).reset_index(drop=True)
+
+    if join_swaths:
+        return data
+
+    return [
+        swath_data.drop(columns="granule").reset_index(drop=True)
+        for _, swath_data in data.groupby("granule", sort=True)
+    ]
+
+
+def read_all_matching_data(config: dict) -> dict:
+    """
+    match_data = read_all_matching_data(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - match_data: for every saildrone with matching points for the configured
+        product and tolerances, {saildrone filename: [(swath filename, dataframe), ...]}
+    """
+    match_path = f"{fetch_repo_path()}{os.sep}{config['matching_data_folder']}"
+    tolerance = f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km"
+
+    match_data = {}
+    if config.get("match_store_format", "parquet") == "parquet":
+        # saildrones with only csv matching points (see import_match_files)
+        if os.path.isdir(match_path):
+            for sd_dir in sorted(os.listdir(match_path)):
+                if sd_dir.startswith("SD") and "_" in sd_dir:
+                    sd_number, sd_year = sd_dir[2:].split("_", 1)
+                    import_match_files(config=config, sd_number=sd_number, sd_year=sd_year)
+
+        store_path = f"{match_path}{os.sep}store"
+        if not os.path.isdir(store_path):
+            return match_data
+        for drone_dir in sorted(os.listdir(store_path)):
+            for year_dir in sorted(os.listdir(f"{store_path}{os.sep}{drone_dir}")):
+                sd_number = drone_dir.split("=")[1]
+                sd_year = year_dir.split("=")[1]
+                sd_match_data = read_swath_matching_data(
+                    config={**config, "saildrone_number": sd_number, "saildrone_year": sd_year}
+                )
+                if len(sd_match_data) == 0:
+                    continue
+                sd_filename = check_for_saildrone_data(
+                    config=config, sd_number=sd_number, sd_year=sd_year
+                )
+                match_data[sd_filename] = sd_match_data
+        return match_data
+
+    for sd_dir in sorted(os.listdir(match_path)):
+        tolerance_path = (
+            f"{match_path}{os.sep}{sd_dir}{os.sep}"
+            + f"{config['satellite_product']}{os.sep}{tolerance}"
+        )
+        if sd_dir == "store" or not os.path.isdir(tolerance_path):
+            continue
+        match_fls = [
+            f"{tolerance_path}{os.sep}{fl}" for fl in sorted(os.listdir(tolerance_path))
+        ]
+        if len(match_fls) == 0:
+            continue
+        sd_filename = get_sd_file_from_match_filename(filename=match_fls[0], config=config)
+        match_data[sd_filename] = [
+            (
+                get_sat_file_from_match_filename(filename=fl, config=config),
+                read_matching_data_from_file_product(filename=fl),
+            )
+            for fl in match_fls
+        ]
+
+    return match_data
+
+
 def read_swath(
-    filename: str, config: dict, masked_nan: bool = False, as_pd: bool = False
+    filename: str,
+    config: dict,
+    masked_nan: bool = False,
+    as_pd: bool = False,
+    variables: list = None,
+    time_range: list = None,
+    bbox: dict = None,
 ) -> xr.DataArray:
     """
     data = read_swath(filename: str, config: dict)
 
     Arguments:
     - filename: name of the file to be read in
+    - variables: (renamed) data variables to read; lat, lon and time are
+        always kept. If None, all the variables are kept. The other variables
+        are never read, and the masked points are selected on these ones
+        (see mask_swath_data).
+    - time_range, bbox: if given, only the block of the swath containing
+        the points within the time range and lat/lon box is read
+        (see subset_swath)
+    - with streaming_chunk_size set in the config, the coordinates are
+        scanned (and masked data converted) streaming_chunk_size rows at a time
 
     Returns:
     - data: an xarray containing data with coordinate awareness.
@@ -506,6 +1092,7 @@ def read_swath(
     """
     repo_path = fetch_repo_path()
     product = config["satellite_product"]
+    chunk_size = get_chunk_size(config=config)
 
     if product == DS.ASCAT_METOPB.value or product == DS.ASCAT.value:
         current_filename = (
@@ -514,7 +1101,14 @@ def read_swath(
             + f"{product}{os.sep}"
             + f"{filename}"
         )
-        data = read_ASCAT(filename=current_filename, masked_nan=masked_nan)
+        data = read_ASCAT(
+            filename=current_filename,
+            masked_nan=masked_nan and not as_pd,
+            variables=variables,
+            time_range=time_range,
+            bbox=bbox,
+            chunk_size=chunk_size,
+        )
 
     if product == DS.SMAP.value:
         current_filename = (
@@ -523,20 +1117,305 @@ def read_swath(
             + f"{product}{os.sep}"
             + f"{filename}"
         )
-        data = read_SMAP(filename=current_filename, masked_nan=masked_nan)
+        data = read_SMAP(
+            filename=current_filename,
+            masked_nan=masked_nan and not as_pd,
+            variables=variables,
+            time_range=time_range,
+            bbox=bbox,
+            chunk_size=chunk_size,
+        )
 
-    if as_pd:
+    if masked_nan and as_pd:
+        # the masked points are already a dataframe (no round trip through xarray)
+        data = mask_swath_blocks(data=data, variables=variables, chunk_size=chunk_size).reset_index()
+    elif as_pd:
         data = data.to_dataframe().reset_index()
 
     return data
 
 
-def read_ASCAT(filename: str, masked_nan: bool = False) -> xr.DataArray:
+def subset_swath(
+    data: xr.Dataset, time_range: list = None, bbox: dict = None, chunk_size: int = None
+) -> xr.Dataset:
+    """
+    data = subset_swath(data, time_range, bbox, chunk_size)
+
+    Arguments:
+    - data: the (lazily opened, renamed) swath dataset, with lon in [-180, 180)
+    - time_range: [start_time, end_time] of the points to keep (None keeps all)
+    - bbox: dictionary with lonmin, lonmax, latmin, latmax (None keeps all),
+        as returned by get_saildrone_position_extrema
+    - chunk_size: number of rows of coordinates scanned at once (None scans all)
+
+    Returns:
+    - data: the smallest block of the swath (e.g., the range of rows) that
+        contains all the points inside the time range and box.
+
+    Only the lat, lon and time coordinates are read to find the block, the
+    data variables are only read for the rows within it.
+    Points outside the window but within the block are kept - callers
+    still need to apply their exact criteria.
+    """
+    if time_range is None and bbox is None:
+        return data
+
+    dims = tuple(dict.fromkeys(data.lat.dims + data.lon.dims + data.time.dims))
+    inside = {dim: np.zeros(data.sizes[dim], dtype=bool) for dim in dims}
+    for first_row, coords in iter_dataset_blocks(
+        data=data.drop_vars(list(data.data_vars)), dim=dims[0], chunk_size=chunk_size
+    ):
+        lat, lon, time = xr.broadcast(coords.lat, coords.lon, coords.time)
+        lat = lat.values
+        lon = lon.values
+        time = time.values
+
+        mask = np.isfinite(lat) & np.isfinite(lon)
+        if time_range is not None:
+            mask &= time >= pd.Timestamp(time_range[0]).to_datetime64()
+            mask &= time <= pd.Timestamp(time_range[1]).to_datetime64()
+        if bbox is not None:
+            # the masked data has coordinates rounded to 2 decimals
+            pad = 0.01
+            mask &= (lon >= bbox["lonmin"] - pad) & (lon <= bbox["lonmax"] + pad)
+            mask &= (lat >= bbox["latmin"] - pad) & (lat <= bbox["latmax"] + pad)
+
+        for axis, dim in enumerate(dims):
+            other_axes = tuple(ax for ax in range(mask.ndim) if ax != axis)
+            if axis == 0:
+                inside[dim][first_row : first_row + mask.shape[0]] |= mask.any(axis=other_axes)
+            else:
+                inside[dim] |= mask.any(axis=other_axes)
+
+    if not inside[dims[0]].any():
+        return data.isel({dims[0]: slice(0, 0)})
+
+    block = {}
+    for dim in dims:
+        idx = np.flatnonzero(inside[dim])
+        block[dim] = slice(idx[0], idx[-1] + 1)
+
+    return data.isel(block)
+
+
+def get_swath_extent(data: xr.Dataset, chunk_size: int = None) -> dict:
+    """
+    extent = get_swath_extent(data, chunk_size)
+
+    Arguments:
+    - data: the swath dataset (only its lat, lon and time coordinates are read)
+    - chunk_size: number of rows of coordinates scanned at once (None scans all)
+
+    Returns:
+    - extent: dictionary with time_start, time_end, latmin, latmax, lonmin,
+        lonmax and n_points of the points with valid coordinates,
+        or None if there are no such points.
+    """
+    dims = tuple(dict.fromkeys(data.lat.dims + data.lon.dims + data.time.dims))
+    extents = []
+    for _, coords in iter_dataset_blocks(
+        data=data.drop_vars(list(data.data_vars)), dim=dims[0], chunk_size=chunk_size
+    ):
+        lat, lon, time = xr.broadcast(coords.lat, coords.lon, coords.time)
+        lat = lat.values
+        lon = lon.values
+        time = time.values
+
+        valid = np.isfinite(lat) & np.isfinite(lon) & ~np.isnat(time)
+        if not valid.any():
+            continue
+
+        extents.append(
+            {
+                "time_start": pd.Timestamp(time[valid].min()),
+                "time_end": pd.Timestamp(time[valid].max()),
+                "latmin": float(lat[valid].min()),
+                "latmax": float(lat[valid].max()),
+                "lonmin": float(lon[valid].min()),
+                "lonmax": float(lon[valid].max()),
+                "n_points": int(valid.sum()),
+            }
+        )
+
+    if len(extents) == 0:
+        return None
+
+    extent = {
+        "time_start": min(ext["time_start"] for ext in extents),
+        "time_end": max(ext["time_end"] for ext in extents),
+        "latmin": min(ext["latmin"] for ext in extents),
+        "latmax": max(ext["latmax"] for ext in extents),
+        "lonmin": min(ext["lonmin"] for ext in extents),
+        "lonmax": max(ext["lonmax"] for ext in extents),
+        "n_points": sum(ext["n_points"] for ext in extents),
+    }
+
+    return extent
+
+
+def read_swath_extent(filename: str, config: dict) -> dict:
+    """
+    extent = read_swath_extent(filename: str, config: dict)
+
+    Arguments:
+    - filename: name of the file to be read in
+
+    Returns:
+    - extent: the time range and lat/lon box of the swath (see get_swath_extent).
+
+    Only the coordinates are read from the file.
+    """
+    with profile_stage(stage="extent") as record:
+        data = read_swath(filename=filename, config=config, variables=[])
+        extent = get_swath_extent(data=data, chunk_size=get_chunk_size(config=config))
+        record["rows_out"] = 0 if extent is None else extent["n_points"]
+
+    return extent
+
+
+def mask_swath_data(data: xr.Dataset, variables: list = None) -> pd.DataFrame:
+    """
+    masked_data = mask_swath_data(data, variables)
+
+    Arguments:
+    - data: the (renamed) swath dataset, or a block of its rows
+    - variables: data variables to keep (None keeps all)
+
+    Returns:
+    - masked_data: the points with valid coordinates and at least one valid
+        requested variable, indexed by time, with lat/lon rounded to 2 decimals.
+
+    The points are selected on the requested variables only (the others are
+    dropped first, so they are not decoded): a point where none of them is
+    valid is not kept, even if another variable of the swath is. With
+    variables=None, all the variables of the swath are used, as before.
+    """
+    if variables is not None:
+        data = data.drop_vars([var for var in data.data_vars if var not in variables])
+
+    # lat, lon, time and one of the variables (or of the other coordinates) are valid
+    columns = [name for name in data.coords if name not in data.dims] + list(data.data_vars)
+    n_valid = sum(data[name].notnull().astype(np.int8) for name in columns)
+    keep = data.lat.notnull() & data.lon.notnull() & (n_valid >= 4)
+
+    data_df = data.assign(keep_row=keep).to_dataframe().reset_index(drop=True)
+    masked_data = data_df[data_df.pop("keep_row").to_numpy()]
+    masked_data = masked_data.set_index("time")
+    masked_data["lat"] = masked_data["lat"].round(decimals=2)
+    masked_data["lon"] = masked_data["lon"].round(decimals=2)
+
+    return masked_data
+
+
+def mask_swath_blocks(data: xr.Dataset, variables: list = None, chunk_size: int = None) -> pd.DataFrame:
+    """
+    masked_data = mask_swath_blocks(data, variables, chunk_size)
+
+    Arguments:
+    - data: the lazily opened (renamed, subset) swath dataset
+    - variables: data variables to keep (None keeps all)
+    - chunk_size: number of rows loaded and masked at once (None loads all)
+
+    Returns:
+    - masked_data: the masked points of the whole swath (see mask_swath_data).
+    """
+    return pd.concat(
+        [
+            mask_swath_data(data=block.load(), variables=variables)
+            for _, block in iter_dataset_blocks(data=data, dim=data.lat.dims[0], chunk_size=chunk_size)
+        ]
+    )
+
+
+def read_swath_blocks(
+    filename: str,
+    config: dict,
+    variables: list = None,
+    time_range: list = None,
+    bbox: dict = None,
+):
+    """
+    for data in read_swath_blocks(filename, config, variables, time_range, bbox):
+
+    Arguments:
+    - same as read_swath
+
+    Returns:
+    - a generator of masked swath dataframes (as read_swath(..., masked_nan=True,
+        as_pd=True)), of at most streaming_chunk_size rows of the swath each.
+        Without streaming_chunk_size in the config, the whole (subset) swath
+        is a single block.
+
+    Only one block of the swath is in memory at a time.
+    """
+    with profile_stage(stage="subset") as record:
+        data = read_swath(
+            filename=filename,
+            config=config,
+            variables=variables,
+            time_range=time_range,
+            bbox=bbox,
+        )
+        record["rows_out"] = data.lat.size
+    for _, block in iter_dataset_blocks(
+        data=data, dim=data.lat.dims[0], chunk_size=get_chunk_size(config=config)
+    ):
+        with profile_stage(stage="decode") as record:
+            block = block.load()
+            record["rows_out"] = block.lat.size
+        with profile_stage(stage="mask", rows_in=block.lat.size) as record:
+            masked_data = mask_swath_data(data=block, variables=variables).reset_index()
+            record["rows_out"] = len(masked_data)
+        yield masked_data
+
+
+def select_swath_variables(data: xr.Dataset, filename: str, variables: list = None) -> xr.Dataset:
+    """
+    data = select_swath_variables(data, filename, variables)
+
+    Arguments:
+    - data: the (lazily opened, renamed) swath dataset
+    - filename: name of the swath file (for the error message)
+    - variables: data variables requested (None requests all)
+
+    Returns:
+    - data: the swath dataset with only the requested data variables (and
+        all the coordinates), so that the others are never read.
+
+    Raises a ValueError if one of the requested variables is not in the
+    swath, instead of masking every point of it (e.g., a variable name of
+    another product in satellite_variable_name).
+    """
+    if variables is None:
+        return data
+
+    missing = [var for var in variables if var not in data.data_vars]
+    if len(missing) > 0:
+        raise ValueError(
+            f"{', '.join(missing)} not in {os.path.basename(filename)} "
+            + f"(its variables are {', '.join(data.data_vars)}). "
+            + "Check satellite_variable_name, match_satellite_variables, figure_variables and product_variables in the config."
+        )
+
+    return data.drop_vars([var for var in data.data_vars if var not in variables])
+
+
+def read_ASCAT(
+    filename: str,
+    masked_nan: bool = False,
+    variables: list = None,
+    time_range: list = None,
+    bbox: dict = None,
+    chunk_size: int = None,
+) -> xr.DataArray:
     """
     data = read_ASCAT(filename: str)
 
     Arguments:
     - filename: name of the file to be read in
+    - variables: (renamed) data variables to keep (None keeps all)
+    - time_range, bbox: window of the swath to read (see subset_swath)
+    - chunk_size: number of rows processed at once (None processes all)
 
     Returns:
     - data: an xarray containing data with coordinate awareness.
@@ -568,25 +1447,32 @@ def read_ASCAT(filename: str, masked_nan: bool = False) -> xr.DataArray:
             "wind_dir": "wind_direction",
         }
     )
+    data = select_swath_variables(data=data, filename=filename, variables=variables)
+    data = subset_swath(data=data, time_range=time_range, bbox=bbox, chunk_size=chunk_size)
     if masked_nan:
-        data_df = data.to_dataframe().reset_index(drop=True)
-        masked_data = data_df[data_df.lon.notna() & data_df.lat.notna()]
-        masked_data = masked_data.dropna(axis=0, thresh=4)
-        masked_data = masked_data.set_index("time")
-        masked_data["lat"] = masked_data["lat"].round(decimals=2)
-        masked_data["lon"] = masked_data["lon"].round(decimals=2)
+        masked_data = mask_swath_blocks(data=data, variables=variables, chunk_size=chunk_size)
         data = masked_data.to_xarray()
         data = data.set_coords(["lat", "lon"])
 
     return data
 
 
-def read_SMAP(filename: str, masked_nan: bool = False) -> xr.DataArray:
+def read_SMAP(
+    filename: str,
+    masked_nan: bool = False,
+    variables: list = None,
+    time_range: list = None,
+    bbox: dict = None,
+    chunk_size: int = None,
+) -> xr.DataArray:
     """
     data = read_SMAP(filename: str)
 
     Arguments:
     - filename: name of the file to be read in
+    - variables: (renamed) data variables to keep (None keeps all)
+    - time_range, bbox: window of the swath to read (see subset_swath)
+    - chunk_size: number of rows processed at once (None processes all)
 
     Returns:
     - data: an xarray containing data with coordinate awareness.
@@ -627,13 +1513,10 @@ def read_SMAP(filename: str, masked_nan: bool = False) -> xr.DataArray:
             "sss_smap_40km": "salinity_40km",
         }
     )
+    data = select_swath_variables(data=data, filename=filename, variables=variables)
+    data = subset_swath(data=data, time_range=time_range, bbox=bbox, chunk_size=chunk_size)
     if masked_nan:
-        data_df = data.to_dataframe().reset_index(drop=True)
-        masked_data = data_df[data_df.lon.notna() & data_df.lat.notna()]
-        masked_data = masked_data.dropna(axis=0, thresh=4)
-        masked_data = masked_data.set_index("time")
-        masked_data["lat"] = masked_data["lat"].round(decimals=2)
-        masked_data["lon"] = masked_data["lon"].round(decimals=2)
+        masked_data = mask_swath_blocks(data=data, variables=variables, chunk_size=chunk_size)
         data = masked_data.to_xarray()
         data = data.set_coords(["lat", "lon"])
 
@@ -0,0 +1,302 @@
+import os
+import pandas as pd
+import sqlite3
+
+from read_write import (
+    fetch_repo_path,
+    import_match_files,
+    read_in_range_log,
+    read_not_in_range_log,
+    read_stored_granules,
+    write_to_log,
+)
+
+
+# columns added after the first version of the database, with their type
+# (added to existing databases when they are opened)
+ADDED_STATE_COLUMNS = {
+    "sd_time_start": "TEXT",
+    "sd_time_end": "TEXT",
+    "granule_time_start": "TEXT",
+    "granule_time_end": "TEXT",
+}
+
+
+def get_state_db_path(config: dict) -> str:
+    """
+    path = get_state_db_path(config)
+
+    Returns:
+    - the path to the processing state database (in the log folder).
+    """
+    return (
+        f"{fetch_repo_path()}{os.sep}"
+        + f"{config['log_data_folder']}{os.sep}"
+        + "processing_state.sqlite"
+    )
+
+
+def get_state_key(config: dict) -> tuple:
+    """
+    key = get_state_key(config)
+
+    Returns:
+    - the (drone, year, product, tolerance) the processing state of the
+        config belongs to.
+    """
+    return (
+        str(config["saildrone_number"]),
+        str(config["saildrone_year"]),
+        config["satellite_product"],
+        f"{config['saildrone_time_tolerance_min']}min_{config['saildrone_distance_tolerance_km']}km",
+    )
+
+
+def use_state_db(config: dict) -> bool:
+    return config.get("processing_state", "sqlite") == "sqlite"
+
+
+def connect_state_db(config: dict) -> sqlite3.Connection:
+    """
+    con = connect_state_db(config)
+
+    Returns:
+    - a connection to the processing state database.
+
+    Creates the tables if needed, and imports the existing in_range and
+    not_in_range text logs of the config (once per log).
+    """
+    os.makedirs(os.path.dirname(get_state_db_path(config=config)), exist_ok=True)
+    con = sqlite3.connect(get_state_db_path(config=config))
+    with con:
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS granule_state (
+                drone TEXT,
+                year TEXT,
+                product TEXT,
+                tolerance TEXT,
+                granule TEXT,
+                status TEXT,
+                min_distance_km REAL,
+                processing_time_sec REAL,
+                processed_at TEXT,
+                sd_time_start TEXT,
+                sd_time_end TEXT,
+                granule_time_start TEXT,
+                granule_time_end TEXT,
+                PRIMARY KEY (drone, year, product, tolerance, granule)
+            )
+            """
+        )
+        columns = [row[1] for row in con.execute("PRAGMA table_info(granule_state)")]
+        for column, column_type in ADDED_STATE_COLUMNS.items():
+            if column not in columns:
+                con.execute(f"ALTER TABLE granule_state ADD COLUMN {column} {column_type}")
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS imported_logs (
+                drone TEXT,
+                year TEXT,
+                product TEXT,
+                tolerance TEXT,
+                log TEXT,
+                PRIMARY KEY (drone, year, product, tolerance, log)
+            )
+            """
+        )
+
+    import_log_files(con=con, config=config)
+
+    return con
+
+
+def import_log_files(con: sqlite3.Connection, config: dict):
+    """
+    import_log_files(con, config)
+
+    Returns: None
+    One-time import of the in_range / not_in_range text logs of the config
+    into the state database. Imported granules have no min distance,
+    processing time or time coverage (so they are not re-matched when the
+    saildrone file grows). Granules already in the database are left untouched.
+    With the parquet match store, the csv matching points are imported into
+    the store first (see import_match_files), and in_range granules whose
+    matching points are not in the store are not imported, so they are
+    matched again.
+    """
+    key = get_state_key(config=config)
+    logs = {
+        "in_range": read_in_range_log,
+        "not_in_range": read_not_in_range_log,
+    }
+    for status, read_log in logs.items():
+        imported = con.execute(
+            "SELECT 1 FROM imported_logs WHERE drone = ? AND year = ? AND product = ? AND tolerance = ? AND log = ?",
+            key + (status,),
+        ).fetchone()
+        if imported is not None:
+            continue
+
+        granules = read_log(config=config)
+        if len(granules) == 0:
+            continue
+        if status == "in_range" and config.get("match_store_format", "parquet") == "parquet":
+            import_match_files(config=config)
+            stored = read_stored_granules(config=config)
+            granules = [fl for fl in granules if fl in stored]
+        with con:
+            con.executemany(
+                "INSERT OR IGNORE INTO granule_state (drone, year, product, tolerance, granule, status) VALUES (?, ?, ?, ?, ?, ?)",
+                [key + (fl, status) for fl in granules if len(fl) > 0],
+            )
+            con.execute("INSERT INTO imported_logs VALUES (?, ?, ?, ?, ?)", key + (status,))
+
+
+def read_processed_granules(config: dict) -> set:
+    """
+    granules = read_processed_granules(config)
+
+    Returns:
+    - the set of satellite granules already compared to the saildrone
+        (in range or not), for the product and tolerances of the config.
+    """
+    if not use_state_db(config=config):
+        return set(read_in_range_log(config=config)) | set(read_not_in_range_log(config=config))
+
+    con = connect_state_db(config=config)
+    granules = {
+        row[0]
+        for row in con.execute(
+            "SELECT granule FROM granule_state WHERE drone = ? AND year = ? AND product = ? AND tolerance = ?",
+            get_state_key(config=config),
+        )
+    }
+    con.close()
+
+    return granules
+
+
+def read_in_range_granules(config: dict) -> list:
+    """
+    granules = read_in_range_granules(config)
+
+    Returns:
+    - the sorted list of satellite granules with points matching the saildrone.
+    """
+    if not use_state_db(config=config):
+        return read_in_range_log(config=config)
+
+    con = connect_state_db(config=config)
+    granules = [
+        row[0]
+        for row in con.execute(
+            "SELECT granule FROM granule_state WHERE drone = ? AND year = ? AND product = ? AND tolerance = ? AND status = 'in_range' ORDER BY granule",
+            get_state_key(config=config),
+        )
+    ]
+    con.close()
+
+    return granules
+
+
+def read_granule_states(config: dict) -> pd.DataFrame:
+    """
+    states = read_granule_states(config)
+
+    Returns:
+    - the processing state (status, min distance, processing time, and the
+        time range of the saildrone track and of the granule) of every
+        granule, for the saildrone, product and tolerances of the config.
+    """
+    con = connect_state_db(config=config)
+    states = pd.read_sql_query(
+        "SELECT * FROM granule_state WHERE drone = ? AND year = ? AND product = ? AND tolerance = ? ORDER BY granule",
+        con,
+        params=get_state_key(config=config),
+    )
+    con.close()
+
+    for column in ADDED_STATE_COLUMNS:
+        states[column] = pd.to_datetime(states[column])
+
+    return states
+
+
+def record_granule_states(results: list, config: dict):
+    """
+    record_granule_states(results, config)
+
+    Arguments:
+    - results: list of match_swath_file results
+    - config: the dictionary from the config yaml file
+
+    Returns: None
+    Records the status, min distance, processing time and time coverage of
+    a batch of granules in one transaction (or appends them to the text
+    logs, with processing_state: log).
+    A granule that is already recorded (re-matched against new saildrone
+    data) is merged with its previous state: it is in range if either match
+    was, and its saildrone time coverage is the union of both.
+    """
+    if len(results) == 0:
+        return
+
+    if not use_state_db(config=config):
+        for result in results:
+            write_to_log(filename=result["filename"], config=config, in_range=result["in_range"])
+        return
+
+    key = get_state_key(config=config)
+    processed_at = str(pd.Timestamp.now())
+    rows = [
+        key
+        + (
+            result["filename"],
+            "in_range" if result["in_range"] else "not_in_range",
+            float(result["matches"].dist.min()) if result["in_range"] else None,
+            result.get("elapsed"),
+            processed_at,
+        )
+        + tuple(
+            None if pd.isna(result.get(column)) else str(pd.Timestamp(result[column]))
+            for column in ["sd_time_start", "sd_time_end", "time_start", "time_end"]
+        )
+        for result in results
+    ]
+
+    con = connect_state_db(config=config)
+    with con:
+        con.executemany(
+            """
+            INSERT INTO granule_state (
+                drone, year, product, tolerance, granule, status,
+                min_distance_km, processing_time_sec, processed_at,
+                sd_time_start, sd_time_end, granule_time_start, granule_time_end
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (drone, year, product, tolerance, granule) DO UPDATE SET
+                status = CASE
+                    WHEN granule_state.status = 'in_range' THEN 'in_range'
+                    ELSE excluded.status
+                END,
+                min_distance_km = min(
+                    coalesce(granule_state.min_distance_km, excluded.min_distance_km),
+                    coalesce(excluded.min_distance_km, granule_state.min_distance_km)
+                ),
+                processing_time_sec = coalesce(granule_state.processing_time_sec, 0)
+                    + coalesce(excluded.processing_time_sec, 0),
+                processed_at = excluded.processed_at,
+                sd_time_start = min(
+                    coalesce(granule_state.sd_time_start, excluded.sd_time_start),
+                    coalesce(excluded.sd_time_start, granule_state.sd_time_start)
+                ),
+                sd_time_end = max(
+                    coalesce(granule_state.sd_time_end, excluded.sd_time_end),
+                    coalesce(excluded.sd_time_end, granule_state.sd_time_end)
+                ),
+                granule_time_start = coalesce(excluded.granule_time_start, granule_state.granule_time_start),
+                granule_time_end = coalesce(excluded.granule_time_end, granule_state.granule_time_end)
+            """,
+            rows,
+        )
+    con.close()
@@ -0,0 +1,292 @@
+import numpy as np
+import os
+import pandas as pd
+
+from cache import read_saildrone_cached, read_swath_cached
+from calculations import match_saildrone_satellite_point, recorded_match_values
+from matching import get_tolerance_configs
+from read_write import (
+    check_for_saildrone_data,
+    fetch_repo_path,
+    get_product_configs,
+    get_saildrone_configs,
+    get_variable_configs,
+    read_swath_matching_data,
+)
+
+
+# the collocation sets compared: all the pairs, the mean and the nearest satellite point per saildrone point
+COLLOCATION_SETS = ["combined", "mean", "nearest"]
+
+
+class CollocationStats:
+    """
+    stats = CollocationStats()
+    stats.update(sd_values, st_values)
+
+    Running moments of saildrone (sd) and satellite (st) value pairs: the
+    count, means, sums of squared deviations, co-deviation, and the mean and
+    sum of squared deviations of st - sd. Chunks are added with update and
+    accumulators are combined with merge (pairwise Welford / Chan updates),
+    so the statistics of a drone, a product or the fleet never need all the
+    pairs in memory, and do not lose precision on long series.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_sd = 0.0
+        self.mean_st = 0.0
+        self.m2_sd = 0.0
+        self.m2_st = 0.0
+        self.co_sd_st = 0.0
+        self.mean_diff = 0.0
+        self.m2_diff = 0.0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def update(self, sd_values: np.ndarray, st_values: np.ndarray):
+        """
+        stats.update(sd_values, st_values)
+
+        Returns: self
+        Adds the pairs with both values valid.
+        """
+        sd_values = np.asarray(sd_values, dtype=np.float64)
+        st_values = np.asarray(st_values, dtype=np.float64)
+        valid = np.isfinite(sd_values) & np.isfinite(st_values)
+        sd_values = sd_values[valid]
+        st_values = st_values[valid]
+        if len(sd_values) == 0:
+            return self
+
+        chunk = CollocationStats()
+        chunk.n = len(sd_values)
+        chunk.mean_sd = sd_values.mean()
+        chunk.mean_st = st_values.mean()
+        sd_dev = sd_values - chunk.mean_sd
+        st_dev = st_values - chunk.mean_st
+        chunk.m2_sd = np.dot(sd_dev, sd_dev)
+        chunk.m2_st = np.dot(st_dev, st_dev)
+        chunk.co_sd_st = np.dot(sd_dev, st_dev)
+        diff = st_values - sd_values
+        chunk.mean_diff = diff.mean()
+        chunk.m2_diff = np.dot(diff - chunk.mean_diff, diff - chunk.mean_diff)
+
+        return self.merge(chunk)
+
+    def merge(self, other: "CollocationStats"):
+        """
+        stats.merge(other)
+
+        Returns: self
+        Adds the pairs accumulated by other.
+        """
+        if other.n == 0:
+            return self
+
+        n = self.n + other.n
+        weight = self.n * other.n / n
+        delta_sd = other.mean_sd - self.mean_sd
+        delta_st = other.mean_st - self.mean_st
+        delta_diff = other.mean_diff - self.mean_diff
+
+        self.m2_sd += other.m2_sd + delta_sd**2 * weight
+        self.m2_st += other.m2_st + delta_st**2 * weight
+        self.co_sd_st += other.co_sd_st + delta_sd * delta_st * weight
+        self.m2_diff += other.m2_diff + delta_diff**2 * weight
+        self.mean_sd += delta_sd * other.n / n
+        self.mean_st += delta_st * other.n / n
+        self.mean_diff += delta_diff * other.n / n
+        self.n = n
+
+        return self
+
+    def result(self) -> dict:
+        """
+        result = stats.result()
+
+        Returns:
+        - result: n, bias (mean of st - sd), rmse (of st - sd), slope and
+            intercept of the least squares fit of st on sd, and r2, the
+            coefficient of determination of st as a prediction of sd
+            (1 - sum((st - sd)^2) / sum((sd - mean sd)^2)). Undefined values
+            are NaN.
+        """
+        if self.n == 0:
+            return {"n": 0, "bias": np.nan, "rmse": np.nan, "slope": np.nan, "intercept": np.nan, "r2": np.nan}
+
+        sum_sq_diff = self.m2_diff + self.n * self.mean_diff**2
+        if self.m2_sd > 0:
+            slope = self.co_sd_st / self.m2_sd
+            r2 = 1 - sum_sq_diff / self.m2_sd
+        else:
+            slope = np.nan
+            r2 = np.nan
+
+        return {
+            "n": self.n,
+            "bias": float(self.mean_diff),
+            "rmse": float(np.sqrt(sum_sq_diff / self.n)),
+            "slope": float(slope),
+            "intercept": float(self.mean_st - slope * self.mean_sd),
+            "r2": float(r2),
+        }
+
+
+def get_collocation_stats(comparisons: dict = None) -> dict:
+    """
+    stats = get_collocation_stats(comparisons)
+
+    Arguments:
+    - comparisons: optional dataframes (with sd_var and st_var) of each
+        collocation set, added to the accumulators
+
+    Returns:
+    - stats: a CollocationStats for each of COLLOCATION_SETS.
+    """
+    stats = {collocation: CollocationStats() for collocation in COLLOCATION_SETS}
+    for collocation, data in (comparisons or {}).items():
+        stats[collocation].update(sd_values=data.sd_var.to_numpy(), st_values=data.st_var.to_numpy())
+
+    return stats
+
+
+def iter_comparisons(match_data: list, sd_filename: str, config: dict):
+    """
+    for swath_match_data, comparisons in iter_comparisons(match_data, sd_filename, config):
+
+    Arguments:
+    - match_data: the (swath filename, matching points) of each swath (see
+        read_swath_matching_data)
+    - sd_filename: the saildrone file
+    - config: the dictionary from the config yaml file
+
+    Returns (for each swath with valid values):
+    - swath_match_data: its matching points
+    - comparisons: the saildrone/satellite values of all the pairs, of the
+        mean satellite point and of the nearest satellite point
+        ({set: dataframe}, see COLLOCATION_SETS)
+
+    The data are only read if the values were not recorded when matching.
+    """
+    sd_data = None
+    for sat_filename, swath_match_data in match_data:
+        comparison = recorded_match_values(match_data=swath_match_data, config=config)
+        if comparison is None:
+            if sd_data is None:
+                sd_data = read_saildrone_cached(filename=sd_filename, config=config, masked_nan=True)
+                sd_data = sd_data.set_index(["time", "lat", "lon"])
+            st_data = read_swath_cached(
+                filename=sat_filename, config=config, variables=[config["satellite_variable_name"]]
+            )
+            st_data = st_data.set_index(["time", "lat", "lon"])
+
+            comparison = match_saildrone_satellite_point(
+                match_data=swath_match_data,
+                sd_data=sd_data,
+                st_data=st_data,
+                config=config,
+            )
+        comparison = comparison.dropna(axis=0, thresh=5)
+        if len(comparison) == 0:
+            continue
+
+        yield swath_match_data, {
+            "combined": comparison,
+            "mean": comparison.groupby("sd_time", as_index=False).mean().reset_index(drop=True),
+            "nearest": comparison.loc[comparison.groupby("sd_time").dist.idxmin()].reset_index(drop=True),
+        }
+
+
+def get_saildrone_stats(config: dict) -> dict:
+    """
+    stats = get_saildrone_stats(config)
+
+    Arguments:
+    - config: the config of a saildrone, product, tolerance and variables
+
+    Returns:
+    - stats: the CollocationStats of each collocation set, accumulated one
+        swath at a time.
+    """
+    stats = get_collocation_stats()
+    match_data = read_swath_matching_data(config=config)
+    if len(match_data) == 0:
+        return stats
+
+    for _, comparisons in iter_comparisons(
+        match_data=match_data,
+        sd_filename=check_for_saildrone_data(config=config),
+        config=config,
+    ):
+        for collocation, swath_stats in get_collocation_stats(comparisons=comparisons).items():
+            stats[collocation].merge(swath_stats)
+
+    return stats
+
+
+def get_collocation_table(config: dict) -> pd.DataFrame:
+    """
+    table = get_collocation_table(config)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - table: the statistics (see CollocationStats.result) of each
+        collocation set, for every product, tolerance, variable pair and
+        saildrone, plus the whole fleet (saildrone fleet) of each product.
+        The saildrones are read one after the other and merged into the
+        fleet, so only one saildrone's matching points are in memory.
+    """
+    rows = []
+    for product_config in get_product_configs(config=config):
+        for tolerance_config in get_tolerance_configs(config=product_config):
+            for variable_config in get_variable_configs(config=tolerance_config):
+                labels = {
+                    "product": variable_config["satellite_product"],
+                    "time_tolerance_min": variable_config["saildrone_time_tolerance_min"],
+                    "distance_tolerance_km": variable_config["saildrone_distance_tolerance_km"],
+                    "saildrone_variable": variable_config["saildrone_variable_name"],
+                    "satellite_variable": variable_config["satellite_variable_name"],
+                }
+
+                fleet_stats = get_collocation_stats()
+                for saildrone_config in get_saildrone_configs(config=variable_config):
+                    stats = get_saildrone_stats(config=saildrone_config)
+                    for collocation in COLLOCATION_SETS:
+                        fleet_stats[collocation].merge(stats[collocation])
+                        rows.append(
+                            {
+                                "saildrone": f"{saildrone_config['saildrone_number']}.{saildrone_config['saildrone_year']}",
+                                **labels,
+                                "collocation": collocation,
+                                **stats[collocation].result(),
+                            }
+                        )
+                for collocation in COLLOCATION_SETS:
+                    rows.append(
+                        {"saildrone": "fleet", **labels, "collocation": collocation, **fleet_stats[collocation].result()}
+                    )
+
+    return pd.DataFrame(rows)
+
+
+def write_collocation_table(table: pd.DataFrame, config: dict) -> str:
+    """
+    path = write_collocation_table(table, config)
+
+    Arguments:
+    - table: see get_collocation_table
+    - config: the dictionary from the config yaml file
+
+    Returns:
+    - path: the csv file the table is written to
+        (matching_data_folder/collocation_statistics.csv).
+    """
+    path = f"{fetch_repo_path()}{os.sep}{config['matching_data_folder']}{os.sep}collocation_statistics.csv"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table.to_csv(path, index=False)
+
+    return path
@@ -0,0 +1,304 @@
+import numpy as np
+import os
+import pandas as pd
+import xarray as xr
+
+from read_write import DS, fetch_repo_path
+
+
+# (saildrone variable, satellite variable) compared for each synthetic product
+SYNTHETIC_VARIABLES = {
+    DS.ASCAT.value: ("wind_speed", "wind_speed"),
+    DS.ASCAT_METOPB.value: ("wind_speed", "wind_speed"),
+    DS.SMAP.value: ("ocean_salinity", "salinity_70km"),
+}
+
+
+def get_synthetic_config(config: dict, folder: str) -> dict:
+    """
+    synthetic_config = get_synthetic_config(config, folder)
+
+    Arguments:
+    - config: the dictionary from the config yaml file
+    - folder: folder of the synthetic data, relative to the repository
+
+    Returns:
+    - synthetic_config: the config with all the data, log, match and cache
+        folders moved under folder, so that the real data are never touched.
+    """
+    return {
+        **config,
+        "satellite_data_folder": f"{folder}{os.sep}data_satellite",
+        "saildrone_data_folder": f"{folder}{os.sep}data_saildrone",
+        "shapefile_data_folder": f"{folder}{os.sep}data_shapefile",
+        "matching_data_folder": f"{folder}{os.sep}data_match",
+        "figure_data_folder": f"{folder}{os.sep}figs",
+        "log_data_folder": f"{folder}{os.sep}log",
+        "cache_data_folder": f"{folder}{os.sep}cache",
+        "fleet_saildrones": [],
+        "time_range": {**config.get("time_range", {}), "limit": False},
+    }
+
+
+def make_saildrone_track(
+    start_time: pd.Timestamp,
+    n_points: int,
+    lon: float,
+    lat: float,
+    rng: np.random.Generator,
+    step_deg: float = 0.002,
+) -> pd.DataFrame:
+    """
+    track = make_saildrone_track(start_time, n_points, lon, lat, rng, step_deg)
+
+    Arguments:
+    - start_time: time of the first point (one point per minute)
+    - n_points: number of points of the track
+    - lon, lat: start position (degrees)
+    - rng: numpy random generator
+    - step_deg: standard deviation of the position change between points
+
+    Returns:
+    - track: random walk with time, lon and lat columns.
+    """
+    return pd.DataFrame(
+        {
+            "time": pd.date_range(start_time, periods=n_points, freq="min"),
+            "lon": lon + np.cumsum(rng.normal(0, step_deg, n_points)),
+            "lat": lat + np.cumsum(rng.normal(0, step_deg, n_points)),
+        }
+    )
+
+
+def write_synthetic_saildrone(
+    track: pd.DataFrame, sd_number: int, config: dict, rng: np.random.Generator
+) -> str:
+    """
+    filename = write_synthetic_saildrone(track, sd_number, config, rng)
+
+    Arguments:
+    - track: the positions of the saildrone (see make_saildrone_track)
+    - sd_number: saildrone number (goes into the file name)
+    - config: the synthetic config (see get_synthetic_config)
+    - rng: numpy random generator
+
+    Returns:
+    - filename: the saildrone file, written to saildrone_data_folder/nc with
+        the variable names and (trajectory, obs) layout of the saildrone
+        netcdf files that read_saildrone expects.
+    """
+    n_points = len(track)
+    dims = ("trajectory", "obs")
+    variables = {
+        "latitude": track.lat.to_numpy(),
+        "longitude": track.lon.to_numpy(),
+        "time": track.time.to_numpy(),
+        "WIND_SPEED_MEAN": rng.random(n_points) * 15,
+        "WIND_FROM_MEAN": rng.random(n_points) * 360,
+        "TEMP_AIR_MEAN": 20 + rng.random(n_points) * 10,
+        "TEMP_SBE37_MEAN": 20 + rng.random(n_points) * 10,
+        "SAL_SBE37_MEAN": 33 + rng.random(n_points) * 4,
+    }
+    data = xr.Dataset(
+        {var: (dims, values[None, :]) for var, values in variables.items()},
+        coords={"trajectory": [float(sd_number)]},
+    )
+
+    filename = f"sd{sd_number}_{track.time.iloc[0].year}.nc"
+    path = f"{fetch_repo_path()}{os.sep}{config['saildrone_data_folder']}{os.sep}nc"
+    os.makedirs(path, exist_ok=True)
+    data.to_netcdf(f"{path}{os.sep}{filename}")
+
+    return filename
+
+
+def make_swath_grid(
+    track: pd.DataFrame,
+    time_start: pd.Timestamp,
+    n_rows: int,
+    n_cells: int,
+    overlap: bool,
+    row_seconds: float = 4.0,
+    cell_deg: float = 0.125,
+) -> tuple:
+    """
+    time, lon, lat = make_swath_grid(track, time_start, n_rows, n_cells, overlap, row_seconds, cell_deg)
+
+    Arguments:
+    - track: the saildrone positions the swath is laid out against
+    - time_start: time of the first row of the swath
+    - n_rows, n_cells: swath size (along track x across track)
+    - overlap: whether the swath passes over the saildrone (otherwise it
+        is shifted 90 degrees of longitude away)
+    - row_seconds: time between two rows
+    - cell_deg: distance between two rows or cells (degrees)
+
+    Returns:
+    - time, lon, lat: (n_rows, n_cells) arrays, lon in [0, 360).
+        The swath flies over the position of the saildrone at its middle row.
+    """
+    row_time = time_start + pd.to_timedelta(np.arange(n_rows) * row_seconds, unit="s")
+    center = track.iloc[np.clip(track.time.searchsorted(row_time[n_rows // 2]), 0, len(track) - 1)]
+    length_deg = (n_rows - 1) * cell_deg
+    width_deg = (n_cells - 1) * cell_deg
+
+    lat = center.lat + np.linspace(-length_deg / 2, length_deg / 2, n_rows)[:, None] + np.zeros((1, n_cells))
+    lon = center.lon + np.linspace(-width_deg / 2, width_deg / 2, n_cells)[None, :] + np.zeros((n_rows, 1))
+    if not overlap:
+        lon = lon + 90
+    time = np.repeat(row_time.to_numpy()[:, None], n_cells, axis=1)
+
+    return time, lon % 360, np.clip(lat, -89.9, 89.9)
+
+
+def write_synthetic_swath(
+    product: str,
+    time: np.ndarray,
+    lon: np.ndarray,
+    lat: np.ndarray,
+    density: float,
+    config: dict,
+    rng: np.random.Generator,
+) -> str:
+    """
+    filename = write_synthetic_swath(product, time, lon, lat, density, config, rng)
+
+    Arguments:
+    - product: ASCAT, ASCAT_METOPB or SMAP
+    - time, lon, lat: the swath grid (see make_swath_grid)
+    - density: fraction of the swath cells with valid data
+    - config: the synthetic config (see get_synthetic_config)
+    - rng: numpy random generator
+
+    Returns:
+    - filename: the granule, written to satellite_data_folder/product with
+        the variable names and dimensions read_ASCAT or read_SMAP expect
+        (including some of the variables they drop).
+    """
+    shape = lat.shape
+    missing = rng.random(shape) >= density
+
+    def values(low: float, high: float) -> np.ndarray:
+        data = low + rng.random(shape) * (high - low)
+        data[missing] = np.nan
+        return data
+
+    if product == DS.SMAP.value:
+        # two looks (fore and aft), a few minutes apart
+        dims = ("ydim_grid", "xdim_grid", "look")
+        look_offset = np.array([0, 180], dtype="timedelta64[s]")
+        variables = {
+            "time": time[:, :, None] + look_offset,
+            "sss_smap": values(30, 38)[:, :, None].repeat(2, axis=2),
+            "sss_smap_40km": values(30, 38)[:, :, None].repeat(2, axis=2),
+            "surtep": values(270, 305)[:, :, None].repeat(2, axis=2),
+            "winspd": values(0, 20)[:, :, None].repeat(2, axis=2),
+            "rain": values(0, 5)[:, :, None].repeat(2, axis=2),
+        }
+        coords = {
+            "cellat": (dims, lat[:, :, None].repeat(2, axis=2)),
+            "cellon": (dims, lon[:, :, None].repeat(2, axis=2)),
+        }
+        prefix = "RSS_SMAP_SSS_L2C"
+    else:
+        dims = ("NUMROWS", "NUMCELLS")
+        variables = {
+            "time": time,
+            "wind_speed": values(0, 20),
+            "wind_dir": values(0, 360),
+            "model_speed": values(0, 20),
+            "model_dir": values(0, 360),
+            "wvc_index": np.tile(np.arange(shape[1], dtype=np.float64), (shape[0], 1)),
+        }
+        coords = {"lat": (dims, lat), "lon": (dims, lon)}
+        prefix = "ascat"
+
+    data = xr.Dataset({var: (dims, value) for var, value in variables.items()}, coords=coords)
+
+    filename = f"{prefix}_{pd.Timestamp(time.min()):%Y%m%d_%H%M%S}_synthetic.nc"
+    path = f"{fetch_repo_path()}{os.sep}{config['satellite_data_folder']}{os.sep}{product}"
+    os.makedirs(path, exist_ok=True)
+    data.to_netcdf(f"{path}{os.sep}{filename}")
+
+    return filename
+
+
+def generate_synthetic_data(
+    config: dict,
+    products: list,
+    n_saildrones: int,
+    n_track_points: int,
+    n_granules: int,
+    n_rows: int,
+    n_cells: int,
+    density: float,
+    overlap: float,
+    seed: int = 0,
+) -> dict:
+    """
+    datasets = generate_synthetic_data(config, products, n_saildrones, n_track_points,
+                                       n_granules, n_rows, n_cells, density, overlap, seed)
+
+    Arguments:
+    - config: the synthetic config (see get_synthetic_config)
+    - products: satellite products to generate granules for
+    - n_saildrones: number of saildrone tracks
+    - n_track_points: number of points of each track (one per minute)
+    - n_granules: number of granules per product, spread over the tracks
+    - n_rows, n_cells: size of each granule
+    - density: fraction of the swath cells with valid data
+    - overlap: fraction of the granules that pass over a saildrone
+    - seed: random seed (the same parameters always give the same data)
+
+    Returns:
+    - datasets: dictionary with the saildrones ([number, year] pairs)
+        and the granule filenames of each product.
+
+    The tracks start at the same time in different parts of the ocean. Each
+    granule is laid out against one of the tracks, in turn.
+    """
+    rng = np.random.default_rng(seed)
+    start_time = pd.Timestamp("2021-08-15")
+
+    saildrones = []
+    tracks = []
+    for num in range(n_saildrones):
+        track = make_saildrone_track(
+            start_time=start_time,
+            n_points=n_track_points,
+            lon=-60 + 10 * (num % 6),
+            lat=10 + 10 * (num // 6),
+            rng=rng,
+        )
+        sd_number = 9100 + num
+        write_synthetic_saildrone(track=track, sd_number=sd_number, config=config, rng=rng)
+        saildrones.append([sd_number, start_time.year])
+        tracks.append(track)
+
+    granule_times = start_time + (
+        np.arange(n_granules) * (pd.Timedelta(minutes=n_track_points) / max(n_granules, 1))
+    )
+    granules = {}
+    for product in products:
+        granules[product] = []
+        for num, time_start in enumerate(granule_times):
+            time, lon, lat = make_swath_grid(
+                track=tracks[num % n_saildrones],
+                time_start=time_start,
+                n_rows=n_rows,
+                n_cells=n_cells,
+                overlap=rng.random() < overlap,
+            )
+            granules[product].append(
+                write_synthetic_swath(
+                    product=product,
+                    time=time,
+                    lon=lon,
+                    lat=lat,
+                    density=density,
+                    config=config,
+                    rng=rng,
+                )
+            )
+
+    return {"saildrones": saildrones, "granules": granules}